@@ -0,0 +1,80 @@
+"""ContentManifest builds: serial vs. process-pool parsing vs. warm index.
+
+For each archive size, times a cold discovery.ContentManifest.build with the
+pure-Python SafeLoader, with CSafeLoader (when PyYAML has libyaml), and with
+CSafeLoader fanned out over a process pool; then a warm start, where the
+in-memory cache is empty but the persistent index from a previous session is
+on disk. Every run is checked to produce the same documents in the same order.
+
+    uv run python _benchmarks/bench_discovery.py --sizes 1000 10000 50000 --workers 4
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import synthetic  # puts _tests on sys.path
+
+# isort: split
+import discovery
+import yaml
+
+
+def timed_build(docs: Path, workers: int, loader) -> tuple[float, tuple]:
+    discovery.reset()
+    discovery._YAML_LOADER = loader
+    t0 = time.perf_counter()
+    documents = discovery.ContentManifest.build(docs, workers=workers).documents
+    return time.perf_counter() - t0, documents
+
+
+def timed_warm_start(docs: Path) -> tuple[float, tuple]:
+    discovery.DOCS, discovery.INDEX_PATH = docs, docs / "index.json"
+    discovery.reset()
+    discovery.manifest()  # previous session: parses and writes the index
+    discovery.reset()  # a new session, not invalidate(): that would distrust the index
+    t0 = time.perf_counter()
+    documents = discovery.manifest().documents
+    elapsed = time.perf_counter() - t0
+    discovery.INDEX_PATH = None
+    return elapsed, documents
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--body-bytes", type=int, default=1_000)
+    args = ap.parse_args()
+
+    c_loader = getattr(yaml, "CSafeLoader", None)
+    modes = [("serial SafeLoader", 0, yaml.SafeLoader)]
+    if c_loader is not None:
+        modes.append(("serial CSafeLoader", 0, c_loader))
+    modes.append((f"{args.workers} workers", args.workers, c_loader or yaml.SafeLoader))
+    modes.append(("warm index", None, c_loader or yaml.SafeLoader))
+    discovery.INDEX_PATH = None
+
+    print(f"{'Posts':>7} " + " ".join(f"{name:>20}" for name, _, _ in modes))
+    print("-" * (8 + 21 * len(modes)))
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            docs = Path(tmp)
+            synthetic.write_archive(docs, size, args.body_bytes)
+            row, reference = [], None
+            for _, workers, loader in modes:
+                if workers is None:
+                    elapsed, documents = timed_warm_start(docs)
+                else:
+                    elapsed, documents = timed_build(docs, workers, loader)
+                reference = reference or documents
+                assert documents == reference, "build diverged from the serial result"
+                row.append(f"{elapsed * 1000:>18.0f}ms")
+            print(f"{size:>7} " + " ".join(row))
+    discovery.reset()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Header-only front-matter reads vs. reading the whole file.
+
+Writes a synthetic archive of large posts to a temp dir, then parses every
+post's front matter both ways and reports wall time and peak traced memory.
+
+    uv run python _benchmarks/bench_front_matter.py --posts 50 --body-mb 2
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import synthetic  # puts _tests on sys.path
+
+# isort: split
+import yaml
+from discovery import read_front_matter
+
+
+def full_read(path: Path) -> dict:
+    """The previous approach: read the whole file, then split on the fences."""
+    text = path.read_text(encoding="utf-8", errors="ignore")
+    parts = text.split("---", 2)
+    return yaml.safe_load(parts[1]) if len(parts) == 3 else {}
+
+
+def measure(fn, paths: list[Path]) -> tuple[float, int]:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    for p in paths:
+        fn(p)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--posts", type=int, default=50)
+    ap.add_argument("--body-mb", type=float, default=2.0)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = synthetic.write_archive(Path(tmp), args.posts, int(args.body_mb * 1024 * 1024))
+        # Warm the page cache so both readers see the same I/O conditions.
+        for p in paths:
+            p.read_bytes()
+
+        print(f"{args.posts} posts x {args.body_mb:g} MB body")
+        print(f"{'Reader':<14} {'Time':>10} {'Peak mem':>12}")
+        print(f"{'-'*38}")
+        results = {}
+        for name, fn in (("full read", full_read), ("header only", read_front_matter)):
+            elapsed, peak = measure(fn, paths)
+            results[name] = (elapsed, peak)
+            print(f"{name:<14} {elapsed * 1000:>8.1f}ms {peak / 1024:>10.0f}KB")
+        (t_full, m_full), (t_head, m_head) = results.values()
+        print(f"\nspeed-up {t_full / t_head:.1f}x, peak memory {m_full / max(m_head, 1):.0f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Liquid render time per template as the archive grows, from `jekyll build --profile`.
+
+For each archive size, copies docs/ without its posts, previews or build
+output into a temporary site, fills `_posts` with synthetic essays and runs
+`bundle exec jekyll build --profile` over it (best of --repeat builds per
+template). The distinct-tag pool grows with the archive (--posts-per-tag), as
+on a real blog, because templates that loop over tags only show their true
+cost when there are more of them.
+
+The per-template table Jekyll prints is parsed into one scaling curve per
+file. Each curve's log-log slope against post count is its growth exponent:
+about 1 for a template rendered once per post or looping once over the posts,
+and about 2 for a loop inside a loop over them. `_layouts/tags.html` is of the
+second kind: it runs `where_exp` over every tag occurrence once per unique tag.
+Templates whose slope exceeds --superlinear and that take at least
+--min-seconds at the largest size are flagged. Jekyll lists only its 50
+slowest files. Individual posts (`_posts/...`) are left out, since their cost
+is the post layout's.
+
+    uv run python _benchmarks/bench_jekyll_profile.py --sizes 100 200 400 800 --repeat 2
+
+Needs Ruby and the bundle from the Gemfile (`make shell`).
+"""
+
+import argparse
+import math
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import synthetic  # puts _tests on sys.path
+
+# isort: split
+import build_cache
+
+REPO = Path(__file__).resolve().parent.parent
+SKIP = {"_posts", "_previews", *build_cache.OUTPUTS}  # top-level docs/ entries not copied
+_TIME = re.compile(r"^\d+(?:\.\d+)?$")
+
+
+def parse_profile(output: str) -> dict[str, tuple[int, float]]:
+    """filename -> (render count, seconds) from Jekyll's "Site Render Stats" table.
+
+    Accepts Jekyll 3's `a | b | c | d` rows and Jekyll 4's bordered `| a | b | c | d |`.
+    """
+    rows = {}
+    for line in output.splitlines():
+        cells = [cell.strip() for cell in line.strip().strip("|").split("|")]
+        if len(cells) != 4 or not cells[1].isdigit() or not _TIME.match(cells[3]):
+            continue
+        filename, count, _, seconds = cells
+        if not filename.startswith("TOTAL"):
+            rows[filename] = (int(count), float(seconds))
+    return rows
+
+
+def log_slope(sizes: list[int], seconds: list[float]) -> float | None:
+    """Least-squares slope of log(seconds) against log(size), over the sizes with a nonzero time."""
+    points = [(math.log(n), math.log(t)) for n, t in zip(sizes, seconds) if t > 0]
+    if len(points) < 2:
+        return None
+    mx = sum(x for x, _ in points) / len(points)
+    my = sum(y for _, y in points) / len(points)
+    sxx = sum((x - mx) ** 2 for x, _ in points)
+    return sum((x - mx) * (y - my) for x, y in points) / sxx if sxx else None
+
+
+def make_site(root: Path, posts: int, posts_per_tag: int, body_bytes: int) -> Path:
+    """docs/ minus its content, plus `posts` synthetic essays."""
+    site = root / "docs"
+    shutil.copytree(REPO / "docs", site, ignore=lambda d, names: SKIP if Path(d) == REPO / "docs" else ())
+    synthetic.write_archive(site, posts, body_bytes, tag_pool=max(3, posts // posts_per_tag))
+    return site
+
+
+def profile(site: Path, timeout: float) -> tuple[float, dict[str, tuple[int, float]]]:
+    """(wall-clock seconds, parsed table) for one profiled build of `site`."""
+    command = [
+        "bundle",
+        "exec",
+        "jekyll",
+        "build",
+        "--profile",
+        "--source",
+        str(site),
+        "--destination",
+        str(site / "_site"),
+    ]
+    t0 = time.perf_counter()
+    out = subprocess.run(command, cwd=REPO, capture_output=True, text=True, timeout=timeout, check=False)
+    elapsed = time.perf_counter() - t0
+    if out.returncode != 0:
+        raise RuntimeError(f"jekyll build failed ({out.returncode}):\n{(out.stdout + out.stderr)[-4000:]}")
+    rows = parse_profile(out.stdout)
+    if not rows:
+        raise RuntimeError(f"no --profile table in the jekyll output:\n{out.stdout[-4000:]}")
+    return elapsed, rows
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100, 200, 400, 800])
+    ap.add_argument("--repeat", type=int, default=2, help="builds per size; each template keeps its fastest")
+    ap.add_argument("--posts-per-tag", type=int, default=5, help="archive posts per distinct tag")
+    ap.add_argument("--body-bytes", type=int, default=2_000)
+    ap.add_argument("--superlinear", type=float, default=1.3, help="flag slopes above this")
+    ap.add_argument("--min-seconds", type=float, default=0.05, help="ignore templates faster than this")
+    ap.add_argument("--top", type=int, default=20)
+    ap.add_argument("--timeout", type=float, default=1800)
+    args = ap.parse_args()
+    if shutil.which("bundle") is None:
+        print("bundle not found: run inside the dev container (make shell)", file=sys.stderr)
+        return 1
+
+    sizes = sorted(args.sizes)
+    walls: list[float] = []
+    curves: dict[str, list[float]] = {}
+    counts: dict[str, int] = {}
+    for i, size in enumerate(sizes):
+        with tempfile.TemporaryDirectory() as tmp:
+            site = make_site(Path(tmp), size, args.posts_per_tag, args.body_bytes)
+            best: dict[str, tuple[int, float]] = {}
+            wall = math.inf
+            for _ in range(args.repeat):
+                elapsed, rows = profile(site, args.timeout)
+                wall = min(wall, elapsed)
+                for name, (count, seconds) in rows.items():
+                    if name.startswith("_posts/"):
+                        continue
+                    if name not in best or seconds < best[name][1]:
+                        best[name] = (count, seconds)
+        walls.append(wall)
+        for name, (count, seconds) in best.items():
+            curves.setdefault(name, [0.0] * len(sizes))[i] = seconds
+            counts[name] = count
+        print(f"{size:>6} posts: build {wall:.2f} s, {len(best)} templates profiled", file=sys.stderr)
+
+    def last(item: tuple[str, list[float]]) -> float:
+        return item[1][-1]
+
+    print(f"\n{'Template':<40} {'Count':>6} " + " ".join(f"{n:>8}" for n in sizes) + f" {'Slope':>6}")
+    print("-" * (48 + 9 * len(sizes) + 7))
+    flagged = []
+    for name, seconds in sorted(curves.items(), key=last, reverse=True)[: args.top]:
+        slope = log_slope(sizes, seconds)
+        superlinear = slope is not None and slope > args.superlinear and seconds[-1] >= args.min_seconds
+        if superlinear:
+            flagged.append((name, slope))
+        times = " ".join(f"{t:>7.3f}s" for t in seconds)
+        shown = f"{slope:>6.2f}" if slope is not None else f"{'-':>6}"
+        print(f"{name:<40} {counts[name]:>6} {times} {shown}{'  superlinear' if superlinear else ''}")
+    wall_slope = log_slope(sizes, walls)
+    print(f"{'(whole build, wall clock)':<40} {'':>6} " + " ".join(f"{t:>7.2f}s" for t in walls), end="")
+    print(f" {wall_slope:>6.2f}" if wall_slope is not None else "")
+
+    if flagged:
+        print(f"\nSuperlinear in post count (slope > {args.superlinear}):")
+        for name, slope in flagged:
+            print(f"  {name}: time grows as posts^{slope:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""Query latency and size of the BM25 inverted index vs. a linear fuzzy scan.
+
+For each archive size, builds the inverted index (_tools/inverted_index.py)
+over synthetic full-text posts. It reports the gzipped size of the main file
+next to that of a search-index.json holding the same posts cut to 100 words,
+and what the shards each query loads add to it (p50 and max, exact and typo
+queries apart). It then times the same queries, half exact words and half with
+a transposition typo, through the reference `Searcher`. For comparison it
+also times a linear scan that, like Fuse, visits every document and fuzzily
+compares each of its words to each query term.
+Every document the index matches must also be found by the scan; the scan has
+no ranking to compare. The index can match fewer documents: a known word is not
+also matched fuzzily, and a typo keeps only MAX_EXPANSIONS candidate terms.
+
+    uv run python _benchmarks/bench_search.py --sizes 100 1000 5000 --queries 200 --words 1500
+"""
+
+import argparse
+import gzip
+import json
+import random
+import statistics
+import time
+
+import synthetic  # puts _tests and _tools on sys.path
+
+# isort: split
+import inverted_index
+
+
+def typo(word: str, rng: random.Random) -> str:
+    if len(word) < 4:
+        return word
+    i = rng.randrange(len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2 :]
+
+
+def linear_scan(docs: list[dict], query: str) -> set[int]:
+    """Documents with a word within each term's edit budget, found by visiting every document."""
+    terms = inverted_index.tokenize(query)
+    found = set()
+    for i, doc in enumerate(docs):
+        words = set(inverted_index.tokenize(f"{doc['title']} {doc['content']}"))
+        for term in terms:
+            limit = inverted_index.max_edits(term)
+            if term in words or any(inverted_index.edit_distance(term, w, limit) <= limit for w in words if limit):
+                found.add(i)
+                break
+    return found
+
+
+def gzipped_kb(data) -> float:
+    return len(gzip.compress(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode())) / 1024
+
+
+def latencies(fn, queries: list[str]) -> list[float]:
+    out = []
+    for query in queries:
+        t0 = time.perf_counter()
+        fn(query)
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 5_000])
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--vocabulary", type=int, default=20_000)
+    ap.add_argument("--words", type=int, default=1_500, help="words of content per post")
+    ap.add_argument("--no-scan", action="store_true", help="skip the (slow) linear scan")
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    words = synthetic.vocabulary(args.vocabulary, rng)
+    print(
+        f"{'Posts':>7} {'Build':>9} {'Main gz':>9} {'Trunc gz':>9} {'Exact gz':>13} {'Typo gz':>13} "
+        f"{'BM25 p50':>9} {'BM25 p95':>9}" + ("" if args.no_scan else f" {'Scan p50':>9} {'Scan max':>9}")
+    )
+    for size in args.sizes:
+        docs = synthetic.search_docs(size, words, content_words=args.words)
+        t0 = time.perf_counter()
+        index, terms, postings = inverted_index.build(docs)
+        build = time.perf_counter() - t0
+        truncated = [{**doc, "content": " ".join(doc["content"].split()[:100])} for doc in docs]
+        picks = [rng.choice(docs)["content"].split()[rng.randrange(args.words)] for _ in range(args.queries)]
+        queries = [w if n % 2 else typo(w, rng) for n, w in enumerate(picks)]
+        # What each query fetches past the main file, from a fresh Searcher as a page load would start with
+        shard_kb = {
+            "terms": [gzipped_kb(shard) for shard in terms],
+            "postings": [gzipped_kb(shard) for shard in postings],
+        }
+        fetched: list[list[float]] = [[], []]  # typo, exact
+        for n, query in enumerate(queries):
+            fresh = inverted_index.Searcher(index, terms, postings)
+            fresh.prepare(query)
+            fetched[n % 2].append(sum(shard_kb[kind][s] for kind, s in fresh.loaded))
+        searcher = inverted_index.Searcher(index, terms, postings)
+        bm25 = latencies(searcher.search, queries)
+        row = (
+            f"{size:>7} {build:>8.2f}s {gzipped_kb(index):>6.1f} KB {gzipped_kb(truncated):>6.1f} KB "
+            + " ".join(f"{statistics.median(kb):>5.1f}/{max(kb):>5.1f} KB" for kb in fetched[::-1])
+            + f" {statistics.median(bm25):>7.2f}ms "
+            f"{statistics.quantiles(bm25, n=20)[-1]:>7.2f}ms"
+        )
+        if not args.no_scan:
+            sample = queries[: max(1, args.queries // 10)]  # the scan is slow; a tenth of the queries
+            for query in sample:
+                matched = {doc for doc, _ in searcher.search(query)}
+                assert matched <= linear_scan(docs, query), f"index matched documents the scan did not: {query!r}"
+            scan = latencies(lambda q: linear_scan(docs, q), sample)
+            row += f" {statistics.median(scan):>7.2f}ms {max(scan):>7.2f}ms"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
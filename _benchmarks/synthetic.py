@@ -0,0 +1,89 @@
+"""Generate synthetic Jekyll archives for the benchmarks in this folder.
+
+Posts mirror the shape of a real essay (title, date, summary, tags) so the
+front-matter parser does representative work; bodies are repeated lorem ipsum
+padded to the requested size. `search_docs` generates search-index.json entries
+instead, over a Zipf-distributed vocabulary so term frequencies look like prose.
+"""
+
+import random
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+# Benchmarks exercise the same helpers the test suite uses, and the build tools.
+TESTS_DIR = Path(__file__).resolve().parent.parent / "_tests"
+TOOLS_DIR = TESTS_DIR.parent / "_tools"
+for _path in (TESTS_DIR, TOOLS_DIR):
+    if str(_path) not in sys.path:
+        sys.path.insert(0, str(_path))
+
+LOREM = (
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore et "
+    "dolore magna aliqua. Ut enim ad minim veniam, quis nostrud exercitation ullamco laboris nisi ut aliquip ex "
+    "ea commodo consequat.\n\n"
+)
+TAGS = [f"tag{i}" for i in range(40)]
+
+
+def post_text(n: int, body_bytes: int, rng: random.Random, tags: list[str] = TAGS) -> str:
+    tag_lines = "\n".join(f" - {t}" for t in rng.sample(tags, 3))
+    header = (
+        "---\n"
+        "layout: post\n"
+        f"title: Synthetic Essay {n}\n"
+        "summary:\n"
+        f" - p: First paragraph of summary {n}.\n"
+        " - p: Second paragraph of the summary.\n"
+        f"tags:\n{tag_lines}\n"
+        "---\n"
+    )
+    repeats = max(1, body_bytes // len(LOREM))
+    return header + f"# Essay {n}\n\n" + LOREM * repeats
+
+
+def write_archive(docs: Path, posts: int, body_bytes: int = 2_000, seed: int = 0, tag_pool: int = 0) -> list[Path]:
+    """Write `posts` dated posts under docs/_posts and return their paths.
+
+    Each post draws three tags from TAGS, or from `tag_pool` tags when given, so
+    the number of distinct tags can grow with the archive as it does on a real blog.
+    """
+    rng = random.Random(seed)
+    tags = [f"tag{i}" for i in range(tag_pool)] if tag_pool else TAGS
+    out = docs / "_posts"
+    out.mkdir(parents=True, exist_ok=True)
+    start = date(2000, 1, 1)
+    paths = []
+    for n in range(posts):
+        day = start + timedelta(days=n)
+        path = out / f"{day.isoformat()}-synthetic-essay-{n}.md"
+        path.write_text(post_text(n, body_bytes, rng, tags), encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def vocabulary(size: int, rng: random.Random) -> list[str]:
+    """`size` distinct pseudo-words of 2-12 letters."""
+    words: set[str] = set()
+    while len(words) < size:
+        words.add("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 12))))
+    return sorted(words)
+
+
+def search_docs(posts: int, words: list[str], content_words: int = 100, seed: int = 0) -> list[dict]:
+    """`posts` search-index.json entries, newest first, with Zipf-weighted word choice."""
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    start = date(2000, 1, 1)
+    docs = []
+    for n in reversed(range(posts)):
+        day = start + timedelta(days=n)
+        docs.append(
+            {
+                "title": " ".join(rng.choices(words, weights, k=rng.randint(2, 8))).capitalize(),
+                "url": f"/essays/synthetic-essay-{n}/",
+                "date": day.strftime("%B %d, %Y"),
+                "content": " ".join(rng.choices(words, weights, k=content_words)),
+            }
+        )
+    return docs
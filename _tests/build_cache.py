@@ -0,0 +1,186 @@
+"""Decide how much of docs/_site a session that starts its own server must rebuild.
+
+Every input under docs/ (posts, previews, layouts, includes, `_config*.yml`,
+`public/`, pages; everything but the build output and Jekyll's caches) is
+hashed. The hashes are compared with the manifest the last successful build
+recorded in CACHE_PATH. `plan` then picks one of three paths:
+
+- "reuse": nothing changed and the site is still there, so nothing is built.
+  `jekyll serve` gets `--skip-initial-build`.
+- "incremental": only the bodies of at most JEKYLL_INCREMENTAL_MAX_POSTS
+  existing posts or previews changed. Jekyll gets `--incremental` and
+  regenerates those pages. Pages that list posts (index, archive, tags, feed,
+  search JSON) have `regenerate: true` in their front matter, so they are
+  rebuilt too.
+- "full": anything else. That covers a template, config, asset or page change,
+  a post added or removed, or a front-matter edit, since other posts' related
+  lists show titles and dates. A missing site, a different build command, no
+  manifest, or a site that another command (`make serve`, `make preview`) has
+  rebuilt since also force it. Jekyll builds without `--incremental`, so it
+  regenerates every page and leaves `.jekyll-metadata` as it was.
+
+Files whose mtime and size match the manifest keep their recorded hashes, so a
+session only reads what was touched. The manifest also records a fingerprint
+of docs/_site as the build left it: the path, mtime and size of every file in
+it. Any other Jekyll run that writes there changes it, so the site is only
+reused if it is still the output of the recorded build. The manifest is deleted before each build
+and written only after it succeeds, so an interrupted build never passes for a
+current one. JEKYLL_BUILD_CACHE=<path> relocates the manifest; "off" always
+does a full build.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import discovery
+from constants import JEKYLL_INCREMENTAL_MAX_POSTS
+
+REPO = Path(__file__).resolve().parent.parent
+DOCS = REPO / "docs"
+SITE = DOCS / "_site"
+CACHE_VERSION = 2
+# Build manifest: JEKYLL_BUILD_CACHE=<path> to relocate, "off" to disable.
+_CACHE_SETTING = os.environ.get("JEKYLL_BUILD_CACHE", "").strip()
+CACHE_PATH: Path | None = Path(_CACHE_SETTING) if _CACHE_SETTING else REPO / ".pytest_cache" / "jekyll" / "build.json"
+if _CACHE_SETTING.lower() in ("0", "off", "false"):
+    CACHE_PATH = None
+
+OUTPUTS = {"_site", ".jekyll-cache", ".jekyll-metadata", ".sass-cache"}  # under docs/, never inputs
+INCREMENTAL_DIRS = ("_posts", "_previews")
+VARIANTS = (".gz", ".br")  # written next to the output by static_site.precompress, not by Jekyll
+
+
+@dataclass
+class Plan:
+    action: str  # "reuse", "incremental" or "full"
+    reason: str
+    changed: list[str] = field(default_factory=list)
+    inputs: dict[str, dict] = field(default_factory=dict)  # recorded once the build succeeds
+
+    def describe(self) -> str:
+        if self.action == "reuse":
+            return "reused docs/_site (no input changed)"
+        if self.action == "incremental":
+            return f"incremental build ({len(self.changed)} changed: {', '.join(self.changed)})"
+        return f"full build ({self.reason})"
+
+
+def _files(docs: Path):
+    for dirpath, dirnames, filenames in os.walk(docs):
+        if Path(dirpath) == docs:
+            dirnames[:] = [d for d in dirnames if d not in OUTPUTS]
+        for name in filenames:
+            path = Path(dirpath) / name
+            if path.parent != docs or name not in OUTPUTS:
+                yield path
+
+
+def input_hashes(docs: Path = DOCS, previous: dict[str, dict] | None = None) -> dict[str, dict]:
+    """relative path -> {mtime_ns, size, sha, fm} for every input under `docs`.
+
+    `fm` is a digest of the front-matter block (None without one). Entries whose
+    mtime and size match `previous` are carried over without reading the file.
+    """
+    previous = previous or {}
+    inputs = {}
+    for path in _files(docs):
+        rel = path.relative_to(docs).as_posix()
+        stat = path.stat()
+        old = previous.get(rel)
+        if old and old["mtime_ns"] == stat.st_mtime_ns and old["size"] == stat.st_size:
+            inputs[rel] = old
+            continue
+        header = discovery.read_header(path)
+        inputs[rel] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha": hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest(),
+            "fm": hashlib.blake2b(header.encode("utf-8"), digest_size=16).hexdigest() if header is not None else None,
+        }
+    return inputs
+
+
+def output_fingerprint(site: Path = SITE) -> str:
+    """A digest of the path, mtime and size of every file Jekyll wrote under `site`."""
+    digest = hashlib.blake2b(digest_size=16)
+    for dirpath, _, filenames in sorted(os.walk(site)):
+        for name in sorted(filenames):
+            path = Path(dirpath) / name
+            if path.suffix in VARIANTS:
+                continue
+            stat = path.stat()
+            digest.update(f"{path.relative_to(site).as_posix()}\0{stat.st_mtime_ns}\0{stat.st_size}\n".encode())
+    return digest.hexdigest()
+
+
+def load(path: Path | None = CACHE_PATH) -> dict | None:
+    if path is None:
+        return None
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return data if data.get("version") == CACHE_VERSION else None
+
+
+def plan(
+    command: str,
+    docs: Path = DOCS,
+    site: Path = SITE,
+    path: Path | None = CACHE_PATH,
+    max_posts: int = JEKYLL_INCREMENTAL_MAX_POSTS,
+) -> Plan:
+    """How to bring `site` up to date for a build run as `command`."""
+    if path is None:
+        return Plan("full", "JEKYLL_BUILD_CACHE=off")
+    previous = load(path)
+    inputs = input_hashes(docs, previous["inputs"] if previous else None)
+    if previous is None:
+        return Plan("full", "no previous build recorded", inputs=inputs)
+    if previous["command"] != command:
+        return Plan("full", "the build command changed", inputs=inputs)
+    if not (site / "index.html").is_file():
+        return Plan("full", f"{site.name} is missing", inputs=inputs)
+    if previous.get("output") != output_fingerprint(site):
+        return Plan("full", f"{site.name} was rebuilt by another command", inputs=inputs)
+
+    old = previous["inputs"]
+    added, removed = sorted(inputs.keys() - old.keys()), sorted(old.keys() - inputs.keys())
+    modified = sorted(rel for rel in inputs.keys() & old.keys() if inputs[rel]["sha"] != old[rel]["sha"])
+    changed = added + removed + modified
+    if not changed:
+        return Plan("reuse", "no input changed", inputs=inputs)
+    others = [rel for rel in changed if not rel.startswith(tuple(f"{d}/" for d in INCREMENTAL_DIRS))]
+    if others:
+        return Plan("full", f"{_sample(others)} changed", changed, inputs)
+    if added or removed:
+        return Plan("full", f"posts added or removed: {_sample(added + removed)}", changed, inputs)
+    front_matter = [rel for rel in modified if inputs[rel]["fm"] != old[rel]["fm"]]
+    if front_matter:
+        return Plan("full", f"front matter changed: {_sample(front_matter)}", changed, inputs)
+    if len(modified) > max_posts:
+        return Plan("full", f"{len(modified)} posts changed (incremental up to {max_posts})", changed, inputs)
+    return Plan("incremental", f"{len(modified)} posts changed", changed, inputs)
+
+
+def _sample(paths: list[str], limit: int = 3) -> str:
+    more = f" and {len(paths) - limit} more" if len(paths) > limit else ""
+    return ", ".join(paths[:limit]) + more
+
+
+def invalidate(path: Path | None = CACHE_PATH) -> None:
+    """Forget the recorded build; called before building, so a failed build is never reused."""
+    if path is not None:
+        path.unlink(missing_ok=True)
+
+
+def record(plan: Plan, command: str, path: Path | None = CACHE_PATH, site: Path = SITE) -> None:
+    """Save the inputs `plan` was made from, and the `site` they built, as the current build of `command`."""
+    if path is None:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {"version": CACHE_VERSION, "command": command, "inputs": plan.inputs, "output": output_fingerprint(site)}
+    path.write_text(json.dumps(data), encoding="utf-8")
@@ -1,11 +1,9 @@
-import os
-import signal
-import subprocess
-import sys
-import time
-
 import discovery
+import jekyll
+import perf
+import perf_report
 import pytest
+from perf_baseline import BaselineStore
 
 
 @pytest.fixture
@@ -32,74 +30,29 @@ def jekyll_server():
     Start Jekyll server before tests, stop after.
 
     In CI, Jekyll is started separately, so we just return the URL.
-    Locally, we start and stop the server.
+    Locally, we start the server, wait until it answers (see jekyll.py), and
+    stop it afterwards. Under pytest-xdist the workers share one server.
     """
-    base_url = os.environ.get("JEKYLL_URL", "http://localhost:4000")
+    with jekyll.shared() as base_url:
+        yield base_url
 
-    # Check if server is already running (CI environment)
-    import urllib.request
 
-    try:
-        urllib.request.urlopen(base_url, timeout=2)
-        # Server already running, just return URL
-        yield base_url
-        return
-    except Exception:
-        pass
-
-    # Start server locally
-    if sys.platform == "win32":
-        proc = subprocess.Popen(
-            [
-                "bundle",
-                "exec",
-                "jekyll",
-                "serve",
-                "--source",
-                "docs",
-                "--destination",
-                "docs/_site",
-                "--port",
-                "4000",
-            ],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
-    else:
-        proc = subprocess.Popen(
-            [
-                "bundle",
-                "exec",
-                "jekyll",
-                "serve",
-                "--source",
-                "docs",
-                "--destination",
-                "docs/_site",
-                "--port",
-                "4000",
-            ],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            preexec_fn=os.setsid,
-        )
+@pytest.fixture(scope="session")
+def perf_store(jekyll_server, browser_context_args):
+    """Page timings shared by every perf test; each (page, iterations) is measured once.
 
-    # Wait for server to start
-    for _ in range(10):
-        time.sleep(1)
-        try:
-            urllib.request.urlopen(base_url, timeout=2)
-            break
-        except Exception:
-            continue
+    Set PERF_FRESH=1 to re-measure on every request instead. Everything it
+    measured is saved as a per-run results file when the session ends.
+    """
+    store = perf.MetricsStore(jekyll_server, browser_context_args, fresh=perf.FRESH)
+    yield store
+    perf_report.LAST_WRITTEN = perf_report.write_results(store)
 
-    yield base_url
 
-    # Cleanup
-    if sys.platform == "win32":
-        proc.terminate()
-    else:
-        os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
+@pytest.fixture(scope="session")
+def perf_baseline():
+    """Recorded per-page timing distributions that regressions are measured against."""
+    return BaselineStore()
 
 
 @pytest.fixture(scope="session")
@@ -110,3 +63,12 @@ def browser_type_launch_args():
 @pytest.fixture(scope="session")
 def browser_context_args():
     return {"viewport": {"width": 1280, "height": 720}}
+
+
+def pytest_terminal_summary(terminalreporter):
+    if jekyll.LAST_STARTUP is not None:
+        terminalreporter.write_line(jekyll.LAST_STARTUP.summary())
+    if perf_report.LAST_WRITTEN is not None:
+        terminalreporter.write_line(
+            f"perf results: {perf_report.LAST_WRITTEN} (python _tests/perf_report.py for trends)"
+        )
@@ -16,7 +16,8 @@ ANIMATION_TIMEOUT = 400
 # =============================================================================
 
 # Performance thresholds (milliseconds) - based on Core Web Vitals research
-# Stricter for local testing since no network latency
+# Stricter for local testing since no network latency. These are budgets for
+# loads in PERF_BUDGET_MODE (cold: a first visit with an empty HTTP cache).
 PERF_THRESHOLDS = {
     "ttfb_avg": 100,
     "ttfb_p90": 200,
@@ -24,21 +25,181 @@ PERF_THRESHOLDS = {
     "dom_content_loaded_p90": 800,
     "load_complete_avg": 1000,
     "load_complete_p90": 1500,
+    # Core Web Vitals, p90 only; well inside the field "good" limits
+    # (LCP 2.5 s, FCP 1.8 s, CLS 0.1, INP 200 ms) as local loads have no network
+    "lcp_p90": 1200,
+    "fcp_p90": 900,
+    "cls_p90": 0.05,
+    "inp_p90": 100,
+    "tbt_p90": 100,
 }
 
+# Third-party assets the site loads (head.html, default.html). Perf contexts
+# serve vendored copies from fixtures/third_party instead (see third_party.py);
+# every host the assets touch is intercepted, beacon hosts get an empty 204, and
+# each stand-in response is delayed by PERF_THIRD_PARTY_LATENCY ms
+PERF_THIRD_PARTY_ASSETS = [
+    "https://cdn.jsdelivr.net/npm/fuse.js@7.0.0/dist/fuse.min.js",
+    "https://fonts.googleapis.com/css?family=PT+Serif:400,400italic,700%7CPT+Sans:400",
+    "https://gc.zgo.at/count.js",
+]
+PERF_THIRD_PARTY_HOSTS = ("cdn.jsdelivr.net", "fonts.googleapis.com", "fonts.gstatic.com", "gc.zgo.at")
+PERF_THIRD_PARTY_BEACONS = ("jrmylow-gc.goatcounter.com",)
+PERF_THIRD_PARTY_LATENCY = 20  # a nearby CDN edge
+
 # Pages to test - stable pages only; test_performance appends a real post at runtime
 PERF_STABLE_PAGES = ["/", "/about/", "/contact/", "/essays/"]
 
+# Cache state of measured loads (see perf.py): "cold" = fresh browser context
+# per load, "warm" = page primed once then served from cache, "mixed" = one
+# context reused without priming (first load cold, rest warm).
+PERF_MODES = ("cold", "warm", "mixed")
+PERF_BUDGET_MODE = "cold"  # the mode PERF_THRESHOLDS are asserted against
+PERF_REPORT_MODES = ("cold", "warm")  # modes shown side by side in per-page results
+
 # Number of iterations per page for statistical significance
 PERF_ITERATIONS = 10
 
+# Percentiles tracked for every metric (interpolated between closest ranks),
+# and how many samples per metric are kept for exact percentiles before the
+# stats switch to constant-memory streaming estimates
+PERF_PERCENTILES = (50, 90, 95, 99)
+PERF_STATS_EXACT_LIMIT = 1000
+
 # Absolute maximum for any single page load (outlier detection)
 PERF_MAX_LOAD_TIME = 3000
 
+# Device profiles the page-load tests are parametrized over (see perf.py).
+# "context" is merged over the session's browser context args; cpu_slowdown is
+# the CDP Emulation.setCPUThrottlingRate factor; network is the CDP
+# Network.emulateNetworkConditions setting (latency ms, throughput bytes/s), or
+# None for the unthrottled local loopback. mid-mobile follows Lighthouse's
+# mobile defaults (a mid-tier phone on slow 4G); slow-3g is DevTools' "Slow 3G"
+# preset on a low-end phone.
+PERF_PROFILES = {
+    "desktop": {
+        "context": {"viewport": {"width": 1280, "height": 720}},
+        "cpu_slowdown": 1,
+        "network": None,
+    },
+    "mid-mobile": {
+        "context": {
+            "viewport": {"width": 412, "height": 823},
+            "device_scale_factor": 1.75,
+            "is_mobile": True,
+            "has_touch": True,
+        },
+        "cpu_slowdown": 4,
+        "network": {"latency": 150, "download": 1_600_000 // 8, "upload": 750_000 // 8},
+    },
+    "slow-3g": {
+        "context": {
+            "viewport": {"width": 360, "height": 640},
+            "device_scale_factor": 2,
+            "is_mobile": True,
+            "has_touch": True,
+        },
+        "cpu_slowdown": 6,
+        "network": {"latency": 2000, "download": 400_000 // 8, "upload": 400_000 // 8},
+    },
+}
+PERF_DEFAULT_PROFILE = "desktop"
+
+# Budgets per profile; desktop is PERF_THRESHOLDS. Throttled budgets sit at the
+# field "good" limits for mid-mobile and are looser still on slow 3G, where
+# every request costs a 2 s round trip. load_complete_max is the single-load ceiling
+# (PERF_MAX_LOAD_TIME on desktop).
+PERF_PROFILE_THRESHOLDS = {
+    "desktop": {**PERF_THRESHOLDS, "load_complete_max": PERF_MAX_LOAD_TIME, "search_first_result_p90": 1000},
+    "mid-mobile": {
+        "ttfb_avg": 400,
+        "ttfb_p90": 600,
+        "dom_content_loaded_avg": 2000,
+        "dom_content_loaded_p90": 2500,
+        "load_complete_avg": 3500,
+        "load_complete_p90": 4500,
+        "lcp_p90": 2500,
+        "fcp_p90": 1800,
+        "cls_p90": 0.1,
+        "inp_p90": 200,
+        "tbt_p90": 300,
+        "load_complete_max": 8000,
+        "search_first_result_p90": 3000,
+    },
+    "slow-3g": {
+        "ttfb_avg": 2500,
+        "ttfb_p90": 3000,
+        "dom_content_loaded_avg": 9000,
+        "dom_content_loaded_p90": 11000,
+        "load_complete_avg": 14000,
+        "load_complete_p90": 17000,
+        "lcp_p90": 12000,
+        "fcp_p90": 10000,
+        "cls_p90": 0.1,
+        "inp_p90": 300,
+        "tbt_p90": 600,
+        "load_complete_max": 30000,
+        "search_first_result_p90": 15000,
+    },
+}
+
+# Page loads in flight at once, each in its own browser context
+PERF_CONCURRENCY = 4
+
+# Serial loads per page used to check that concurrency did not skew timings,
+# and the concurrent/serial median load ratio above which a page is flagged
+PERF_SKEW_SAMPLES = 3
+PERF_SKEW_TOLERANCE = 1.25
+
+# Statistical regression check against a recorded baseline (perf_baseline.py):
+# a metric regresses when a one-sided Mann-Whitney test is significant at ALPHA
+# and the Hodges-Lehmann shift exceeds MIN_EFFECT of the baseline median
+PERF_REGRESSION_METRICS = ("ttfb", "dom_content_loaded", "load_complete")
+PERF_REGRESSION_ALPHA = 0.01
+PERF_REGRESSION_MIN_EFFECT = 0.10
+PERF_BASELINE_MIN_SAMPLES = 5
+PERF_BASELINE_MAX_SAMPLES = 200
+
+# Per-run results and the trend report (perf_report.py): a page/profile/mode is
+# drifting when the median of a metric in the latest run exceeds the median of
+# the previous PERF_DRIFT_WINDOW runs by more than PERF_DRIFT_TOLERANCE
+PERF_TREND_METRICS = ("load_complete", "lcp", "ttfb")
+PERF_DRIFT_WINDOW = 5
+PERF_DRIFT_TOLERANCE = 0.10
+
+# Outlier loads get a traced re-run (profiling.py): at most PERF_TRACE_LIMIT
+# pages per failing test, summarised to the PERF_TRACE_TOP longest tasks/functions
+PERF_TRACE_LIMIT = 3
+PERF_TRACE_TOP = 10
+
+# Cold loads of /search/?q=... timed to the first rendered results
+# (search_first_result_p90 above; the query is PERF_SEARCH_QUERY)
+PERF_SEARCH_ITERATIONS = 5
+PERF_SEARCH_QUERY = "the"
+
 # Resource limits
 PERF_MAX_RESOURCES = 20
 PERF_MAX_TRANSFER_BYTES = 500 * 1024  # 500KB
 PERF_MAX_DOM_NODES = 1500
+# Critical request chains (waterfall.py): head.html has six stylesheets plus the
+# Google Fonts CSS blocking first paint, each one link below the document
+PERF_MAX_RENDER_BLOCKING = 8
+PERF_MAX_CHAIN_DEPTH = 2  # document -> blocking request; 3 means an @import-style extra round trip
+
+# =============================================================================
+# Jekyll Server
+# =============================================================================
+
+# Startup of a spawned `jekyll serve` (jekyll.py): the overall deadline to build
+# and answer, and the readiness probe's exponential backoff (first delay, cap),
+# all in seconds
+JEKYLL_STARTUP_TIMEOUT = 300
+JEKYLL_PROBE_INITIAL_DELAY = 0.05
+JEKYLL_PROBE_MAX_DELAY = 2.0
+
+# Most changed posts a session rebuilds with `--incremental` (build_cache.py);
+# past this, or on any other kind of change, it does a full build
+JEKYLL_INCREMENTAL_MAX_POSTS = 20
 
 # =============================================================================
 # CSS Selectors
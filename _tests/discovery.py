@@ -13,16 +13,31 @@ Assumes essays don't use post categories (none do); a categorised post would get
 a different pretty URL than the derivation here.
 """
 
+import hashlib
+import json
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime
 from pathlib import Path
 
 import pytest
 import yaml
 
-DOCS = Path(__file__).resolve().parent.parent / "docs"
+REPO = Path(__file__).resolve().parent.parent
+DOCS = REPO / "docs"
 DOC_SUFFIXES = {".md", ".markdown", ".html"}
 _FILENAME_RE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})-(.+)\.(?:md|markdown|html)$")
 
+# libyaml-backed loader when PyYAML was built with it; same safe subset, ~10x faster.
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Opt-in parallel parsing for large archives: DISCOVERY_WORKERS=N or "auto".
+# Below _PARALLEL_MIN uncached files a process pool costs more than it saves.
+DISCOVERY_WORKERS = os.environ.get("DISCOVERY_WORKERS", "")
+_PARALLEL_MIN = 256
+
 
 def _slugify(title: str) -> str:
     s = re.sub(r"[^\w\s-]", "", title.strip().lower())
@@ -30,27 +45,273 @@ def _slugify(title: str) -> str:
     return re.sub(r"-+", "-", s).strip("-")
 
 
-def _front_matter(path: Path) -> dict:
-    """Parse a file's YAML front-matter block, or {} if absent/invalid."""
+# --- Front-matter cache -------------------------------------------------------
+#
+# str(path) -> ((st_mtime_ns, st_size), header digest, front matter). Module-level so
+# every test module that imports discovery shares one parse per document per
+# session, and mirrored to INDEX_PATH so the next session only re-parses files
+# that changed. A file whose mtime/size moved but whose header digest did not
+# (a `git checkout`, a body-only edit) reuses its parse without touching YAML.
+_FM_CACHE: dict[str, tuple[tuple[int, int] | None, str, dict]] = {}
+
+# Persistent index: DISCOVERY_INDEX=<path> to relocate, "off" to disable.
+_INDEX_SETTING = os.environ.get("DISCOVERY_INDEX", "").strip()
+INDEX_PATH: Path | None = (
+    Path(_INDEX_SETTING) if _INDEX_SETTING else REPO / ".pytest_cache" / "discovery" / "index.json"
+)
+if _INDEX_SETTING.lower() in ("0", "off", "false"):
+    INDEX_PATH = None
+INDEX_VERSION = 1
+_index_loaded = False
+_index_dirty = False
+_index_trusted = True  # whether index entries may be matched by mtime/size alone
+_index_keys: set[str] = set()
+
+
+def invalidate(path: Path | None = None) -> None:
+    """Drop the cached front matter for `path`, or for every file if None.
+
+    Stale entries are already detected by mtime/size; this is for callers that
+    rewrite a file within the filesystem's timestamp resolution. The manifest
+    is always dropped, since any file may have been added, moved or retagged.
+    Dropping everything also stops trusting the on-disk index by mtime/size
+    for one reload: the next lookup reloads it, but each entry is only reused
+    once the file's header digest matches, so a same-size rewrite is still
+    seen. Entries verified that way are trusted by mtime/size again.
+    """
+    global _MANIFEST, _index_loaded, _index_dirty, _index_trusted
+    _MANIFEST = None
+    if path is None:
+        _FM_CACHE.clear()
+        _index_loaded = False
+        _index_trusted = False
+    else:
+        _FM_CACHE.pop(str(path), None)
+        _index_dirty = True
+
+
+def reset() -> None:
+    """Forget everything held in memory, as a new session would; only the on-disk index survives.
+
+    Unlike invalidate(), the index is trusted again, so the next lookup is a warm start.
+    """
+    global _MANIFEST, _index_loaded, _index_dirty, _index_trusted
+    _FM_CACHE.clear()
+    _index_keys.clear()
+    _MANIFEST = None
+    _index_loaded = _index_dirty = False
+    _index_trusted = True
+
+
+def _stat_key(path: Path) -> tuple[int, int] | None:
     try:
-        text = path.read_text(encoding="utf-8", errors="ignore")
+        st = path.stat()
     except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _digest(header: str | None) -> str:
+    return hashlib.blake2b((header or "").encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _parse_entry(path: Path) -> tuple[str, dict]:
+    """(header digest, front matter) for one file; picklable for the pool."""
+    header = read_header(path)
+    return _digest(header), _parse_header(header) or {}
+
+
+def _front_matter(path: Path) -> dict:
+    """Front matter for `path`, parsed at most once per (mtime, size)."""
+    global _index_dirty
+    _load_index()
+    key = _stat_key(path)
+    if key is None:
+        _FM_CACHE.pop(str(path), None)
         return {}
-    if not text.startswith("---"):
-        return {}
-    parts = text.split("---", 2)  # ['', '<yaml>', '<body>']
-    if len(parts) < 3:
-        return {}
+    hit = _FM_CACHE.get(str(path))
+    if hit is not None and hit[0] == key:
+        return hit[2]
+    header = read_header(path)
+    digest = _digest(header)
+    data = hit[2] if hit is not None and hit[1] == digest else _parse_header(header) or {}
+    _FM_CACHE[str(path)] = (key, digest, data)
+    _index_dirty = True
+    return data
+
+
+def _worker_count(setting: str) -> int:
+    if setting.strip().lower() == "auto":
+        return os.cpu_count() or 1
+    try:
+        return max(int(setting), 0)
+    except ValueError:
+        return 0
+
+
+def _prime_parallel(paths: list[Path], workers: int) -> None:
+    """Parse every uncached path in a process pool and fill _FM_CACHE.
+
+    pool.map preserves input order, so results pair back to their paths
+    deterministically; chunking keeps pickling overhead per task low.
+    """
+    global _index_dirty
+    if workers < 2 or len(paths) < _PARALLEL_MIN:
+        return
+    _load_index()
+    keys = {p: _stat_key(p) for p in paths}
+    misses = [p for p, k in keys.items() if k is not None and _FM_CACHE.get(str(p), (None,))[0] != k]
+    if len(misses) < _PARALLEL_MIN:
+        return
+    chunksize = max(1, len(misses) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for p, (digest, data) in zip(misses, pool.map(_parse_entry, misses, chunksize=chunksize)):
+            _FM_CACHE[str(p)] = (keys[p], digest, data)
+    _index_dirty = True
+
+
+# --- Persistent index ---------------------------------------------------------
+
+
+def _index_tag() -> str:
+    """Entries are only trusted if written by the same format, PyYAML and loader."""
+    return f"{INDEX_VERSION}:{yaml.__version__}:{_YAML_LOADER.__name__}"
+
+
+def _encode(obj):
+    # YAML front matter yields dates; JSON needs them tagged to round-trip.
+    if isinstance(obj, datetime):
+        return {"__datetime__": obj.isoformat()}
+    if isinstance(obj, date):
+        return {"__date__": obj.isoformat()}
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+def _decode(obj: dict):
+    if len(obj) == 1:
+        if "__datetime__" in obj:
+            return datetime.fromisoformat(obj["__datetime__"])
+        if "__date__" in obj:
+            return date.fromisoformat(obj["__date__"])
+    return obj
+
+
+def _load_index() -> None:
+    """Seed _FM_CACHE from INDEX_PATH once; a missing or foreign index is ignored.
+
+    After an explicit invalidate() the entries are seeded without their stat
+    keys, so each is reused only if its header digest still matches. Later
+    reloads trust the index again.
+    """
+    global _index_loaded, _index_trusted
+    if _index_loaded:
+        return
+    _index_loaded = True
+    trusted, _index_trusted = _index_trusted, True
+    if INDEX_PATH is None:
+        return
+    try:
+        raw = json.loads(INDEX_PATH.read_text(encoding="utf-8"), object_hook=_decode)
+        if raw.get("tag") != _index_tag():
+            return
+        prefix = str(DOCS) + os.sep
+        for rel, e in raw["files"].items():
+            # An untrusted entry gets no stat key, so _front_matter checks its digest before reuse.
+            key = (e["mtime_ns"], e["size"]) if trusted else None
+            _FM_CACHE.setdefault(prefix + rel.replace("/", os.sep), (key, e["digest"], e["fm"]))
+            _index_keys.add(rel)
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return
+
+
+def _serializable(data: dict) -> bool:
+    try:
+        json.dumps(data, default=_encode)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def save_index(paths: list[Path]) -> None:
+    """Write the cached entries for `paths` to INDEX_PATH, if anything changed.
+
+    Files outside DOCS and front matter JSON cannot represent are left out
+    (they are simply re-parsed next time). The write is atomic, so concurrent
+    sessions can never observe a torn index.
+    """
+    global _index_dirty, _index_keys
+    if INDEX_PATH is None:
+        return
+    prefix = str(DOCS) + os.sep
+    rels = {path: str(path)[len(prefix) :].replace(os.sep, "/") for path in paths if str(path).startswith(prefix)}
+    if not _index_dirty and set(rels.values()) == _index_keys:
+        return
+    entries = {}
+    for path, rel in rels.items():
+        hit = _FM_CACHE.get(str(path))
+        if hit is None or hit[0] is None:  # never looked up since an untrusted reload
+            continue
+        (mtime_ns, size), digest, data = hit
+        entries[rel] = {"mtime_ns": mtime_ns, "size": size, "digest": digest, "fm": data}
+    try:
+        text = json.dumps({"tag": _index_tag(), "files": entries}, default=_encode)
+    except (TypeError, ValueError):
+        entries = {rel: e for rel, e in entries.items() if _serializable(e["fm"])}
+        text = json.dumps({"tag": _index_tag(), "files": entries}, default=_encode)
+    tmp = INDEX_PATH.with_name(f"{INDEX_PATH.name}.{os.getpid()}.tmp")
+    try:
+        INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, INDEX_PATH)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        return
+    _index_dirty, _index_keys = False, set(entries)
+
+
+# --- Front-matter reader ------------------------------------------------------
+
+
+def read_header(path: Path) -> str | None:
+    """The raw YAML between the opening and closing `---` fences, or None.
+
+    Reads line by line and stops at the closing fence, so a long essay body is
+    never loaded just to look at its front matter.
+    """
+    lines = []
     try:
-        data = yaml.safe_load(parts[1])
+        with path.open(encoding="utf-8", errors="ignore") as f:
+            if f.readline().rstrip() != "---":
+                return None
+            for line in f:
+                if line.rstrip() in ("---", "..."):
+                    return "".join(lines)
+                lines.append(line)
+    except OSError:
+        return None
+    return None  # unterminated block: Jekyll treats the file as plain content
+
+
+def _parse_header(header: str | None) -> dict | None:
+    if header is None:
+        return None
+    try:
+        data = yaml.load(header, Loader=_YAML_LOADER)
     except yaml.YAMLError:
-        return {}
-    return data if isinstance(data, dict) else {}
+        return None
+    return data if isinstance(data, dict) else None
 
 
-def url_for(path: Path) -> str | None:
-    """The URL Jekyll will serve this document at, or None if underivable."""
-    explicit = _front_matter(path).get("permalink")
+def read_front_matter(path: Path) -> dict | None:
+    """Parse a file's YAML front-matter block, or None if absent/invalid."""
+    return _parse_header(read_header(path))
+
+
+# --- Documents ----------------------------------------------------------------
+
+
+def _url_from(path: Path, fm: dict) -> str | None:
+    explicit = fm.get("permalink")
     if isinstance(explicit, str) and explicit.startswith("/"):
         return explicit if explicit.endswith("/") else explicit + "/"
     m = _FILENAME_RE.match(path.name)
@@ -60,23 +321,140 @@ def url_for(path: Path) -> str | None:
     return f"/{yyyy}/{mm}/{dd}/{_slugify(title)}/"
 
 
-def _docs_in(dirname: str) -> list[Path]:
-    d = DOCS / dirname
-    if not d.is_dir():
+def url_for(path: Path) -> str | None:
+    """The URL Jekyll will serve this document at, or None if underivable."""
+    return _url_from(path, _front_matter(path))
+
+
+def _date_from(path: Path, fm: dict) -> date | None:
+    """Front-matter `date` if YAML parsed it as one, else the filename date."""
+    value = fm.get("date")
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    m = _FILENAME_RE.match(path.name)
+    if not m:
+        return None
+    try:
+        return date(*(int(g) for g in m.groups()[:3]))
+    except ValueError:
+        return None
+
+
+def _tags_from(fm: dict) -> tuple[str, ...]:
+    tags = fm.get("tags") or []
+    if isinstance(tags, str):
+        tags = [tags]
+    if not isinstance(tags, list):
+        return ()
+    return tuple(t.strip() for t in tags if isinstance(t, str) and t.strip())
+
+
+# --- Manifest -----------------------------------------------------------------
+
+# collection name -> source folder under docs/
+COLLECTIONS = {"posts": "_posts", "previews": "_previews"}
+
+
+@dataclass(frozen=True, slots=True)
+class Document:
+    """What the tests need to know about one post or preview."""
+
+    path: Path
+    collection: str
+    url: str | None
+    date: date | None
+    tags: tuple[str, ...]
+    tagged: bool  # `tags:` is set at all, even to values `tags` cannot hold
+    permalink: str | None
+
+
+class ContentManifest:
+    """Every post and preview, scanned and parsed once, with lookup indexes.
+
+    Documents are ordered by collection (as in COLLECTIONS) then by path, so
+    views over the manifest keep the sorted-by-filename order the tests expect.
+    """
+
+    def __init__(self, documents: list[Document]):
+        self.documents = tuple(documents)
+        self.by_url: dict[str, Document] = {}
+        self.by_tag: dict[str, list[Document]] = {}
+        self._by_collection: dict[str, list[Document]] = {name: [] for name in COLLECTIONS}
+        for doc in self.documents:
+            self._by_collection.setdefault(doc.collection, []).append(doc)
+            if doc.url:
+                self.by_url.setdefault(doc.url, doc)
+            for tag in doc.tags:
+                self.by_tag.setdefault(tag, []).append(doc)
+
+    @classmethod
+    def build(cls, docs: Path = DOCS, workers: int = 0) -> "ContentManifest":
+        """One directory scan per collection and one front-matter parse per file.
+
+        With workers > 1, uncached files are parsed in a process pool first;
+        the records are still assembled serially in path order.
+        """
+        found = [(c, p) for c, dirname in COLLECTIONS.items() for p in _docs_in(docs / dirname)]
+        _prime_parallel([p for _, p in found], workers)
+        return cls([_document(p, c, _front_matter(p)) for c, p in found])
+
+    def collection(self, name: str) -> list[Document]:
+        return self._by_collection.get(name, [])
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+
+def _document(path: Path, collection: str, fm: dict) -> Document:
+    permalink = fm.get("permalink")
+    return Document(
+        path=path,
+        collection=collection,
+        url=_url_from(path, fm),
+        date=_date_from(path, fm),
+        tags=_tags_from(fm),
+        tagged=bool(fm.get("tags")),
+        permalink=permalink if isinstance(permalink, str) else None,
+    )
+
+
+def _docs_in(d: Path) -> list[Path]:
+    try:
+        entries = os.scandir(d)
+    except OSError:
         return []
-    return sorted(p for p in d.iterdir() if p.is_file() and p.suffix in DOC_SUFFIXES)
+    with entries:  # scandir's cached d_type spares a stat per file
+        found = sorted(e.path for e in entries if e.is_file() and os.path.splitext(e.name)[1] in DOC_SUFFIXES)
+    return [Path(p) for p in found]
+
+
+_MANIFEST: ContentManifest | None = None
+
+
+def manifest() -> ContentManifest:
+    """The session-wide manifest for DOCS, built on first use."""
+    global _MANIFEST
+    if _MANIFEST is None:
+        _MANIFEST = ContentManifest.build(DOCS, workers=_worker_count(DISCOVERY_WORKERS))
+        save_index([d.path for d in _MANIFEST.documents])
+    return _MANIFEST
+
+
+# --- Views --------------------------------------------------------------------
 
 
 def post_paths() -> list[Path]:
-    return _docs_in("_posts")
+    return [d.path for d in manifest().collection("posts")]
 
 
 def preview_paths() -> list[Path]:
-    return _docs_in("_previews")
+    return [d.path for d in manifest().collection("previews")]
 
 
 def post_urls() -> list[str]:
-    return [u for p in post_paths() if (u := url_for(p))]
+    return [d.url for d in manifest().collection("posts") if d.url]
 
 
 def post_tags() -> list[str]:
@@ -85,26 +463,21 @@ def post_tags() -> list[str]:
     Scoped to _posts because the tag cloud and search index are built from
     site.posts; previews are excluded from both.
     """
-    seen = set()
-    for p in post_paths():
-        tags = _front_matter(p).get("tags") or []
-        if isinstance(tags, str):
-            tags = [tags]
-        seen.update(t.strip() for t in tags if isinstance(t, str) and t.strip())
-    return sorted(seen)
+    return sorted(tag for tag, docs in manifest().by_tag.items() if any(d.collection == "posts" for d in docs))
 
 
 def preview_urls() -> list[str]:
-    return [u for p in preview_paths() if (u := url_for(p))]
+    return [d.url for d in manifest().collection("previews") if d.url]
 
 
 def tagged_post_urls() -> list[str]:
-    """Posts and previews whose front matter declares at least one tag."""
-    out = []
-    for p in post_paths() + preview_paths():
-        if _front_matter(p).get("tags") and (u := url_for(p)):
-            out.append(u)
-    return out
+    """Posts and previews whose front matter declares at least one tag.
+
+    Any non-empty `tags:` counts, including a number or a list of non-strings
+    that `Document.tags` drops: Jekyll still renders those pages' tag markup.
+    """
+    m = manifest()
+    return [d.url for name in ("posts", "previews") for d in m.collection(name) if d.tagged and d.url]
 
 
 def params(urls: list[str], label: str):
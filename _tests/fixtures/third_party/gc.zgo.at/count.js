@@ -0,0 +1,4 @@
+// Offline stand-in for GoatCounter's count.js (see _tests/third_party.py).
+// Perf runs must not record page views, so this only defines the global the
+// real script would and sends nothing.
+window.goatcounter = window.goatcounter || {count: function () {}, url: function () { return ''; }};
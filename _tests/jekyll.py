@@ -0,0 +1,408 @@
+"""Start `jekyll serve` for the suite and wait until it is really serving.
+
+A server already answering at JEKYLL_URL is reused (the container and CI
+case). Otherwise `serve` spawns `bundle exec jekyll serve` and follows its
+output on a thread. Jekyll prints "done in X seconds." when the build finishes
+and "Server running..." once it listens. Until then the readiness probe backs
+off exponentially from JEKYLL_PROBE_INITIAL_DELAY to JEKYLL_PROBE_MAX_DELAY.
+When "Server running" appears, the wait is cut short and the backoff restarts,
+so a small site is probed within milliseconds of coming up. A large archive
+can build for as long as JEKYLL_STARTUP_TIMEOUT allows. Ruby may block-buffer a
+pipe, so the markers are only a hint: readiness is an HTTP response. If the
+process exits or the deadline passes first, startup fails with the tail of
+Jekyll's output.
+
+JEKYLL_SERVER=static replaces `jekyll serve` with one `jekyll build` into
+docs/_site. The built site is then precompressed and served by the threaded
+server in static_site.py, so TTFB reflects what a CDN would deliver rather
+than WEBrick.
+
+Under pytest-xdist every worker process runs the session fixture. `shared`
+makes sure they use one server between them rather than racing for the
+port; see its docstring.
+
+Before either mode builds, build_cache.py compares the inputs under docs/
+with the last successful build. It then reuses docs/_site, rebuilds
+incrementally, or does a full build.
+
+The build path, the build time Jekyll reports and the time until the first
+successful probe are kept in LAST_STARTUP. They appear in the terminal summary and in the perf
+results file.
+"""
+
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process sharing, each process serves alone
+    fcntl = None
+
+import build_cache
+import static_site
+from constants import JEKYLL_PROBE_INITIAL_DELAY, JEKYLL_PROBE_MAX_DELAY, JEKYLL_STARTUP_TIMEOUT
+
+REPO = Path(__file__).resolve().parent.parent
+SITE = build_cache.SITE
+BASE_URL = os.environ.get("JEKYLL_URL", "http://localhost:4000")
+# How a server is started when none is running: "serve" (`jekyll serve`) or
+# "static" (`jekyll build`, then static_site.py)
+SERVER = os.environ.get("JEKYLL_SERVER", "serve").strip().lower() or "serve"
+if SERVER not in ("serve", "static"):
+    raise ValueError(f"JEKYLL_SERVER={SERVER!r}: expected 'serve' or 'static'")
+STATE_DIR = REPO / ".pytest_cache" / "jekyll"  # lock and state shared by pytest-xdist workers
+STARTUP_TIMEOUT = float(os.environ.get("JEKYLL_STARTUP_TIMEOUT", JEKYLL_STARTUP_TIMEOUT))
+OUTPUT_TAIL = 40  # lines of Jekyll output quoted when startup fails
+
+_DONE = re.compile(r"done in (\d+(?:\.\d+)?) seconds")
+_RUNNING = re.compile(r"Server running")
+
+
+@dataclass
+class Startup:
+    """How this session's server came up."""
+
+    url: str
+    reused: bool
+    server: str | None = None  # SERVER when started here
+    build: str | None = None  # the build_cache path taken, described
+    build_seconds: float | None = None  # Jekyll's own "done in X seconds."
+    ready_seconds: float | None = None  # start to serving (the first successful probe)
+    probes: int = 0
+
+    def summary(self) -> str:
+        if self.reused:
+            return f"jekyll: reused the server already running at {self.url}"
+        parts = [self.build] if self.build else []
+        if self.build_seconds is not None:
+            parts.append(f"built in {self.build_seconds:.2f} s")
+        via = "jekyll serve" if self.server == "serve" else "the static server"
+        probes = f" ({self.probes} probes)" if self.probes else ""
+        parts.append(f"{via} ready at {self.url} after {self.ready_seconds:.2f} s{probes}")
+        return "jekyll: " + ", ".join(parts)
+
+
+LAST_STARTUP: Startup | None = None  # this session's server, for the terminal summary
+
+
+class OutputWatcher:
+    """Drains a server's output on a thread, noting Jekyll's progress markers.
+
+    Draining also keeps a chatty build from filling the pipe and stalling.
+    """
+
+    def __init__(self, stream: Iterable[str], keep: int = OUTPUT_TAIL):
+        self.build_seconds: float | None = None
+        self.tail: deque[str] = deque(maxlen=keep)
+        # Set on "Server running" or when the output ends: either way, probe now
+        self.wake = threading.Event()
+        self._thread = threading.Thread(target=self._read, args=(stream,), daemon=True)
+        self._thread.start()
+
+    def _read(self, stream: Iterable[str]) -> None:
+        try:
+            for line in stream:
+                line = line.rstrip()
+                self.tail.append(line)
+                if match := _DONE.search(line):
+                    self.build_seconds = float(match.group(1))
+                elif _RUNNING.search(line):
+                    self.wake.set()
+        finally:
+            self.wake.set()
+
+    def join(self, timeout: float | None = None) -> None:
+        self._thread.join(timeout)
+
+    def output(self) -> str:
+        return "\n".join(self.tail)
+
+
+def backoff(initial: float = JEKYLL_PROBE_INITIAL_DELAY, cap: float = JEKYLL_PROBE_MAX_DELAY) -> Iterator[float]:
+    """Delays between probes: doubling from `initial`, then `cap` forever."""
+    delay = initial
+    while True:
+        yield min(delay, cap)
+        delay *= 2
+
+
+def probe(url: str, timeout: float = 2.0) -> bool:
+    """Whether anything answers HTTP at `url`; an error status still means it is up."""
+    try:
+        with urllib.request.urlopen(url, timeout=timeout):
+            return True
+    except urllib.error.HTTPError:
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def wait_until_ready(
+    url: str,
+    proc: subprocess.Popen,
+    watcher: OutputWatcher,
+    timeout: float = STARTUP_TIMEOUT,
+    initial: float = JEKYLL_PROBE_INITIAL_DELAY,
+    cap: float = JEKYLL_PROBE_MAX_DELAY,
+) -> int:
+    """Probe `url` until it answers; the number of probes it took.
+
+    Raises RuntimeError if `proc` exits first and TimeoutError after `timeout`
+    seconds, both quoting the server's recent output.
+    """
+    deadline = time.monotonic() + timeout
+    delays = backoff(initial, cap)
+    probes = 0
+    while True:
+        probes += 1
+        if probe(url, timeout=max(0.1, min(2.0, deadline - time.monotonic()))):
+            return probes
+        if proc.poll() is not None:
+            watcher.join(timeout=1)
+            raise RuntimeError(
+                f"jekyll serve exited with status {proc.returncode} before serving {url}:\n{watcher.output()}"
+            )
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"{url} not serving after {timeout:.0f} s (JEKYLL_STARTUP_TIMEOUT):\n{watcher.output()}")
+        delay = min(next(delays), remaining)
+        if watcher.wake.is_set():
+            time.sleep(delay)
+        elif watcher.wake.wait(delay):
+            delays = backoff(initial, cap)  # it says it is up: probe now, and again soon
+
+
+def serve_command(port: int) -> list[str]:
+    return [
+        "bundle",
+        "exec",
+        "jekyll",
+        "serve",
+        "--source",
+        "docs",
+        "--destination",
+        "docs/_site",
+        "--port",
+        str(port),
+    ]
+
+
+def build_command() -> list[str]:
+    return ["bundle", "exec", "jekyll", "build", "--source", "docs", "--destination", "docs/_site"]
+
+
+def spawn(command: list[str]) -> subprocess.Popen:
+    """Start `command` from the repo root in its own process group, stdout and stderr merged into one text pipe."""
+    kwargs = {} if sys.platform == "win32" else {"preexec_fn": os.setsid}
+    return subprocess.Popen(
+        command, cwd=REPO, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, **kwargs
+    )
+
+
+def stop(proc: subprocess.Popen) -> None:
+    if proc.poll() is not None:
+        return
+    if sys.platform == "win32":
+        proc.terminate()
+    else:
+        os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def build_flags(plan: build_cache.Plan) -> list[str]:
+    """Jekyll flags to build as `plan` says; clears the recorded build first.
+
+    Only an incremental plan gets `--incremental`. A full build leaves
+    `.jekyll-metadata` alone; Jekyll neither reads nor writes it without the flag.
+    """
+    build_cache.invalidate()
+    return ["--incremental"] if plan.action == "incremental" else []
+
+
+def build(command: list[str], timeout: float = STARTUP_TIMEOUT) -> float | None:
+    """Run a `jekyll build` to completion; the build time it reports.
+
+    Raises RuntimeError if the build fails and TimeoutError after `timeout`
+    seconds, both quoting its recent output.
+    """
+    proc = spawn(command)
+    watcher = OutputWatcher(proc.stdout)
+    try:
+        status = proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        stop(proc)
+        watcher.join(timeout=1)
+        raise TimeoutError(f"jekyll build not done after {timeout:.0f} s (JEKYLL_STARTUP_TIMEOUT):\n{watcher.output()}")
+    watcher.join(timeout=1)
+    if status != 0:
+        raise RuntimeError(f"jekyll build failed with status {status}:\n{watcher.output()}")
+    return watcher.build_seconds
+
+
+@contextmanager
+def _jekyll_serve(base_url: str, timeout: float) -> Iterator[Startup]:
+    start = time.monotonic()
+    command = serve_command(urlparse(base_url).port or 4000)
+    plan = build_cache.plan(" ".join(command))
+    proc = spawn(command + (["--skip-initial-build"] if plan.action == "reuse" else build_flags(plan)))
+    watcher = OutputWatcher(proc.stdout)
+    try:
+        probes = wait_until_ready(base_url, proc, watcher, timeout)
+        build_cache.record(plan, " ".join(command))
+        yield Startup(
+            base_url,
+            reused=False,
+            server="serve",
+            build=plan.describe(),
+            build_seconds=watcher.build_seconds,
+            ready_seconds=time.monotonic() - start,
+            probes=probes,
+        )
+    finally:
+        stop(proc)
+
+
+@contextmanager
+def _static_serve(base_url: str, timeout: float) -> Iterator[Startup]:
+    start = time.monotonic()
+    command = build_command()
+    plan = build_cache.plan(" ".join(command))
+    build_seconds = None
+    if plan.action != "reuse":
+        build_seconds = build(command + build_flags(plan), timeout)
+        build_cache.record(plan, " ".join(command))
+    static_site.precompress(SITE)
+    url = urlparse(base_url)
+    server = static_site.StaticSiteServer(SITE, (url.hostname or "localhost", url.port or 4000)).start()
+    try:
+        yield Startup(
+            base_url,
+            reused=False,
+            server="static",
+            build=plan.describe(),
+            build_seconds=build_seconds,
+            ready_seconds=time.monotonic() - start,
+        )
+    finally:
+        server.stop()
+
+
+@contextmanager
+def serve(base_url: str = BASE_URL, timeout: float = STARTUP_TIMEOUT, server: str = SERVER) -> Iterator[str]:
+    """Yield the URL of a ready server at `base_url`, starting (and afterwards stopping) one if needed."""
+    global LAST_STARTUP
+    if probe(base_url):
+        LAST_STARTUP = Startup(base_url, reused=True)
+        yield base_url
+        return
+
+    start = _static_serve if server == "static" else _jekyll_serve
+    with start(base_url, timeout) as startup:
+        LAST_STARTUP = startup
+        yield base_url
+
+
+@contextmanager
+def _locked(path: Path) -> Iterator[None]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_state(path: Path) -> dict | None:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _write_state(path: Path, state: dict) -> None:
+    path.write_text(json.dumps(state), encoding="utf-8")
+
+
+@contextmanager
+def shared(
+    base_url: str = BASE_URL, state_dir: Path = STATE_DIR, poll: float = 0.2, start=serve, **kwargs
+) -> Iterator[str]:
+    """`start(base_url, **kwargs)` (`serve`), shared by every process that enters this for the same port.
+
+    Processes coordinate through `<port>.json` in `state_dir`, read and written
+    under an exclusive lock on `<port>.lock`. The first process starts the
+    server while it holds the lock, so the others queue behind the build
+    instead of racing for the port. It records itself as the owner. Each later
+    process adds its PID to the holders, as long as the owner is alive and the
+    server answers; otherwise the state is stale and it starts a fresh server.
+    On the way out each process removes its PID. The owner's server is a child
+    process (or, in static mode, a thread), so the owner waits until no live
+    holders remain before it stops the server and deletes the state. A holder
+    that died without leaving is dropped when its PID is found dead.
+    """
+    if fcntl is None:
+        with start(base_url, **kwargs) as url:
+            yield url
+        return
+
+    global LAST_STARTUP
+    port = urlparse(base_url).port or 4000
+    lock, state_path = state_dir / f"{port}.lock", state_dir / f"{port}.json"
+    pid = os.getpid()
+    with ExitStack() as server:
+        with _locked(lock):
+            state = _read_state(state_path)
+            owner = not (state and _alive(state["owner"]) and probe(state["url"]))
+            if owner:
+                url = server.enter_context(start(base_url, **kwargs))
+                state = {"owner": pid, "url": url, "holders": [pid]}
+            else:
+                url = state["url"]
+                state["holders"] = [p for p in state["holders"] if _alive(p)] + [pid]
+                LAST_STARTUP = Startup(url, reused=True)
+            _write_state(state_path, state)
+        try:
+            yield url
+        finally:
+            while True:
+                with _locked(lock):
+                    state = _read_state(state_path)
+                    holders = [p for p in (state or {}).get("holders", []) if p != pid and _alive(p)]
+                    if owner and not holders:
+                        state_path.unlink(missing_ok=True)
+                        server.close()
+                        break
+                    if state is not None:
+                        _write_state(state_path, {**state, "holders": holders})
+                    if not owner:
+                        break
+                time.sleep(poll)  # the owner keeps serving until the other holders are done
@@ -0,0 +1,603 @@
+"""Concurrent page-load measurement engine for the performance suite.
+
+Loads are spread over `concurrency` isolated browser contexts driven by the
+asyncio Playwright API, so a sweep of PERF_TEST_PAGES x PERF_ITERATIONS takes
+roughly 1/concurrency of the serial wall-clock. Concurrent loads compete for
+CPU with each other, so every concurrent run also takes a short serial sample
+per page and reports how far the concurrent medians drifted from it.
+
+Every sweep runs in one cache mode (see PERF_MODES in constants.py):
+  - cold:  each load gets a brand-new context, so an empty HTTP cache, no
+           cookies and new connections - a first visit;
+  - warm:  each context loads a page once unmeasured, then every measured load
+           of it is served from that context's cache - a repeat visit;
+  - mixed: one context reused without priming, so the first load is cold and
+           the rest warm (what the suite measured before modes existed).
+
+Third-party hosts (CDN, fonts, analytics) are served from local vendored
+copies with a fixed injected latency; see third_party.py.
+
+Every sweep also runs under one device profile (see PERF_PROFILES): its
+context args (viewport, mobile emulation) are applied to the context, and its
+CPU and network throttling to each page over CDP before navigation.
+
+Perf numbers always come from Chromium, whatever `--browser` the rest of the
+suite runs under.
+"""
+
+import asyncio
+import math
+import os
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+
+import third_party
+from constants import (
+    PERF_BUDGET_MODE,
+    PERF_CONCURRENCY,
+    PERF_DEFAULT_PROFILE,
+    PERF_MODES,
+    PERF_PERCENTILES,
+    PERF_PROFILES,
+    PERF_SKEW_SAMPLES,
+    PERF_SKEW_TOLERANCE,
+    PERF_STATS_EXACT_LIMIT,
+)
+from playwright.async_api import Browser, BrowserContext, Page, async_playwright
+
+# PERF_CONCURRENCY=1 reproduces the old fully serial measurement.
+CONCURRENCY = int(os.environ.get("PERF_CONCURRENCY", PERF_CONCURRENCY))
+# PERF_FRESH=1 makes the session MetricsStore re-measure on every request.
+FRESH = os.environ.get("PERF_FRESH", "") not in ("", "0")
+# PERF_PROFILES=desktop,mid-mobile limits the profiles the perf tests run under.
+PROFILES = [name.strip() for name in os.environ.get("PERF_PROFILES", ",".join(PERF_PROFILES)).split(",") if name]
+
+NAVIGATION_TIMING_JS = """
+() => {
+    const entries = performance.getEntriesByType('navigation');
+    if (entries.length > 0) {
+        const nav = entries[0];
+        return {
+            ttfb: nav.responseStart - nav.requestStart,
+            dom_interactive: nav.domInteractive - nav.requestStart,
+            dom_content_loaded: nav.domContentLoadedEventEnd - nav.requestStart,
+            load_complete: nav.loadEventEnd - nav.requestStart
+        };
+    }
+    // Fallback to legacy timing API
+    const t = performance.timing;
+    return {
+        ttfb: t.responseStart - t.navigationStart,
+        dom_interactive: t.domInteractive - t.navigationStart,
+        dom_content_loaded: t.domContentLoadedEventEnd - t.navigationStart,
+        load_complete: t.loadEventEnd - t.navigationStart
+    };
+}
+"""
+
+# Core Web Vitals collector, installed in every measurement context with
+# add_init_script so its observers exist before the page's first paint.
+# `buffered: true` also replays anything that fired before registration.
+#   - CLS is the largest session window of layout shifts without recent
+#     input (gaps < 1 s, windows <= 5 s), as web-vitals computes it;
+#   - INP is the slowest interaction's event duration (0 without one);
+#   - TBT sums the blocking part (> 50 ms) of long tasks after FCP - the lab
+#     stand-in for INP on loads nobody interacts with.
+WEB_VITALS_INIT_JS = """
+(() => {
+    const v = window.__perfVitals = {lcp: 0, fcp: 0, cls: 0, inp: 0, longTasks: []};
+    const observe = (type, callback, options = {}) => {
+        try {
+            new PerformanceObserver(list => list.getEntries().forEach(callback))
+                .observe({type, buffered: true, ...options});
+        } catch (e) { /* entry type unsupported by this browser */ }
+    };
+    observe('paint', e => { if (e.name === 'first-contentful-paint') v.fcp = e.startTime; });
+    observe('largest-contentful-paint', e => { v.lcp = e.renderTime || e.loadTime || e.startTime; });
+    let session = 0, first = 0, last = 0;
+    observe('layout-shift', e => {
+        if (e.hadRecentInput) return;
+        if (session && e.startTime - last < 1000 && e.startTime - first < 5000) {
+            session += e.value;
+        } else {
+            session = e.value;
+            first = e.startTime;
+        }
+        last = e.startTime;
+        v.cls = Math.max(v.cls, session);
+    });
+    const interaction = e => { if (e.interactionId) v.inp = Math.max(v.inp, e.duration); };
+    observe('event', interaction, {durationThreshold: 16});
+    observe('first-input', interaction);
+    observe('longtask', e => v.longTasks.push([e.startTime, e.duration]));
+})();
+"""
+
+# Event timing entries are only dispatched after the next paint, so give the
+# interaction a frame plus a little slack before reading.
+WEB_VITALS_JS = """
+() => new Promise(resolve => requestAnimationFrame(() => setTimeout(() => {
+    const v = window.__perfVitals;
+    const tbt = v.longTasks
+        .filter(([start]) => start >= v.fcp)
+        .reduce((sum, [, duration]) => sum + Math.max(0, duration - 50), 0);
+    resolve({lcp: v.lcp, fcp: v.fcp, cls: v.cls, inp: v.inp, tbt});
+}, 100)))
+"""
+
+
+@dataclass
+class PerformanceMetrics:
+    """Container for page performance metrics in milliseconds (CLS is unitless)."""
+
+    ttfb: float  # Time to First Byte
+    dom_interactive: float  # DOM Interactive
+    dom_content_loaded: float  # DOMContentLoaded event
+    load_complete: float  # Load event complete
+    lcp: float  # Largest Contentful Paint
+    fcp: float  # First Contentful Paint
+    cls: float  # Cumulative Layout Shift (largest session window)
+    inp: float  # Interaction to Next Paint (slowest interaction's duration)
+    tbt: float  # Total Blocking Time of long tasks after FCP
+
+
+# --- Statistics ---------------------------------------------------------------
+
+
+def interpolated_percentile(sorted_values: list[float], p: float) -> float:
+    """Percentile `p` (0-100) by linear interpolation between closest ranks.
+
+    The same definition as numpy's default and R's type 7: rank (n - 1) * p/100,
+    so p0 is the minimum, p100 the maximum and p50 the median.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * p / 100
+    lo = math.floor(rank)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (rank - lo)
+
+
+class _P2Quantile:
+    """P-square streaming estimate of one quantile (Jain & Chlamtac, 1985).
+
+    Five markers track the minimum, q/2, q, (1+q)/2 and maximum; each new value
+    nudges them towards their desired positions with a piecewise-parabolic
+    correction. Memory is constant. Seeded from an already-sorted sample so the
+    estimate continues seamlessly from an exact percentile.
+    """
+
+    def __init__(self, q: float, seed: list[float]):
+        n = len(seed)
+        self.q = q
+        self.dn = [0.0, q / 2, q, (1 + q) / 2, 1.0]
+        self.desired = [1 + (n - 1) * d for d in self.dn]
+        self.pos = [1, *(round(d) for d in self.desired[1:4]), n]
+        for i in range(1, 5):  # marker positions must stay strictly increasing
+            self.pos[i] = max(self.pos[i], self.pos[i - 1] + 1)
+        for i in range(3, -1, -1):
+            self.pos[i] = min(self.pos[i], self.pos[i + 1] - 1)
+        self.heights = [seed[p - 1] for p in self.pos]
+
+    def add(self, x: float) -> None:
+        h, n = self.heights, self.pos
+        if x < h[0]:
+            h[0], k = x, 0
+        elif x >= h[4]:
+            h[4], k = x, 3
+        else:
+            k = next(i for i in range(1, 5) if x < h[i]) - 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.dn[i]
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                step = 1 if d > 0 else -1
+                candidate = h[i] + step / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + step) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - step) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not h[i - 1] < candidate < h[i + 1]:
+                    candidate = h[i] + step * (h[i + step] - h[i]) / (n[i + step] - n[i])
+                h[i] = candidate
+                n[i] += step
+
+    @property
+    def value(self) -> float:
+        return self.heights[2]
+
+
+class StreamingStats:
+    """Count, mean, variance, min/max and percentiles of one metric, in bounded memory.
+
+    Mean and variance use Welford's online update. Percentiles are exact
+    (`interpolated_percentile`) while the sample fits in `exact_limit` values;
+    past that the buffer is dropped and each of `percentiles` continues as a
+    P-square estimate, so memory stays O(len(percentiles)) however long a soak
+    run goes. Only the tracked percentiles are available after the switch.
+    """
+
+    def __init__(self, percentiles=PERF_PERCENTILES, exact_limit: int = PERF_STATS_EXACT_LIMIT):
+        self.percentiles = tuple(percentiles)
+        self.exact_limit = max(exact_limit, 5)
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._values: list[float] | None = []
+        self._sorted = True
+        self._estimators: dict[float, _P2Quantile] = {}
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        if self._values is None:
+            for estimator in self._estimators.values():
+                estimator.add(x)
+            return
+        self._values.append(x)
+        self._sorted = False
+        if len(self._values) > self.exact_limit:
+            seed = sorted(self._values)
+            self._estimators = {p: _P2Quantile(p / 100, seed) for p in self.percentiles}
+            self._values = None
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (n - 1 denominator); 0.0 below two samples."""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def percentile(self, p: float) -> float:
+        if self._values is not None:
+            if not self._sorted:
+                self._values.sort()
+                self._sorted = True
+            return interpolated_percentile(self._values, p)
+        if p not in self._estimators:
+            raise KeyError(f"p{p:g} is not tracked once past the exact sample; tracked: {self.percentiles}")
+        return self._estimators[p].value
+
+
+class MetricsAccumulator:
+    """A StreamingStats per PerformanceMetrics field, fed one sample at a time."""
+
+    def __init__(self, percentiles=PERF_PERCENTILES, exact_limit: int = PERF_STATS_EXACT_LIMIT):
+        self.stats = {f.name: StreamingStats(percentiles, exact_limit) for f in fields(PerformanceMetrics)}
+
+    def add(self, metric: PerformanceMetrics) -> None:
+        for name, stats in self.stats.items():
+            stats.add(getattr(metric, name))
+
+    def summary(self) -> dict[str, float]:
+        """Flat `<field>_<stat>` keys: _avg, _stdev, _min, _max and _p<N> per percentile.
+
+        An empty accumulator reports 0.0 for everything.
+        """
+        out = {}
+        for name, s in self.stats.items():
+            empty = s.count == 0
+            out[f"{name}_avg"] = s.mean
+            out[f"{name}_stdev"] = s.stdev
+            out[f"{name}_min"] = 0.0 if empty else s.min
+            out[f"{name}_max"] = 0.0 if empty else s.max
+            for p in s.percentiles:
+                out[f"{name}_p{p:g}"] = s.percentile(p)
+        return out
+
+
+def aggregate_metrics(metrics: Iterable[PerformanceMetrics]) -> dict[str, float]:
+    """Summary statistics for every metric field (see MetricsAccumulator.summary)."""
+    acc = MetricsAccumulator()
+    for metric in metrics:
+        acc.add(metric)
+    return acc.summary()
+
+
+# --- Measurement ---------------------------------------------------------------
+
+
+@dataclass
+class MeasurementRun:
+    """Samples per page path, plus what went wrong and how skewed it was."""
+
+    samples: dict[str, list[PerformanceMetrics]]
+    errors: dict[str, str] = field(default_factory=dict)
+    concurrency: int = 1
+    mode: str = PERF_BUDGET_MODE
+    profile: str = PERF_DEFAULT_PROFILE
+    # path -> concurrent / serial median load_complete (1.0 = no skew)
+    skew: dict[str, float] = field(default_factory=dict)
+
+    def all_samples(self) -> list[PerformanceMetrics]:
+        return [m for ms in self.samples.values() for m in ms]
+
+    def only(self, path: str) -> "MeasurementRun":
+        """This run's results for a single page."""
+        return MeasurementRun(
+            samples={path: self.samples[path]} if path in self.samples else {},
+            errors={path: self.errors[path]} if path in self.errors else {},
+            concurrency=self.concurrency,
+            mode=self.mode,
+            profile=self.profile,
+            skew={path: self.skew[path]} if path in self.skew else {},
+        )
+
+    def absorb(self, other: "MeasurementRun", limit: int) -> None:
+        """Merge another run's pages in, keeping at most `limit` samples each."""
+        self.samples.update({path: s[:limit] for path, s in other.samples.items()})
+        self.errors.update(other.errors)
+        self.skew.update(other.skew)
+        self.concurrency = max(self.concurrency, other.concurrency)
+        self.mode = other.mode
+        self.profile = other.profile
+
+    @property
+    def skewed(self) -> dict[str, float]:
+        """Pages whose concurrent timings drifted past PERF_SKEW_TOLERANCE."""
+        return {path: r for path, r in self.skew.items() if r > PERF_SKEW_TOLERANCE}
+
+    def skew_report(self) -> str:
+        setup = f"Profile: {self.profile}, mode: {self.mode}, concurrency: {self.concurrency}"
+        if not self.skew:
+            return f"{setup} (serial, no skew check)"
+        worst = max(self.skew, key=self.skew.get)
+        verdict = f"SKEWED: {sorted(self.skewed)}" if self.skewed else "within tolerance"
+        return (
+            f"{setup}, worst skew {self.skew[worst]:.2f}x on {worst} "
+            f"(tolerance {PERF_SKEW_TOLERANCE:.2f}x) - {verdict}"
+        )
+
+
+async def new_context(browser: Browser, context_args: dict) -> BrowserContext:
+    """A measurement context: every perf load, in any module, starts from one of these."""
+    context = await browser.new_context(**context_args)
+    await context.add_init_script(WEB_VITALS_INIT_JS)
+    if third_party.ENABLED:
+        await third_party.route(context)
+    return context
+
+
+async def throttle(context: BrowserContext, page: Page, profile: str) -> None:
+    """Apply `profile`'s CPU and network throttling to `page` (no-op when unthrottled)."""
+    spec = PERF_PROFILES[profile]
+    if spec["cpu_slowdown"] == 1 and spec["network"] is None:
+        return
+    cdp = await context.new_cdp_session(page)
+    await cdp.send("Emulation.setCPUThrottlingRate", {"rate": spec["cpu_slowdown"]})
+    if spec["network"] is not None:
+        net = spec["network"]
+        await cdp.send("Network.enable")
+        await cdp.send(
+            "Network.emulateNetworkConditions",
+            {
+                "offline": False,
+                "latency": net["latency"],
+                "downloadThroughput": net["download"],
+                "uploadThroughput": net["upload"],
+            },
+        )
+
+
+async def _load(context: BrowserContext, url: str, profile: str = PERF_DEFAULT_PROFILE) -> PerformanceMetrics:
+    page = await context.new_page()
+    try:
+        await throttle(context, page, profile)
+        await page.goto(url, wait_until="load")
+        # Small delay to ensure loadEventEnd is populated
+        await page.wait_for_timeout(50)
+        timing = await page.evaluate(NAVIGATION_TIMING_JS)
+        # One keyboard interaction gives INP something to measure (Tab only
+        # moves focus) and, like any input, finalises LCP.
+        await page.keyboard.press("Tab")
+        return PerformanceMetrics(**timing, **await page.evaluate(WEB_VITALS_JS))
+    finally:
+        await page.close()
+
+
+async def _sweep(
+    browser: Browser,
+    base_url: str,
+    paths: list[str],
+    iterations: int,
+    concurrency: int,
+    context_args: dict,
+    mode: str,
+    profile: str,
+) -> MeasurementRun:
+    """Run every (path, iteration) load with `concurrency` workers in `mode` under `profile`.
+
+    Loads are queued round-robin across paths, so each page's samples are
+    spread over the whole sweep rather than bunched together in time.
+    """
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for _ in range(iterations):
+        for path in paths:
+            queue.put_nowait(path)
+    run = MeasurementRun(samples={path: [] for path in paths}, concurrency=concurrency, mode=mode, profile=profile)
+
+    async def cold_load(url: str) -> PerformanceMetrics:
+        context = await new_context(browser, context_args)
+        try:
+            return await _load(context, url, profile)
+        finally:
+            await context.close()
+
+    async def worker():
+        context = None if mode == "cold" else await new_context(browser, context_args)
+        primed: set[str] = set()
+        try:
+            while not queue.empty():
+                path = queue.get_nowait()
+                if path in run.errors:
+                    continue
+                url = f"{base_url}{path}"
+                try:
+                    if context is None:
+                        run.samples[path].append(await cold_load(url))
+                        continue
+                    if mode == "warm" and path not in primed:
+                        await _load(context, url, profile)  # unmeasured: fills this context's HTTP cache
+                        primed.add(path)
+                    run.samples[path].append(await _load(context, url, profile))
+                except Exception as e:
+                    run.errors[path] = f"{type(e).__name__}: {e}"
+        finally:
+            if context is not None:
+                await context.close()
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, queue.qsize())))))
+    run.samples = {path: s for path, s in run.samples.items() if path not in run.errors}
+    return run
+
+
+def _median_load(samples: list[PerformanceMetrics]) -> float:
+    return interpolated_percentile(sorted(m.load_complete for m in samples), 50)
+
+
+async def _measure(
+    base_url: str, paths: list[str], iterations: int, concurrency: int, context_args: dict, mode: str, profile: str
+) -> MeasurementRun:
+    context_args = {**context_args, **PERF_PROFILES[profile]["context"]}
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=True)
+        try:
+            run = await _sweep(browser, base_url, paths, iterations, concurrency, context_args, mode, profile)
+            if concurrency > 1 and PERF_SKEW_SAMPLES > 0:
+                serial = await _sweep(
+                    browser, base_url, list(run.samples), PERF_SKEW_SAMPLES, 1, context_args, mode, profile
+                )
+                for path, samples in serial.samples.items():
+                    baseline = _median_load(samples)
+                    if run.samples.get(path) and baseline > 0:
+                        run.skew[path] = _median_load(run.samples[path]) / baseline
+        finally:
+            await browser.close()
+    return run
+
+
+def measure(
+    base_url: str,
+    paths: list[str],
+    iterations: int,
+    concurrency: int = CONCURRENCY,
+    context_args: dict | None = None,
+    mode: str = PERF_BUDGET_MODE,
+    profile: str = PERF_DEFAULT_PROFILE,
+) -> MeasurementRun:
+    """Load each path `iterations` times in `mode` under `profile`, `concurrency` loads at a time.
+
+    Blocking; the asyncio engine runs via run_blocking().
+    """
+    if mode not in PERF_MODES:
+        raise ValueError(f"unknown perf mode {mode!r}; expected one of {PERF_MODES}")
+    if profile not in PERF_PROFILES:
+        raise ValueError(f"unknown perf profile {profile!r}; expected one of {list(PERF_PROFILES)}")
+    third_party.prepare()
+    coro = _measure(base_url, list(paths), iterations, max(1, concurrency), context_args or {}, mode, profile)
+    return run_blocking(coro)
+
+
+async def _time_to_mark(
+    base_url: str, path: str, mark: str, iterations: int, context_args: dict, profile: str
+) -> list[float]:
+    context_args = {**context_args, **PERF_PROFILES[profile]["context"]}
+    script = f"() => performance.getEntriesByName({mark!r}, 'mark').map(m => m.startTime)[0]"
+    timings = []
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=True)
+        try:
+            for _ in range(iterations):
+                context = await new_context(browser, context_args)
+                try:
+                    page = await context.new_page()
+                    await throttle(context, page, profile)
+                    await page.goto(f"{base_url}{path}", wait_until="commit")
+                    handle = await page.wait_for_function(script, timeout=60_000)
+                    timings.append(await handle.json_value())
+                finally:
+                    await context.close()
+        finally:
+            await browser.close()
+    return timings
+
+
+def time_to_mark(
+    base_url: str,
+    path: str,
+    mark: str,
+    iterations: int,
+    context_args: dict | None = None,
+    profile: str = PERF_DEFAULT_PROFILE,
+) -> list[float]:
+    """ms from navigation start to the page's `performance.mark(mark)`, over `iterations` cold loads."""
+    if profile not in PERF_PROFILES:
+        raise ValueError(f"unknown perf profile {profile!r}; expected one of {list(PERF_PROFILES)}")
+    third_party.prepare()
+    return run_blocking(_time_to_mark(base_url, path, mark, iterations, context_args or {}, profile))
+
+
+def run_blocking(coro):
+    """Run `coro` to completion on a thread of its own and return its result.
+
+    pytest-playwright's sync API already owns an event loop on the test thread.
+    """
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+class MetricsStore:
+    """Session-wide cache of page timings, keyed on (path, iterations, mode, profile).
+
+    Every test that needs timings for a page asks the store, which measures
+    only what it has not already got (in one concurrent sweep) and serves the
+    rest from memory. A request for n iterations is also served from a cached
+    sample of more than n loads. `fresh=True` (per call, or for the whole store
+    via PERF_FRESH=1) ignores the cache and re-measures.
+    """
+
+    def __init__(self, base_url: str, context_args: dict | None = None, fresh: bool = False):
+        self.base_url = base_url
+        self.context_args = context_args or {}
+        self.fresh = fresh
+        self._runs: dict[tuple[str, int, str, str], MeasurementRun] = {}
+
+    def runs(self) -> list[tuple[tuple[str, int, str, str], MeasurementRun]]:
+        """Every cached ((path, iterations, mode, profile), run), for reporting."""
+        return list(self._runs.items())
+
+    def _cached(self, path: str, iterations: int, mode: str, profile: str) -> MeasurementRun | None:
+        sizes = [n for p, n, m, pr in self._runs if (p, m, pr) == (path, mode, profile) and n >= iterations]
+        return self._runs[(path, min(sizes), mode, profile)] if sizes else None
+
+    def get(
+        self,
+        paths: list[str],
+        iterations: int,
+        mode: str = PERF_BUDGET_MODE,
+        fresh: bool = False,
+        profile: str = PERF_DEFAULT_PROFILE,
+    ) -> MeasurementRun:
+        """Timings for `paths` in `mode` under `profile`, measuring whichever are missing from the cache."""
+        missing = [p for p in paths if fresh or self.fresh or self._cached(p, iterations, mode, profile) is None]
+        if missing:
+            run = measure(
+                self.base_url, missing, iterations, context_args=self.context_args, mode=mode, profile=profile
+            )
+            for path in missing:
+                self._runs[(path, iterations, mode, profile)] = run.only(path)
+        merged = MeasurementRun(samples={}, mode=mode, profile=profile)
+        for path in paths:
+            merged.absorb(self._cached(path, iterations, mode, profile), limit=iterations)
+        return merged
@@ -0,0 +1,207 @@
+"""Per-page timing baselines and statistical regression checks.
+
+The absolute PERF_MAX_LOAD_TIME ceiling cannot see a page that got 40% slower
+but still loads in under 3 s. This module keeps each page's sample
+distribution from a known-good run, per device profile and cache mode, in a
+local JSON file (PERF_BASELINE, default `.perf/baseline.json`, not committed -
+timings are machine-specific) and compares later runs against it:
+
+  - a one-sided Mann-Whitney U test asks whether current loads are
+    stochastically slower than the baseline (no normality assumption, which
+    page-load timings never satisfy);
+  - the Hodges-Lehmann shift (median of pairwise differences) and the
+    rank-biserial correlation say how much slower.
+
+A metric only counts as regressed when it is both significant
+(p < PERF_REGRESSION_ALPHA) and material (shift > PERF_REGRESSION_MIN_EFFECT of
+the baseline median), so run-to-run noise and trivially small real shifts do
+not fail the suite.
+
+A page with no baseline has its current samples recorded instead of compared.
+Set PERF_UPDATE_BASELINE=1 to re-record every page after an intended change.
+Under pytest-xdist each worker saves only the pages it recorded, merged into
+the file under a lock, so workers never drop each other's pages.
+"""
+
+import json
+import math
+import os
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, saves merge without one
+    fcntl = None
+
+from constants import (
+    PERF_BASELINE_MAX_SAMPLES,
+    PERF_BASELINE_MIN_SAMPLES,
+    PERF_DEFAULT_PROFILE,
+    PERF_REGRESSION_ALPHA,
+    PERF_REGRESSION_METRICS,
+    PERF_REGRESSION_MIN_EFFECT,
+)
+from perf import PerformanceMetrics, interpolated_percentile
+
+REPO = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(os.environ.get("PERF_BASELINE") or REPO / ".perf" / "baseline.json")
+UPDATE = os.environ.get("PERF_UPDATE_BASELINE", "") not in ("", "0")
+BASELINE_VERSION = 2
+
+
+def _median(values: list[float]) -> float:
+    return interpolated_percentile(sorted(values), 50)
+
+
+def mann_whitney_greater(current: list[float], baseline: list[float]) -> tuple[float, float]:
+    """One-sided Mann-Whitney U test that `current` tends to exceed `baseline`.
+
+    Returns (U of `current`, p-value) from the normal approximation with tie
+    and continuity corrections. With no variation at all there is no evidence
+    either way and p is 1.0.
+    """
+    n1, n2 = len(current), len(baseline)
+    pooled = sorted([(v, 0) for v in current] + [(v, 1) for v in baseline])
+    n = n1 + n2
+    ranks = [0.0] * n
+    ties = 0.0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1  # average rank of the tied run, 1-based
+        t = j - i + 1
+        ties += t**3 - t
+        i = j + 1
+    r1 = sum(r for r, (_, group) in zip(ranks, pooled) if group == 0)
+    u1 = r1 - n1 * (n1 + 1) / 2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return u1, 1.0
+    z = (u1 - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return u1, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def hodges_lehmann_shift(current: list[float], baseline: list[float]) -> float:
+    """Median of all pairwise differences current - baseline."""
+    return _median([c - b for c in current for b in baseline])
+
+
+@dataclass
+class Comparison:
+    """One metric of one page, current run vs. baseline."""
+
+    page: str
+    metric: str
+    baseline_median: float
+    current_median: float
+    shift: float  # Hodges-Lehmann estimate of current - baseline, ms
+    effect: float  # rank-biserial correlation: +1 = every current load slower
+    p_value: float
+
+    @property
+    def relative(self) -> float:
+        return self.shift / self.baseline_median if self.baseline_median > 0 else 0.0
+
+    @property
+    def regressed(self) -> bool:
+        return self.p_value < PERF_REGRESSION_ALPHA and self.relative > PERF_REGRESSION_MIN_EFFECT
+
+    def describe(self) -> str:
+        return (
+            f"{self.page} {self.metric}: median {self.baseline_median:.0f}ms -> {self.current_median:.0f}ms "
+            f"(shift {self.shift:+.0f}ms / {self.relative:+.0%}, r={self.effect:+.2f}, p={self.p_value:.4f})"
+        )
+
+
+def compare(page: str, metric: str, current: list[float], baseline: list[float]) -> Comparison:
+    u1, p = mann_whitney_greater(current, baseline)
+    return Comparison(
+        page=page,
+        metric=metric,
+        baseline_median=_median(baseline),
+        current_median=_median(current),
+        shift=hodges_lehmann_shift(current, baseline),
+        effect=2 * u1 / (len(current) * len(baseline)) - 1,
+        p_value=p,
+    )
+
+
+@contextmanager
+def _locked(path: Path) -> Iterator[None]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read_pages(path: Path) -> dict[str, dict]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data.get("version") == BASELINE_VERSION:
+            return data["pages"]
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    return {}
+
+
+class BaselineStore:
+    """Recorded per-page metric distributions, keyed on device profile, cache mode and page path."""
+
+    def __init__(self, path: Path = BASELINE_PATH, update: bool = UPDATE):
+        self.path = path
+        self.update = update  # re-record every page rather than compare
+        self.pages: dict[str, dict] = _read_pages(path)
+        self.recorded: set[str] = set()  # keys this store recorded, the only ones save() writes
+
+    @staticmethod
+    def key(page: str, mode: str, profile: str = PERF_DEFAULT_PROFILE) -> str:
+        return f"{profile}:{mode}:{page}"
+
+    def get(self, page: str, mode: str, profile: str = PERF_DEFAULT_PROFILE) -> dict[str, list[float]] | None:
+        entry = self.pages.get(self.key(page, mode, profile))
+        return entry["samples"] if entry else None
+
+    def record(
+        self, page: str, mode: str, samples: list[PerformanceMetrics], profile: str = PERF_DEFAULT_PROFILE
+    ) -> None:
+        """Replace the page's baseline with (at most PERF_BASELINE_MAX_SAMPLES of) `samples`."""
+        kept = samples[-PERF_BASELINE_MAX_SAMPLES:]
+        columns = {name: [asdict(m)[name] for m in kept] for name in asdict(kept[0])} if kept else {}
+        key = self.key(page, mode, profile)
+        self.pages[key] = {"recorded": datetime.now(timezone.utc).isoformat(timespec="seconds"), "samples": columns}
+        self.recorded.add(key)
+
+    def compare(
+        self, page: str, mode: str, samples: list[PerformanceMetrics], profile: str = PERF_DEFAULT_PROFILE
+    ) -> list[Comparison]:
+        """Comparisons for PERF_REGRESSION_METRICS; empty if either side is too small."""
+        baseline = self.get(page, mode, profile) or {}
+        out = []
+        for metric in PERF_REGRESSION_METRICS:
+            before = baseline.get(metric, [])
+            now = [getattr(m, metric) for m in samples]
+            if min(len(before), len(now)) >= PERF_BASELINE_MIN_SAMPLES:
+                out.append(compare(page, metric, now, before))
+        return out
+
+    def save(self) -> None:
+        """Merge the pages this store recorded into the file; other processes' pages are kept."""
+        with _locked(self.path.with_name(f"{self.path.name}.lock")):
+            pages = _read_pages(self.path)
+            pages.update({key: self.pages[key] for key in self.recorded})
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"version": BASELINE_VERSION, "pages": pages}, indent=1), encoding="utf-8")
+            os.replace(tmp, self.path)
+        self.pages = pages
@@ -0,0 +1,267 @@
+"""Perf results artifacts: one JSON file per run, and an HTML trend report.
+
+At the end of a session that measured anything, `write_results` saves every
+sample the session MetricsStore holds to PERF_RESULTS_DIR (default
+`.perf/runs/`, gitignored). Each page/profile/mode gets its samples per
+metric, their aggregate, and its skew. The file also carries environment
+metadata (commit, Python, Playwright, platform, concurrency, third-party mode,
+and how the Jekyll server started and how long it took to build), so runs from
+different machines or setups can be told apart.
+
+Running this module renders a self-contained static HTML report from the
+stored runs. It plots the median of each PERF_TREND_METRICS metric per series
+as inline SVG and highlights series that are drifting (see `drift`):
+
+    python _tests/perf_report.py [--runs .perf/runs] [--out .perf/report.html]
+"""
+
+import argparse
+import html
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timezone
+from importlib import metadata
+from pathlib import Path
+
+import jekyll
+import perf
+import third_party
+from constants import PERF_DRIFT_TOLERANCE, PERF_DRIFT_WINDOW, PERF_TREND_METRICS
+from perf import PerformanceMetrics, aggregate_metrics, interpolated_percentile
+
+REPO = Path(__file__).resolve().parent.parent
+RESULTS_VERSION = 1
+# Per-run results: PERF_RESULTS_DIR=<dir> to relocate, "off" to disable.
+_RESULTS_SETTING = os.environ.get("PERF_RESULTS_DIR", "").strip()
+RESULTS_DIR: Path | None = Path(_RESULTS_SETTING) if _RESULTS_SETTING else REPO / ".perf" / "runs"
+if _RESULTS_SETTING.lower() in ("0", "off", "false"):
+    RESULTS_DIR = None
+LAST_WRITTEN: Path | None = None  # this session's results file, for the terminal summary
+
+
+def _git(*args: str) -> str | None:
+    try:
+        out = subprocess.run(["git", *args], cwd=REPO, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return out.stdout.strip() if out.returncode == 0 else None
+
+
+def environment() -> dict:
+    try:
+        playwright = metadata.version("playwright")
+    except metadata.PackageNotFoundError:
+        playwright = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "playwright": playwright,
+        "platform": platform.platform(),
+        "machine": platform.node(),
+        "cpus": os.cpu_count(),
+        "concurrency": perf.CONCURRENCY,
+        "third_party": ("partial" if third_party.FALLBACK else "local") if third_party.ENABLED else "live",
+        "third_party_latency": third_party.LATENCY,
+        "third_party_missing": list(third_party.FALLBACK),
+        "jekyll": asdict(jekyll.LAST_STARTUP) if jekyll.LAST_STARTUP else None,
+    }
+
+
+def results(store: perf.MetricsStore) -> dict:
+    """Everything `store` measured this session, one record per page/profile/mode/iteration count."""
+    records = []
+    for (path, iterations, mode, profile), run in sorted(store.runs(), key=lambda item: item[0][::-1]):
+        samples = run.samples.get(path, [])
+        records.append(
+            {
+                "page": path,
+                "profile": profile,
+                "mode": mode,
+                "iterations": iterations,
+                "samples": {f.name: [getattr(m, f.name) for m in samples] for f in fields(PerformanceMetrics)},
+                "summary": aggregate_metrics(samples),
+                "skew": run.skew.get(path),
+                "error": run.errors.get(path),
+            }
+        )
+    return {"version": RESULTS_VERSION, "environment": environment(), "runs": records}
+
+
+def write_results(store: perf.MetricsStore, directory: Path | None = RESULTS_DIR) -> Path | None:
+    """Save this session's results as `<timestamp>-<commit>[-<xdist worker>].json`; None if disabled or nothing ran.
+
+    xdist workers finish within the same second, so each names itself, and a
+    name already taken gets a `-<n>` suffix rather than being overwritten.
+    """
+    if directory is None or not store.runs():
+        return None
+    data = results(store)
+    env = data["environment"]
+    stamp = env["timestamp"].replace(":", "").replace("+0000", "Z")
+    stem = f"{stamp}-{(env['commit'] or 'nogit')[:8]}"
+    if worker := os.environ.get("PYTEST_XDIST_WORKER"):
+        stem += f"-{worker}"
+    directory.mkdir(parents=True, exist_ok=True)
+    text = json.dumps(data, indent=1)
+    for n in itertools.count():
+        path = directory / f"{stem}{f'-{n}' if n else ''}.json"
+        try:
+            with path.open("x", encoding="utf-8") as f:
+                f.write(text)
+        except FileExistsError:
+            continue
+        return path
+
+
+def load_runs(directory: Path) -> list[dict]:
+    """Stored results, oldest first; unreadable or foreign files are skipped."""
+    runs = []
+    for path in sorted(directory.glob("*.json")):
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if isinstance(data, dict) and data.get("version") == RESULTS_VERSION:
+            runs.append(data)
+    return sorted(runs, key=lambda data: data["environment"]["timestamp"])
+
+
+@dataclass
+class Series:
+    """One page under one profile and mode, across runs."""
+
+    page: str
+    profile: str
+    mode: str
+    timestamps: list[str]
+    medians: dict[str, list[float]]  # metric -> median per run, aligned with timestamps
+
+    def drift(self, metric: str) -> float | None:
+        """Latest median relative to the median of the PERF_DRIFT_WINDOW runs before it.
+
+        None until there is a latest run plus at least one earlier one.
+        """
+        values = self.medians[metric]
+        if len(values) < 2:
+            return None
+        earlier = interpolated_percentile(sorted(values[-PERF_DRIFT_WINDOW - 1 : -1]), 50)
+        return values[-1] / earlier - 1 if earlier > 0 else None
+
+    @property
+    def drifting(self) -> list[str]:
+        return [m for m in PERF_TREND_METRICS if (d := self.drift(m)) is not None and d > PERF_DRIFT_TOLERANCE]
+
+
+def series(runs: list[dict]) -> list[Series]:
+    """Per page/profile/mode medians across `runs` (the largest sample of each run)."""
+    by_key: dict[tuple[str, str, str], Series] = {}
+    for data in runs:
+        best: dict[tuple[str, str, str], dict] = {}
+        for record in data["runs"]:
+            k = (record["profile"], record["mode"], record["page"])
+            size = len(record["samples"]["load_complete"])
+            if not record["error"] and (k not in best or size > len(best[k]["samples"]["load_complete"])):
+                best[k] = record
+        for (profile, mode, page), record in best.items():
+            s = by_key.setdefault(
+                (profile, mode, page), Series(page, profile, mode, [], {m: [] for m in PERF_TREND_METRICS})
+            )
+            s.timestamps.append(data["environment"]["timestamp"])
+            for metric in PERF_TREND_METRICS:
+                values = sorted(record["samples"].get(metric) or [0.0])
+                s.medians[metric].append(interpolated_percentile(values, 50))
+    return sorted(by_key.values(), key=lambda s: (s.profile, s.mode, s.page))
+
+
+def _sparkline(values: list[float], width: int = 220, height: int = 48) -> str:
+    if not values:
+        return ""
+    lo, hi = min(values), max(values)
+    span = (hi - lo) or 1.0
+    step = width / max(1, len(values) - 1)
+    points = " ".join(f"{i * step:.1f},{height - 4 - (v - lo) / span * (height - 8):.1f}" for i, v in enumerate(values))
+    x, y = points.split(" ")[-1].split(",")
+    return (
+        f'<svg width="{width}" height="{height}" viewBox="-4 0 {width + 8} {height}">'
+        f'<polyline fill="none" stroke="currentColor" stroke-width="1.5" points="{points}"/>'
+        f'<circle cx="{x}" cy="{y}" r="2.5"/></svg>'
+    )
+
+
+def render_html(runs: list[dict]) -> str:
+    all_series = series(runs)
+    rows = []
+    for s in all_series:
+        drifting = s.drifting
+        cells = []
+        for metric in PERF_TREND_METRICS:
+            latest = s.medians[metric][-1]
+            d = s.drift(metric)
+            change = "" if d is None else f" ({d:+.0%})"
+            unit = "" if metric == "cls" else "ms"
+            cls = ' class="drift"' if metric in drifting else ""
+            cells.append(f"<td{cls}>{_sparkline(s.medians[metric])}<br>{latest:.3g}{unit}{change}</td>")
+        row_cls = ' class="drifting"' if drifting else ""
+        rows.append(
+            f"<tr{row_cls}><th>{html.escape(s.page)}</th><td>{s.profile}</td><td>{s.mode}</td>"
+            f"<td>{len(s.timestamps)}</td>{''.join(cells)}</tr>"
+        )
+    latest = runs[-1]["environment"] if runs else {}
+    headers = "".join(f"<th>{m} median</th>" for m in PERF_TREND_METRICS)
+    flagged = sum(1 for s in all_series if s.drifting)
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Perf trends</title>
+<style>
+  body {{ font: 14px/1.4 system-ui, sans-serif; margin: 2rem; color: #222; }}
+  table {{ border-collapse: collapse; }}
+  th, td {{ padding: .4rem .6rem; border-bottom: 1px solid #ddd; text-align: left; vertical-align: top; }}
+  td svg {{ color: #2a6fdb; display: block; }}
+  tr.drifting th {{ color: #b00020; }}
+  td.drift {{ background: #fde8ea; }}
+  td.drift svg {{ color: #b00020; }}
+</style>
+</head>
+<body>
+<h1>Perf trends</h1>
+<p>{len(runs)} stored runs; latest {html.escape(str(latest.get("timestamp", "-")))} at commit
+<code>{html.escape(str(latest.get("commit") or "-"))[:12]}</code>. {flagged} series drifting: the latest median is more
+than {PERF_DRIFT_TOLERANCE:.0%} above the median of the previous {PERF_DRIFT_WINDOW} runs.</p>
+<table>
+<tr><th>Page</th><th>Profile</th><th>Mode</th><th>Runs</th>{headers}</tr>
+{chr(10).join(rows)}
+</table>
+</body>
+</html>
+"""
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=Path, default=RESULTS_DIR or REPO / ".perf" / "runs")
+    parser.add_argument("--out", type=Path, default=REPO / ".perf" / "report.html")
+    args = parser.parse_args(argv)
+    runs = load_runs(args.runs)
+    if not runs:
+        print(f"no stored runs in {args.runs}", file=sys.stderr)
+        return 1
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(render_html(runs), encoding="utf-8")
+    drifting = [s for s in series(runs) if s.drifting]
+    print(f"{args.out}: {len(runs)} runs, {len(drifting)} drifting series")
+    for s in drifting:
+        print(f"  {s.profile} {s.mode} {s.page}: " + ", ".join(f"{m} {s.drift(m):+.0%}" for m in s.drifting))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""Chromium trace and JS CPU profile capture for slow page loads.
+
+A timing table says that a load was slow, not why. When a perf test finds a
+load over its threshold, `capture` loads that page once more under the same
+profile and cache mode. This time it records a Chromium performance trace
+(`browser.start_tracing`) and a sampled V8 CPU profile (CDP `Profiler`), and
+writes both next to the failing test:
+
+  <profile>-<mode>-<page>.trace.json   chrome://tracing, DevTools Performance panel
+  <profile>-<mode>-<page>.cpuprofile   DevTools Performance panel, speedscope
+
+The re-run is separate from the timed load, so tracing overhead never leaks
+into the measured numbers. The cost is that a one-off stall may not repeat.
+
+Both files are also summarised as text: the longest main-thread tasks, each
+labelled with the work that dominated it (e.g. `FunctionCall init search.js:152`,
+`Layout`), and the JS functions with the most inclusive CPU time (e.g. Fuse
+index construction under `FuseSearchEngine.init`, or `TagFilter.applyFilter`).
+"""
+
+import bisect
+import json
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+
+import perf
+import third_party
+from constants import PERF_BUDGET_MODE, PERF_DEFAULT_PROFILE, PERF_PROFILES, PERF_TRACE_TOP
+from playwright.async_api import async_playwright
+
+# PERF_TRACE=0 skips traced re-runs of outlier loads.
+ENABLED = os.environ.get("PERF_TRACE", "1") not in ("", "0")
+TRACE_CATEGORIES = [
+    "toplevel",
+    "devtools.timeline",
+    "disabled-by-default-devtools.timeline",
+    "disabled-by-default-devtools.timeline.frame",
+    "v8.execute",
+    "blink.user_timing",
+    "loading",
+]
+# Top-level scheduler tasks on the renderer main thread, across Chromium versions.
+_TASK_NAMES = {"RunTask", "ThreadControllerImpl::RunTask", "ThreadPool_RunTask"}
+# Trace events that say what a task was busy with.
+_WORK_NAMES = {
+    "FunctionCall",
+    "EvaluateScript",
+    "v8.compile",
+    "v8.compileModule",
+    "ParseHTML",
+    "ParseAuthorStyleSheet",
+    "UpdateLayoutTree",
+    "Layout",
+    "PrePaint",
+    "Paint",
+    "TimerFire",
+    "EventDispatch",
+    "FireAnimationFrame",
+    "MajorGC",
+    "MinorGC",
+}
+_CPU_PROFILE_SKIP = {"(root)", "(idle)", "(program)"}
+
+
+@dataclass
+class Task:
+    """One top-level main-thread task, in milliseconds from the start of the trace."""
+
+    start: float
+    duration: float
+    label: str  # the longest piece of work inside the task
+
+
+@dataclass
+class FunctionTime:
+    """CPU time of one JS function (all its call sites merged), in milliseconds."""
+
+    label: str
+    self_time: float
+    total_time: float
+
+
+def _script(url: str, line: int | None = None) -> str:
+    name = url.rsplit("/", 1)[-1] if url else ""
+    return f"{name}:{line}" if name and line is not None else name
+
+
+def _work_label(event: dict) -> str:
+    data = event.get("args", {}).get("data", {}) or {}
+    if event["name"] == "FunctionCall":
+        where = _script(data.get("url", ""), (data["lineNumber"] + 1) if "lineNumber" in data else None)
+        return " ".join(part for part in ("FunctionCall", data.get("functionName") or "(anonymous)", where) if part)
+    if event["name"] in ("EvaluateScript", "v8.compile") and data.get("url"):
+        return f"{event['name']} {_script(data['url'])}"
+    if event["name"] == "EventDispatch" and data.get("type"):
+        return f"EventDispatch {data['type']}"
+    return event["name"]
+
+
+def summarize_trace(trace: dict, top: int = PERF_TRACE_TOP) -> list[Task]:
+    """The `top` longest tasks on any renderer main thread, longest first."""
+    events = trace["traceEvents"] if isinstance(trace, dict) else trace
+    main_threads = {
+        (e["pid"], e["tid"])
+        for e in events
+        if e.get("ph") == "M" and e.get("name") == "thread_name" and e["args"].get("name") == "CrRendererMain"
+    }
+    spans = [e for e in events if e.get("ph") == "X" and "dur" in e and (e["pid"], e["tid"]) in main_threads]
+    if not spans:
+        return []
+    origin = min(e["ts"] for e in spans)
+    by_thread: dict[tuple[int, int], list[dict]] = defaultdict(list)
+    for e in spans:
+        by_thread[(e["pid"], e["tid"])].append(e)
+
+    tasks = []
+    for thread in by_thread.values():
+        thread.sort(key=lambda e: e["ts"])
+        starts = [e["ts"] for e in thread]
+        for e in thread:
+            if e["name"] not in _TASK_NAMES:
+                continue
+            end = e["ts"] + e["dur"]
+            inside = thread[bisect.bisect_left(starts, e["ts"]) : bisect.bisect_right(starts, end)]
+            work = [w for w in inside if w["name"] in _WORK_NAMES and w["ts"] + w["dur"] <= end]
+            label = _work_label(max(work, key=lambda w: w["dur"])) if work else "(other)"
+            tasks.append(Task(start=(e["ts"] - origin) / 1000, duration=e["dur"] / 1000, label=label))
+    return sorted(tasks, key=lambda t: t.duration, reverse=True)[:top]
+
+
+def summarize_cpu_profile(profile: dict, top: int = PERF_TRACE_TOP) -> list[FunctionTime]:
+    """The `top` JS functions by inclusive CPU time, merging call sites.
+
+    A sample lasts until the next one, so sample i is charged timeDeltas[i + 1].
+    Recursive frames are only counted once towards their function's total.
+    """
+    nodes = {n["id"]: n for n in profile["nodes"]}
+    parent = {child: n["id"] for n in profile["nodes"] for child in n.get("children", [])}
+    deltas = profile.get("timeDeltas", [])
+    own = defaultdict(float)  # node id -> self time, us
+    for i, node_id in enumerate(profile.get("samples", [])):
+        own[node_id] += deltas[i + 1] if i + 1 < len(deltas) else 0
+
+    def key(node_id: int) -> str:
+        frame = nodes[node_id]["callFrame"]
+        name = frame.get("functionName") or "(anonymous)"
+        where = _script(frame.get("url", ""), frame["lineNumber"] + 1 if frame.get("url") else None)
+        return f"{name} {where}".strip()
+
+    self_time, total_time = defaultdict(float), defaultdict(float)
+    for node_id, us in own.items():
+        if nodes[node_id]["callFrame"].get("functionName") in _CPU_PROFILE_SKIP:
+            continue
+        self_time[key(node_id)] += us
+        seen = set()
+        walk = node_id
+        while walk is not None:
+            k = key(walk)
+            if k not in seen and nodes[walk]["callFrame"].get("functionName") not in _CPU_PROFILE_SKIP:
+                total_time[k] += us
+                seen.add(k)
+            walk = parent.get(walk)
+    ranked = sorted(total_time, key=total_time.get, reverse=True)[:top]
+    return [FunctionTime(k, self_time[k] / 1000, total_time[k] / 1000) for k in ranked]
+
+
+@dataclass
+class Artifacts:
+    """A traced re-run of one page load."""
+
+    page: str
+    trace_path: Path
+    cpu_profile_path: Path
+    tasks: list[Task]
+    functions: list[FunctionTime]
+
+    def report(self) -> str:
+        lines = [
+            f"{self.page}: trace {self.trace_path}, CPU profile {self.cpu_profile_path}",
+            "  longest main-thread tasks:",
+        ]
+        lines += [f"    {t.duration:>7.1f}ms at {t.start:>7.0f}ms  {t.label}" for t in self.tasks]
+        lines.append("  hottest JS functions (total / self):")
+        lines += [f"    {f.total_time:>7.1f}ms / {f.self_time:>6.1f}ms  {f.label}" for f in self.functions]
+        return "\n".join(lines)
+
+
+async def _capture(base_url: str, path: str, out_dir: Path, context_args: dict, mode: str, profile: str) -> Artifacts:
+    stem = f"{profile}-{mode}-{path.strip('/').replace('/', '_') or 'index'}"
+    trace_path, cpu_profile_path = out_dir / f"{stem}.trace.json", out_dir / f"{stem}.cpuprofile"
+    url = f"{base_url}{path}"
+    context_args = {**context_args, **PERF_PROFILES[profile]["context"]}
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=True)
+        try:
+            context = await perf.new_context(browser, context_args)
+            if mode == "warm":
+                primer = await context.new_page()  # fill the cache, as a warm sweep does
+                await primer.goto(url, wait_until="load")
+                await primer.close()
+            page = await context.new_page()
+            await perf.throttle(context, page, profile)
+            cdp = await context.new_cdp_session(page)
+            await cdp.send("Profiler.enable")
+            await cdp.send("Profiler.setSamplingInterval", {"interval": 100})
+            await browser.start_tracing(page=page, path=str(trace_path), categories=TRACE_CATEGORIES)
+            await cdp.send("Profiler.start")
+            try:
+                await page.goto(url, wait_until="load")
+                await page.wait_for_timeout(250)  # let deferred scripts and idle work land in the trace
+            finally:
+                cpu_profile = (await cdp.send("Profiler.stop"))["profile"]
+                trace = json.loads(await browser.stop_tracing())
+                await context.close()
+        finally:
+            await browser.close()
+    cpu_profile_path.write_text(json.dumps(cpu_profile), encoding="utf-8")
+    return Artifacts(path, trace_path, cpu_profile_path, summarize_trace(trace), summarize_cpu_profile(cpu_profile))
+
+
+def capture(
+    base_url: str,
+    path: str,
+    out_dir: Path,
+    context_args: dict | None = None,
+    mode: str = PERF_BUDGET_MODE,
+    profile: str = PERF_DEFAULT_PROFILE,
+) -> Artifacts:
+    """Trace one more load of `path` in `mode` under `profile`, writing artifacts to `out_dir`."""
+    third_party.prepare()
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    return perf.run_blocking(_capture(base_url, path, Path(out_dir), context_args or {}, mode, profile))
@@ -0,0 +1,228 @@
+"""Serve a built site the way a CDN would (JEKYLL_SERVER=static).
+
+`jekyll serve` answers through WEBrick. Its response times carry Ruby's own
+noise into every TTFB, and concurrent test workers queue on the one process.
+The static mode builds `docs/_site` once and serves it from a threaded Python
+HTTP/1.1 server instead. Serving follows what GitHub Pages does for the same
+files:
+
+- Connections are kept alive, so every response carries Content-Length.
+- Each response has a strong ETag; a matching If-None-Match gets 304 Not Modified.
+- Cache-Control is STATIC_CACHE_CONTROL, GitHub Pages' `max-age=600`.
+- `x.br` or `x.gz` is served in place of `x` when the client accepts that
+  encoding and the variant is no older than `x`. `precompress` writes the
+  variants after the build. Brotli is optional: without the `brotli` package
+  only gzip variants are written.
+- Content types come from CONTENT_TYPES, then `mimetypes`. Text types are
+  labelled UTF-8.
+- URLs resolve as Jekyll's do: `/a/` is `/a/index.html`, `/a` is redirected to
+  `/a/` when that is a directory, and otherwise falls back to `/a.html`.
+  Unknown paths get `404.html` with a 404 status.
+"""
+
+import gzip
+import mimetypes
+import threading
+from collections.abc import Callable
+from email.utils import formatdate
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+try:
+    import brotli
+except ImportError:  # optional: gzip variants only
+    brotli = None
+
+STATIC_CACHE_CONTROL = "max-age=600"
+CONTENT_TYPES = {
+    ".html": "text/html",
+    ".css": "text/css",
+    ".js": "text/javascript",
+    ".json": "application/json",
+    ".xml": "application/xml",
+    ".svg": "image/svg+xml",
+    ".txt": "text/plain",
+    ".ico": "image/x-icon",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".woff": "font/woff",
+    ".woff2": "font/woff2",
+    ".webmanifest": "application/manifest+json",
+}
+_TEXT_TYPES = ("text/", "application/json", "application/xml", "image/svg+xml", "application/manifest+json")
+COMPRESSIBLE = {".html", ".css", ".js", ".json", ".xml", ".svg", ".txt", ".webmanifest"}
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))  # preference order when a client accepts both
+MIN_COMPRESS_BYTES = 256  # below this a compressed variant saves less than its headers cost
+
+
+def content_type(path: Path) -> str:
+    kind = CONTENT_TYPES.get(path.suffix.lower()) or mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    return f"{kind}; charset=utf-8" if kind.startswith(_TEXT_TYPES) else kind
+
+
+def _compressors() -> dict[str, Callable[[bytes], bytes]]:
+    compressors = {".gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressors[".br"] = lambda data: brotli.compress(data, quality=11)
+    return compressors
+
+
+def precompress(root: Path) -> int:
+    """Write `.gz` (and `.br`, with brotli installed) next to each compressible file under `root`.
+
+    Variants that are up to date are kept; a variant that would not be smaller
+    is not written. Returns the number of files written.
+    """
+    compressors = _compressors()
+    written = 0
+    for path in root.rglob("*"):
+        if path.suffix not in COMPRESSIBLE or not path.is_file():
+            continue
+        stat = path.stat()
+        if stat.st_size < MIN_COMPRESS_BYTES:
+            continue
+        data = None
+        for suffix, compress in compressors.items():
+            variant = path.with_name(path.name + suffix)
+            if variant.exists() and variant.stat().st_mtime_ns >= stat.st_mtime_ns:
+                continue
+            data = path.read_bytes() if data is None else data
+            compressed = compress(data)
+            if len(compressed) < len(data):
+                variant.write_bytes(compressed)
+                written += 1
+    return written
+
+
+def resolve(root: Path, url_path: str) -> tuple[Path | None, bool]:
+    """The file `url_path` serves under `root`, and whether it needs a trailing-slash redirect."""
+    relative = unquote(url_path).lstrip("/")
+    candidate = (root / relative).resolve()
+    if candidate != root and root not in candidate.parents:
+        return None, False
+    if candidate.is_dir():
+        if not url_path.endswith("/"):
+            return candidate, True
+        candidate = candidate / "index.html"
+    elif not candidate.exists() and not candidate.suffix:
+        candidate = candidate.with_name(candidate.name + ".html")
+    return (candidate if candidate.is_file() else None), False
+
+
+def etag(path: Path, encoding: str | None = None) -> str:
+    stat = path.stat()
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}{"-" + encoding if encoding else ""}"'
+
+
+def _accepted(header: str) -> set[str]:
+    """Encodings an Accept-Encoding header allows (any with a non-zero q)."""
+    accepted = set()
+    for part in header.split(","):
+        name, *params = (p.strip() for p in part.split(";"))
+        q = next((p[2:] for p in params if p.startswith("q=")), "1")
+        try:
+            weight = float(q)
+        except ValueError:
+            weight = 0.0
+        if name and weight > 0:
+            accepted.add(name.lower())
+    return accepted
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    server: "StaticSiteServer"
+
+    def do_GET(self) -> None:
+        self._respond(body=True)
+
+    def do_HEAD(self) -> None:
+        self._respond(body=False)
+
+    def _respond(self, body: bool) -> None:
+        root = self.server.root
+        url_path = urlsplit(self.path).path
+        path, redirect = resolve(root, url_path)
+        if redirect:
+            query = urlsplit(self.path).query
+            self._send_empty(HTTPStatus.MOVED_PERMANENTLY, Location=url_path + "/" + (f"?{query}" if query else ""))
+            return
+        status = HTTPStatus.OK
+        if path is None:
+            status = HTTPStatus.NOT_FOUND
+            path = root / "404.html"
+            if not path.is_file():
+                self._send_empty(status)
+                return
+
+        served, encoding = path, None
+        if path.suffix in COMPRESSIBLE:
+            accepted = _accepted(self.headers.get("Accept-Encoding", ""))
+            for name, suffix in ENCODINGS:
+                variant = path.with_name(path.name + suffix)
+                if name in accepted and variant.is_file() and variant.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+                    served, encoding = variant, name
+                    break
+
+        headers = {
+            "Content-Type": content_type(path),
+            "ETag": etag(served, encoding),
+            "Last-Modified": formatdate(path.stat().st_mtime, usegmt=True),
+            "Cache-Control": STATIC_CACHE_CONTROL,
+        }
+        if path.suffix in COMPRESSIBLE:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        if status == HTTPStatus.OK and self._not_modified(headers["ETag"]):
+            self._send_empty(HTTPStatus.NOT_MODIFIED, **{k: v for k, v in headers.items() if k != "Content-Type"})
+            return
+
+        data = served.read_bytes()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if body:
+            self.wfile.write(data)
+
+    def _not_modified(self, tag: str) -> bool:
+        header = self.headers.get("If-None-Match")
+        if not header:
+            return False
+        tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+        return "*" in tags or tag in tags
+
+    def _send_empty(self, status: HTTPStatus, **headers: str) -> None:
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name.replace("_", "-"), value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args) -> None:
+        pass  # one line per request would drown the pytest output
+
+
+class StaticSiteServer(ThreadingHTTPServer):
+    """A threaded server for the built site under `root`; one thread per connection."""
+
+    daemon_threads = True
+
+    def __init__(self, root: Path, address: tuple[str, int]):
+        self.root = root.resolve()
+        super().__init__(address, SiteHandler)
+
+    def start(self) -> "StaticSiteServer":
+        threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.1}, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
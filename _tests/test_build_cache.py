@@ -0,0 +1,140 @@
+"""Tests for the rebuild decision in build_cache.py (no Jekyll needed).
+
+Each test lays out a small docs/ tree, records it as built, changes something
+and checks which path `plan` takes.
+"""
+
+import os
+
+import build_cache
+import pytest
+
+COMMAND = "bundle exec jekyll build --source docs --destination docs/_site"
+POST = "---\ntitle: {title}\n---\n{body}\n"
+
+
+@pytest.fixture
+def docs(tmp_path):
+    docs = tmp_path / "docs"
+    for rel, text in {
+        "_config.yml": "title: x\n",
+        "_layouts/post.html": "{{ content }}",
+        "_pages/about.md": "---\ntitle: About\n---\n",
+        "_posts/2024-01-01-a.md": POST.format(title="A", body="one"),
+        "_posts/2024-01-02-b.md": POST.format(title="B", body="two"),
+        "_previews/2024-01-03-c.md": POST.format(title="C", body="three"),
+        "_site/index.html": "built",
+    }.items():
+        (docs / rel).parent.mkdir(parents=True, exist_ok=True)
+        (docs / rel).write_text(text, encoding="utf-8")
+    return docs
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return tmp_path / "build.json"
+
+
+def built(docs, cache, command=COMMAND):
+    """Record `docs` as built by `command`, as a successful session would."""
+    plan = build_cache.plan(command, docs, docs / "_site", cache)
+    build_cache.record(plan, command, cache, docs / "_site")
+    return plan
+
+
+def plan(docs, cache, **kwargs):
+    return build_cache.plan(kwargs.pop("command", COMMAND), docs, docs / "_site", cache, **kwargs)
+
+
+class TestPlan:
+    def test_first_build_is_full(self, docs, cache):
+        assert built(docs, cache).action == "full"
+
+    def test_unchanged_inputs_reuse_the_site(self, docs, cache):
+        built(docs, cache)
+        assert plan(docs, cache).action == "reuse"
+
+    def test_post_body_edits_build_incrementally(self, docs, cache):
+        built(docs, cache)
+        (docs / "_posts/2024-01-02-b.md").write_text(POST.format(title="B", body="two, revised"), encoding="utf-8")
+        (docs / "_previews/2024-01-03-c.md").write_text(POST.format(title="C", body="3"), encoding="utf-8")
+        result = plan(docs, cache)
+        assert result.action == "incremental"
+        assert result.changed == ["_posts/2024-01-02-b.md", "_previews/2024-01-03-c.md"]
+
+    @pytest.mark.parametrize(
+        "rel, text",
+        [
+            ("_layouts/post.html", "<main>{{ content }}</main>"),
+            ("_config.yml", "title: y\n"),
+            ("_pages/about.md", "---\ntitle: About me\n---\n"),
+            ("public/css/site.css", "body {}"),
+            ("_posts/2024-01-01-a.md", POST.format(title="A, retitled", body="one")),
+            ("_posts/2024-02-01-new.md", POST.format(title="New", body="four")),
+        ],
+        ids=["layout", "config", "page", "asset", "front-matter", "new-post"],
+    )
+    def test_other_changes_build_in_full(self, docs, cache, rel, text):
+        built(docs, cache)
+        (docs / rel).parent.mkdir(parents=True, exist_ok=True)
+        (docs / rel).write_text(text, encoding="utf-8")
+        result = plan(docs, cache)
+        assert result.action == "full" and rel in result.reason
+
+    def test_removed_post_builds_in_full(self, docs, cache):
+        built(docs, cache)
+        (docs / "_posts/2024-01-01-a.md").unlink()
+        assert plan(docs, cache).reason == "posts added or removed: _posts/2024-01-01-a.md"
+
+    def test_too_many_changed_posts_build_in_full(self, docs, cache):
+        built(docs, cache)
+        for name, title in (("_posts/2024-01-01-a.md", "A"), ("_posts/2024-01-02-b.md", "B")):
+            (docs / name).write_text(POST.format(title=title, body="edited"), encoding="utf-8")
+        assert plan(docs, cache, max_posts=2).action == "incremental"
+        assert plan(docs, cache, max_posts=1).action == "full"
+
+    def test_missing_site_builds_in_full(self, docs, cache):
+        built(docs, cache)
+        (docs / "_site/index.html").unlink()
+        assert plan(docs, cache).reason == "_site is missing"
+
+    def test_a_different_command_builds_in_full(self, docs, cache):
+        built(docs, cache, command="bundle exec jekyll serve --port 4000")
+        assert plan(docs, cache).reason == "the build command changed"
+
+    def test_build_output_is_not_an_input(self, docs, cache):
+        built(docs, cache)
+        (docs / ".jekyll-metadata").write_bytes(b"\x04\x08")
+        (docs / "_site/index.html.gz").write_bytes(b"\x1f\x8b")  # precompressed for the static server
+        assert plan(docs, cache).action == "reuse"
+
+    def test_site_rebuilt_by_another_command_builds_in_full(self, docs, cache):
+        """`make serve` or `make preview --drafts` wrote docs/_site since the recorded build."""
+        built(docs, cache)
+        (docs / "_site/index.html").write_text("rebuilt", encoding="utf-8")
+        assert plan(docs, cache).reason == "_site was rebuilt by another command"
+
+    def test_disabled_cache_always_builds_in_full(self, docs):
+        assert build_cache.plan(COMMAND, docs, docs / "_site", None).action == "full"
+
+
+class TestRecord:
+    def test_invalidate_forgets_the_build(self, docs, cache):
+        built(docs, cache)
+        build_cache.invalidate(cache)
+        assert plan(docs, cache).reason == "no previous build recorded"
+
+    def test_unchanged_stat_skips_rehashing(self, docs, cache):
+        """Same mtime and size: the recorded hash is trusted without reading the file."""
+        built(docs, cache)
+        post = docs / "_posts/2024-01-01-a.md"
+        stat = post.stat()
+        post.write_text(POST.format(title="A", body="ONE"), encoding="utf-8")
+        os.utime(post, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert plan(docs, cache).action == "reuse"
+
+    def test_describe_names_the_path(self):
+        assert build_cache.Plan("reuse", "").describe() == "reused docs/_site (no input changed)"
+        incremental = build_cache.Plan("incremental", "", ["_posts/a.md"])
+        assert incremental.describe() == "incremental build (1 changed: _posts/a.md)"
+        assert build_cache.Plan("full", "_config.yml changed").describe() == "full build (_config.yml changed)"
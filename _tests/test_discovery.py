@@ -0,0 +1,189 @@
+"""Tests for source-tree discovery (no server needed).
+
+Guards the front-matter cache that every parametrized test module leans on at
+import time: a stale entry would silently test the wrong URLs.
+"""
+
+import json
+import os
+
+import discovery
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def no_index(monkeypatch):
+    """Keep these tests from reading or overwriting the real on-disk index."""
+    monkeypatch.setattr(discovery, "INDEX_PATH", None)
+
+
+@pytest.fixture
+def doc(tmp_path):
+    path = tmp_path / "2021-02-03-hello-world.md"
+    path.write_text("---\ntitle: Hello\ntags: [a]\n---\nBody text\n", encoding="utf-8")
+    yield path
+    discovery.reset()
+
+
+class TestFrontMatterCache:
+    def test_repeat_reads_are_served_from_cache(self, doc):
+        """A second lookup of an unchanged file returns the cached parse."""
+        assert discovery._front_matter(doc) is discovery._front_matter(doc)
+
+    def test_changed_file_is_reparsed(self, doc):
+        """Editing a file (new size and mtime) invalidates its entry."""
+        assert discovery._front_matter(doc)["title"] == "Hello"
+        doc.write_text("---\ntitle: Changed title\n---\n", encoding="utf-8")
+        st = doc.stat()
+        os.utime(doc, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        assert discovery._front_matter(doc)["title"] == "Changed title"
+
+    def test_invalidate_forces_reparse(self, doc):
+        """invalidate() drops entries even when mtime and size are unchanged."""
+        first = discovery._front_matter(doc)
+        discovery.invalidate(doc)
+        second = discovery._front_matter(doc)
+        assert first == second and first is not second
+
+    def test_missing_file_is_empty(self, tmp_path):
+        assert discovery._front_matter(tmp_path / "nope.md") == {}
+
+
+@pytest.fixture
+def site(tmp_path):
+    """A miniature docs/ tree with two posts and one preview."""
+    posts, previews = tmp_path / "_posts", tmp_path / "_previews"
+    posts.mkdir()
+    previews.mkdir()
+    (posts / "2020-01-02-first.md").write_text("---\ntags: [x, y]\n---\n", encoding="utf-8")
+    (posts / "2020-03-04-second.md").write_text("---\npermalink: /custom\ntags: y\n---\n", encoding="utf-8")
+    (posts / "notes.txt").write_text("not a document", encoding="utf-8")
+    (previews / "2021-05-06-draft.md").write_text("---\ndate: 2021-06-07\n---\n", encoding="utf-8")
+    yield tmp_path
+    discovery.reset()
+
+
+class TestContentManifest:
+    def test_records_are_derived_from_front_matter_and_filename(self, site):
+        m = discovery.ContentManifest.build(site)
+        assert [d.url for d in m.collection("posts")] == ["/2020/01/02/first/", "/custom/"]
+        second = m.by_url["/custom/"]
+        assert second.permalink == "/custom" and second.tags == ("y",)
+        assert m.collection("previews")[0].date.isoformat() == "2021-06-07"
+        assert len(m) == 3
+
+    def test_tag_index_spans_collections(self, site):
+        m = discovery.ContentManifest.build(site)
+        assert sorted(m.by_tag) == ["x", "y"]
+        assert [d.url for d in m.by_tag["y"]] == ["/2020/01/02/first/", "/custom/"]
+
+    def test_views_are_served_from_one_manifest(self, monkeypatch, site):
+        monkeypatch.setattr(discovery, "DOCS", site)
+        monkeypatch.setattr(discovery, "_MANIFEST", None)
+        built = discovery.manifest()
+        assert discovery.post_tags() == ["x", "y"]
+        assert discovery.tagged_post_urls() == ["/2020/01/02/first/", "/custom/"]
+        assert discovery.preview_urls() == ["/2021/05/06/draft/"]
+        assert discovery.manifest() is built
+
+    def test_non_string_tags_still_count_as_tagged(self, monkeypatch, site):
+        """Only string tags are indexed, but any declared `tags:` keeps a post in the tag tests."""
+        (site / "_posts" / "2020-05-06-numeric.md").write_text("---\ntags: [2020, 1]\n---\n", encoding="utf-8")
+        monkeypatch.setattr(discovery, "DOCS", site)
+        monkeypatch.setattr(discovery, "_MANIFEST", None)
+        assert discovery.manifest().by_url["/2020/05/06/numeric/"].tags == ()
+        assert "/2020/05/06/numeric/" in discovery.tagged_post_urls()
+        assert discovery.post_tags() == ["x", "y"]
+
+    def test_parallel_build_matches_serial(self, monkeypatch, site):
+        monkeypatch.setattr(discovery, "_PARALLEL_MIN", 1)
+        serial = discovery.ContentManifest.build(site).documents
+        discovery.reset()
+        parallel = discovery.ContentManifest.build(site, workers=2).documents
+        assert parallel == serial
+
+
+class TestHeaderReader:
+    def test_header_stops_at_closing_fence(self, tmp_path):
+        path = tmp_path / "p.md"
+        path.write_text("---\ntitle: a---b\n---\nbody\n---\nmore: body\n", encoding="utf-8")
+        assert discovery.read_header(path) == "title: a---b\n"
+        assert discovery.read_front_matter(path) == {"title": "a---b"}
+
+    def test_unterminated_or_missing_block_is_none(self, tmp_path):
+        path = tmp_path / "p.md"
+        path.write_text("---\ntitle: never closed\n", encoding="utf-8")
+        assert discovery.read_front_matter(path) is None
+        path.write_text("no front matter\n---\n", encoding="utf-8")
+        assert discovery.read_front_matter(path) is None
+
+
+class TestPersistentIndex:
+    @pytest.fixture
+    def indexed(self, monkeypatch, site):
+        monkeypatch.setattr(discovery, "DOCS", site)
+        monkeypatch.setattr(discovery, "INDEX_PATH", site / "index.json")
+        discovery.reset()
+        return site
+
+    def _rebuild(self):
+        """A fresh session: nothing in memory, the index is all that survives."""
+        discovery.reset()
+        return discovery.manifest().documents
+
+    def test_warm_start_skips_yaml(self, monkeypatch, indexed):
+        cold = self._rebuild()
+        assert (indexed / "index.json").is_file()
+        monkeypatch.setattr(discovery, "_parse_header", lambda header: pytest.fail("re-parsed an unchanged file"))
+        assert self._rebuild() == cold
+
+    def test_touched_file_with_same_header_is_not_reparsed(self, monkeypatch, indexed):
+        cold = self._rebuild()
+        post = indexed / "_posts" / "2020-01-02-first.md"
+        post.write_text(post.read_text(encoding="utf-8") + "New body paragraph.\n", encoding="utf-8")
+        monkeypatch.setattr(discovery, "_parse_header", lambda header: pytest.fail("header unchanged"))
+        assert self._rebuild() == cold
+
+    def test_changed_header_is_reparsed(self, indexed):
+        self._rebuild()
+        post = indexed / "_posts" / "2020-01-02-first.md"
+        post.write_text("---\ntags: [z]\n---\n", encoding="utf-8")
+        assert discovery.ContentManifest.build(indexed).by_url["/2020/01/02/first/"].tags == ("z",)
+        assert [d.tags for d in self._rebuild() if d.path == post] == [("z",)]
+
+    def test_invalidate_distrusts_the_index(self, indexed):
+        """A rewrite keeping size and mtime is seen after invalidate(), even though the index still matches it."""
+        self._rebuild()
+        post = indexed / "_posts" / "2020-01-02-first.md"
+        stat = post.stat()
+        post.write_text("---\ntags: [z, w]\n---\n", encoding="utf-8")
+        os.utime(post, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert post.stat().st_size == stat.st_size
+        discovery.invalidate()
+        assert discovery._front_matter(post)["tags"] == ["z", "w"]
+
+    def test_trust_returns_after_the_reload(self, monkeypatch, indexed):
+        """invalidate() distrusts one reload of the index, not every one after it."""
+        self._rebuild()
+        discovery.invalidate()
+        discovery.manifest()  # reloads, verifies each entry by digest and saves
+        discovery._FM_CACHE.clear()
+        discovery._MANIFEST, discovery._index_loaded = None, False
+        monkeypatch.setattr(discovery, "read_header", lambda path: pytest.fail("re-read a trusted entry"))
+        discovery.manifest()
+
+    def test_unserializable_front_matter_is_left_out(self, indexed):
+        self._rebuild()
+        post = indexed / "_posts" / "2020-01-02-first.md"
+        discovery._FM_CACHE[str(post)] = (*discovery._FM_CACHE[str(post)][:2], {"odd": {1, 2}})
+        discovery._index_dirty = True
+        discovery.save_index([d.path for d in discovery.manifest().documents])
+        files = json.loads((indexed / "index.json").read_text(encoding="utf-8"))["files"]
+        assert "_posts/2020-01-02-first.md" not in files and files
+
+    def test_dates_round_trip(self, indexed):
+        cold = self._rebuild()
+        assert self._rebuild() == cold
+        assert (
+            discovery._front_matter(indexed / "_previews" / "2021-05-06-draft.md")["date"].isoformat() == "2021-06-07"
+        )
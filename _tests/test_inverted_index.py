@@ -0,0 +1,181 @@
+"""Tests for the BM25 inverted index in _tools/inverted_index.py (no server needed).
+
+`Searcher` is the reference search.js's InvertedIndexSearchEngine is checked
+against, so these pin down its ranking, typo tolerance, term normalisation,
+which shards a query loads and the compact encoding search.js decodes. The
+committed index is checked against a fresh build from docs/_posts.
+"""
+
+import inverted_index
+import porter
+import pytest
+import search_index
+
+DOCS = [
+    {"title": "Notes on testing", "url": "/a/", "date": "x", "content": "How we test the blog."},
+    {"title": "Cooking", "url": "/b/", "date": "x", "content": "A test of patience, then another test."},
+    {"title": "Gardening", "url": "/c/", "date": "x", "content": "Nothing to see here."},
+]
+SMALL_SHARDS = 20  # bytes; splits DOCS' terms into many shards, some by two-letter prefix
+
+
+@pytest.fixture
+def searcher():
+    return inverted_index.Searcher(*inverted_index.build(DOCS))
+
+
+class TestBuild:
+    def test_terms_are_stemmed_words_without_stop_words(self):
+        assert inverted_index.tokenize("The Café, 2024_notes and testing!") == ["café", "2024", "note", "test"]
+
+    def test_postings_weight_title_terms(self):
+        searcher = inverted_index.Searcher(*inverted_index.build(DOCS))
+        searcher.prepare("cook")
+        assert searcher.postings(searcher.term_ids["cook"]) == [(1, inverted_index.FIELD_WEIGHTS["title"])]
+
+    def test_rarer_terms_get_higher_idf(self):
+        _, terms, _ = inverted_index.build(DOCS)
+        idf = {term: idf for shard in terms for term, idf in zip(shard["terms"].split(" "), shard["idf"])}
+        assert idf["garden"] > idf["test"]
+
+    def test_indexes_full_content(self):
+        """Words far past the 100-word excerpt search-index.json stops at are still found."""
+        long_doc = {"title": "Long", "url": "/long/", "date": "x", "content": "filler " * 500 + "needle"}
+        searcher = inverted_index.Searcher(*inverted_index.build([*DOCS, long_doc]))
+        assert [doc for doc, _ in searcher.search("needle")] == [3]
+        assert len(searcher.docs[3]["content"].split()) == inverted_index.EXCERPT_WORDS
+
+    def test_repeated_strings_are_stored_once(self):
+        built = inverted_index.build(DOCS)
+        assert built[0]["strings"].count("x") == 1
+        assert inverted_index.Searcher(*built).docs[1] == {
+            "url": "/b/",
+            "title": "Cooking",
+            "date": "x",
+            "content": DOCS[1]["content"],
+        }
+
+    @pytest.mark.parametrize("postings", [[], [(0, 1)], [(3, 1), (4, 7), (90, 1), (1000, 2)]])
+    def test_postings_round_trip(self, postings):
+        assert inverted_index.decode_postings(inverted_index.encode_postings(postings)) == postings
+
+    def test_postings_are_delta_encoded(self):
+        """Gaps, not doc ids; a tf of 1 costs nothing."""
+        assert inverted_index.encode_postings([(3, 1), (4, 7), (90, 1)]) == [6, 3, 7, 172]
+
+
+class TestSearch:
+    def test_ranks_by_bm25(self, searcher):
+        """The title match wins; then two body mentions of "test" beat one."""
+        assert [doc for doc, _ in searcher.search("test")] == [0, 1]
+
+    def test_word_forms_match_through_stems(self, searcher):
+        assert [doc for doc, _ in searcher.search("tested")] == [doc for doc, _ in searcher.search("test")]
+
+    def test_stop_word_queries_match_nothing(self, searcher):
+        assert searcher.search("the of to") == []
+
+    def test_title_match_outranks_body_match(self, searcher):
+        assert searcher.search("gardening nothing")[0][0] == 2
+        assert [doc for doc, _ in searcher.search("cooking")] == [1]
+
+    def test_unknown_terms_match_nothing(self, searcher):
+        assert searcher.search("xyznonexistent123456") == []
+        assert searcher.search("   ") == []
+
+    @pytest.mark.parametrize("typo", ["tset", "tesst", "pateince"])
+    def test_typos_match_through_ngram_candidates(self, searcher, typo):
+        assert searcher.search(typo), f"{typo!r} should fuzzily match"
+
+    def test_fuzzy_matches_score_below_exact(self, searcher):
+        assert searcher.search("patience")[0][1] > searcher.search("pateince")[0][1]
+
+    def test_short_terms_are_not_fuzzy(self, searcher):
+        """Below 4 characters every term is a word of its own, not a typo."""
+        assert searcher.search("tst") == []
+
+    @pytest.mark.parametrize(
+        "a, b, expected",
+        [("test", "test", 0), ("tset", "test", 1), ("test", "tests", 1), ("abcd", "dcba", 3)],
+    )
+    def test_edit_distance_counts_transpositions_once(self, a, b, expected):
+        assert inverted_index.edit_distance(a, b, limit=2) == min(expected, 3)
+
+
+class TestShards:
+    def test_small_shards_split_by_prefix(self):
+        """Past the limit a letter's terms split into two-letter groups; shards keep vocabulary order."""
+        index, terms, postings = inverted_index.build(DOCS, limit=SMALL_SHARDS)
+        assert len(terms) == len(postings) == len(index["shards"]) > 1
+        assert any(len(prefix) == 2 for prefixes in index["shards"] for prefix in prefixes.split(" "))
+        vocabulary = [term for shard in terms for term in shard["terms"].split(" ")]
+        assert vocabulary == sorted(vocabulary)
+        assert index["offsets"] == [sum(len(shard["idf"]) for shard in terms[:s]) for s in range(len(terms))]
+
+    def test_exact_query_loads_only_its_shard(self):
+        searcher = inverted_index.Searcher(*inverted_index.build(DOCS, limit=SMALL_SHARDS))
+        assert [doc for doc, _ in searcher.search("garden")] == [2]
+        s = searcher.shard_of("garden")
+        assert searcher.loaded == {("terms", s), ("postings", s)}
+
+    def test_typo_loads_its_letters_terms_and_its_matches_postings(self):
+        searcher = inverted_index.Searcher(*inverted_index.build(DOCS, limit=SMALL_SHARDS))
+        assert searcher.search("pateince")
+        letters = {s for letter in "pa" for s in searcher.letter_shards(letter)}
+        match = searcher.shard_holding(searcher.term_ids["patienc"])
+        assert {s for kind, s in searcher.loaded if kind == "terms"} == letters | {searcher.shard_of("pateinc")}
+        assert {s for kind, s in searcher.loaded if kind == "postings"} <= {searcher.shard_of("pateinc"), match}
+        assert ("postings", match) in searcher.loaded
+
+    def test_shards_from_another_build_are_refused(self):
+        index, _, _ = inverted_index.build(DOCS)
+        _, terms, postings = inverted_index.build(DOCS[:2])
+        with pytest.raises(ValueError, match="another build"):
+            inverted_index.Searcher(index, terms, postings).search("test")
+
+    def test_write_replaces_stale_shards(self, tmp_path):
+        inverted_index.write(*inverted_index.build(DOCS, limit=SMALL_SHARDS), tmp_path / "index.json", tmp_path)
+        inverted_index.write(*inverted_index.build(DOCS), tmp_path / "index.json", tmp_path)
+        assert sorted(p.name for p in (tmp_path / "terms").iterdir()) == ["0.json"]
+        assert sorted(p.name for p in (tmp_path / "postings").iterdir()) == ["0.json"]
+
+
+class TestCommittedIndex:
+    def test_committed_index_is_current(self, tmp_path):
+        """The committed index and shards should be exactly what docs/_posts builds today."""
+        written = inverted_index.write(
+            *inverted_index.build(search_index.read_posts()), tmp_path / "index.json", tmp_path / "shards"
+        )
+        committed = [inverted_index.DEFAULT_OUT] + [
+            inverted_index.DEFAULT_SHARDS / path.relative_to(tmp_path / "shards") for path in written[1:]
+        ]
+        stale = "regenerate them with `make search-index`"
+        assert sorted(p.name for p in inverted_index.DEFAULT_SHARDS.glob("*/*.json")) == sorted(
+            p.name for p in written[1:]
+        ), stale
+        for fresh, path in zip(written, committed):
+            assert path.is_file() and path.read_bytes() == fresh.read_bytes(), f"{path.name} is stale; {stale}"
+
+
+class TestPorter:
+    @pytest.mark.parametrize(
+        "word, expected",
+        [
+            ("caresses", "caress"),
+            ("ponies", "poni"),
+            ("agreed", "agre"),
+            ("hopping", "hop"),
+            ("filing", "file"),
+            ("happy", "happi"),
+            ("relational", "relat"),
+            ("generalizations", "gener"),
+            ("replacement", "replac"),
+            ("adoption", "adopt"),
+            ("controll", "control"),
+            ("as", "as"),
+            ("café", "café"),
+        ],
+    )
+    def test_reference_examples(self, word, expected):
+        """Examples from Porter's paper; short and non-ASCII words are left alone."""
+        assert porter.stem(word) == expected
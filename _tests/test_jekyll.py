@@ -0,0 +1,224 @@
+"""Tests for the Jekyll server startup in jekyll.py (no Jekyll needed).
+
+Small Python processes stand in for `jekyll serve`. They print Jekyll's
+progress markers and exit or sleep, and a local http.server plays the site, so
+readiness, failure and the deadline are exercised against real processes and
+sockets. Sharing is tested the same way, with several worker processes
+entering `jekyll.shared` at once.
+"""
+
+import io
+import json
+import socket
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import jekyll
+import pytest
+
+JEKYLL_OUTPUT = """\
+Configuration file: docs/_config.yml
+            Source: docs
+       Destination: docs/_site
+      Generating...
+                    done in 12.345 seconds.
+ Auto-regeneration: enabled for 'docs'
+    Server address: http://127.0.0.1:4000
+  Server running... press ctrl-c to stop.
+"""
+
+
+@pytest.fixture
+def site(tmp_path):
+    """A URL something answers at."""
+    handler = lambda *args: SimpleHTTPRequestHandler(*args, directory=str(tmp_path))  # noqa: E731
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def closed_url():
+    """A URL nothing listens at."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/"
+
+
+def fake_jekyll(script: str) -> subprocess.Popen:
+    return jekyll.spawn([sys.executable, "-u", "-c", script])
+
+
+class TestOutputWatcher:
+    def test_reads_build_time_and_running_marker(self):
+        watcher = jekyll.OutputWatcher(io.StringIO(JEKYLL_OUTPUT))
+        watcher.join(timeout=5)
+        assert watcher.build_seconds == 12.345
+        assert watcher.wake.is_set()
+        assert watcher.output().endswith("Server running... press ctrl-c to stop.")
+
+    def test_keeps_only_the_tail(self):
+        watcher = jekyll.OutputWatcher(io.StringIO("".join(f"line {i}\n" for i in range(100))), keep=3)
+        watcher.join(timeout=5)
+        assert watcher.output() == "line 97\nline 98\nline 99"
+
+    def test_wakes_when_output_ends_without_markers(self):
+        watcher = jekyll.OutputWatcher(io.StringIO("Error: could not read docs/_config.yml\n"))
+        assert watcher.wake.wait(timeout=5)
+        assert watcher.build_seconds is None
+
+
+def test_backoff_doubles_up_to_the_cap():
+    delays = jekyll.backoff(0.05, 1.0)
+    assert [next(delays) for _ in range(7)] == [0.05, 0.1, 0.2, 0.4, 0.8, 1.0, 1.0]
+
+
+class TestWaitUntilReady:
+    def test_returns_once_the_server_answers(self, site):
+        proc = fake_jekyll("import time; time.sleep(30)")
+        try:
+            watcher = jekyll.OutputWatcher(proc.stdout)
+            assert jekyll.wait_until_ready(site, proc, watcher, timeout=5) == 1
+        finally:
+            jekyll.stop(proc)
+
+    def test_running_marker_cuts_the_backoff_short(self, closed_url):
+        """A server that comes up mid-delay is probed when it says so, not when the delay runs out."""
+        port = urlparse(closed_url).port
+        proc = fake_jekyll(
+            "import time; from http.server import HTTPServer, SimpleHTTPRequestHandler; time.sleep(0.3); "
+            f"server = HTTPServer(('127.0.0.1', {port}), SimpleHTTPRequestHandler); "
+            "print('Server running... press ctrl-c to stop.'); server.serve_forever()"
+        )
+        try:
+            watcher = jekyll.OutputWatcher(proc.stdout)
+            start = time.monotonic()
+            assert jekyll.wait_until_ready(closed_url, proc, watcher, timeout=30, initial=10, cap=10) == 2
+            assert time.monotonic() - start < 5
+        finally:
+            jekyll.stop(proc)
+
+    def test_failed_startup_quotes_jekyll_output(self, closed_url):
+        proc = fake_jekyll("print('Error: could not read docs/_config.yml'); raise SystemExit(1)")
+        watcher = jekyll.OutputWatcher(proc.stdout)
+        with pytest.raises(RuntimeError, match="status 1") as failure:
+            jekyll.wait_until_ready(closed_url, proc, watcher, timeout=10)
+        assert "could not read docs/_config.yml" in str(failure.value)
+
+    def test_gives_up_at_the_deadline(self, closed_url):
+        proc = fake_jekyll("print('Generating...'); import time; time.sleep(30)")
+        try:
+            watcher = jekyll.OutputWatcher(proc.stdout)
+            start = time.monotonic()
+            with pytest.raises(TimeoutError, match="JEKYLL_STARTUP_TIMEOUT") as failure:
+                jekyll.wait_until_ready(closed_url, proc, watcher, timeout=0.5)
+            assert time.monotonic() - start < 3
+            assert "Generating..." in str(failure.value)
+        finally:
+            jekyll.stop(proc)
+
+
+class TestBuild:
+    def test_returns_the_reported_build_time(self):
+        script = f"print({JEKYLL_OUTPUT.split('Auto-regeneration')[0]!r})"
+        assert jekyll.build([sys.executable, "-c", script], timeout=10) == 12.345
+
+    def test_failed_build_quotes_jekyll_output(self):
+        script = "print('Liquid Exception: undefined filter in _layouts/tags.html'); raise SystemExit(1)"
+        with pytest.raises(RuntimeError, match="undefined filter"):
+            jekyll.build([sys.executable, "-c", script], timeout=10)
+
+
+@pytest.mark.parametrize("action, flags", [("incremental", ["--incremental"]), ("full", [])])
+def test_only_incremental_plans_build_incrementally(monkeypatch, action, flags):
+    invalidated = []
+    monkeypatch.setattr(jekyll.build_cache, "invalidate", lambda: invalidated.append(True))
+    assert jekyll.build_flags(jekyll.build_cache.Plan(action, "")) == flags
+    assert invalidated == [True]
+
+
+def test_reuses_a_running_server(site, monkeypatch):
+    monkeypatch.setattr(jekyll, "LAST_STARTUP", None)
+    with jekyll.serve(site) as url:
+        assert url == site
+    assert jekyll.LAST_STARTUP == jekyll.Startup(site, reused=True)
+
+
+def test_summary_reports_build_and_ready_times():
+    startup = jekyll.Startup("http://x/", False, "serve", "full build (x)", 12.3, 12.6, probes=4)
+    assert startup.summary() == (
+        "jekyll: full build (x), built in 12.30 s, jekyll serve ready at http://x/ after 12.60 s (4 probes)"
+    )
+
+
+# A worker: shares a stand-in server (an http.server thread) through jekyll.shared,
+# logging start/attach/leave/stop to EVENTS, and holds it for HOLD seconds.
+WORKER = textwrap.dedent(
+    """
+    import os, sys, threading, time
+    from contextlib import contextmanager
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+    from pathlib import Path
+    from urllib.parse import urlparse
+    sys.path.insert(0, {tests!r})
+    import jekyll
+
+    url, state_dir, events, hold = sys.argv[1], Path(sys.argv[2]), sys.argv[3], float(sys.argv[4])
+
+    def log(event):
+        with open(events, "a") as f:
+            f.write(f"{{event}} {{os.getpid()}}\\n")
+
+    @contextmanager
+    def start(base_url):
+        server = ThreadingHTTPServer(("127.0.0.1", urlparse(base_url).port), SimpleHTTPRequestHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        log("start")
+        yield base_url
+        log("stop")
+        server.shutdown()
+        server.server_close()
+
+    with jekyll.shared(url, state_dir=state_dir, poll=0.05, start=start):
+        log("attach")
+        assert jekyll.probe(url)
+        time.sleep(hold)
+        log("leave")
+    """
+)
+
+
+class TestShared:
+    def run_workers(self, tmp_path, url, holds):
+        events = tmp_path / "events.log"
+        script = WORKER.format(tests=str(jekyll.REPO / "_tests"))
+        workers = [
+            subprocess.Popen([sys.executable, "-c", script, url, str(tmp_path / "state"), str(events), str(hold)])
+            for hold in holds
+        ]
+        assert [w.wait(timeout=30) for w in workers] == [0] * len(holds)
+        return [line.split() for line in events.read_text().splitlines()]
+
+    def test_workers_share_one_server_until_the_last_leaves(self, tmp_path, closed_url):
+        events = self.run_workers(tmp_path, closed_url, holds=[0.2, 0.5, 1.0, 0.3])
+        kinds = [kind for kind, _ in events]
+        assert kinds.count("start") == 1 and kinds.count("stop") == 1 and kinds.count("attach") == 4
+        assert kinds[0] == "start" and kinds[-1] == "stop"
+        assert kinds.index("stop") > max(i for i, kind in enumerate(kinds) if kind == "leave")
+        assert not (tmp_path / "state" / f"{urlparse(closed_url).port}.json").exists()
+
+    def test_stale_state_is_replaced(self, tmp_path, closed_url):
+        (tmp_path / "state").mkdir()
+        dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+        stale = {"owner": int(dead.stdout), "url": closed_url, "holders": [int(dead.stdout)]}
+        (tmp_path / "state" / f"{urlparse(closed_url).port}.json").write_text(json.dumps(stale))
+        kinds = [kind for kind, _ in self.run_workers(tmp_path, closed_url, holds=[0.1])]
+        assert kinds == ["start", "attach", "leave", "stop"]
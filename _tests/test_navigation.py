@@ -2,8 +2,9 @@
 
 Nav membership and order are driven by a `nav_order` front-matter key, sorted
 ascending. The test does NOT hardcode the order: it reads `nav_order` out of
-the page sources (via PyYAML) and asserts the rendered nav matches that derived
-list. Renumber `nav_order` freely and the test recomputes the expectation.
+the page sources (via `discovery.read_front_matter`) and asserts the rendered
+nav matches that derived list. Renumber `nav_order` freely and the test
+recomputes the expectation.
 
 Mirrors the Liquid in _includes/sidebar.html:
     site.pages | where_exp: "p", "p.nav_order" | sort: "nav_order"
@@ -11,10 +12,10 @@ with label = nav_title | default: title.
 """
 
 from pathlib import Path
-from typing import List, Optional
+from typing import List
 
-import yaml
 from constants import ANIMATION_TIMEOUT, SELECTORS
+from discovery import read_front_matter
 from playwright.sync_api import Page
 
 # --- Front-matter discovery (matches Jekyll's site.pages) --------------------
@@ -30,24 +31,6 @@ def _site_root() -> Path:
     raise FileNotFoundError("Could not locate a _pages directory")
 
 
-def _front_matter(path: Path) -> Optional[dict]:
-    """Parse a file's YAML front-matter block, or None if absent/invalid."""
-    try:
-        text = path.read_text(encoding="utf-8")
-    except (UnicodeDecodeError, OSError):
-        return None
-    if not text.startswith("---"):
-        return None
-    parts = text.split("---", 2)  # ['', '<yaml>', '<body>']
-    if len(parts) < 3:
-        return None
-    try:
-        data = yaml.safe_load(parts[1])
-    except yaml.YAMLError:
-        return None
-    return data if isinstance(data, dict) else None
-
-
 def _candidate_pages(root: Path) -> List[Path]:
     """Files Jekyll treats as pages: _pages/** plus root-level .md/.html."""
     paths: List[Path] = []
@@ -64,7 +47,7 @@ def expected_nav_labels() -> List[str]:
     root = _site_root()
     entries = []
     for path in _candidate_pages(root):
-        fm = _front_matter(path)
+        fm = read_front_matter(path)
         if not fm or "nav_order" not in fm:
             continue
         order = fm["nav_order"]
@@ -0,0 +1,441 @@
+"""Tests for the performance harness in perf.py (no browser or server needed).
+
+The page-load tests in test_performance only mean something if the machinery
+under them caches, aggregates and compares samples correctly; these tests
+pin that machinery down with synthetic samples.
+"""
+
+import asyncio
+import json
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import fields
+
+import perf
+import perf_report
+import profiling
+import pytest
+import third_party
+from constants import PERF_DEFAULT_PROFILE
+from perf import MeasurementRun, PerformanceMetrics, StreamingStats, aggregate_metrics, interpolated_percentile
+from perf_baseline import BaselineStore, mann_whitney_greater
+from waterfall import ResourceTiming, Waterfall
+
+
+def _sample(load: float) -> PerformanceMetrics:
+    return PerformanceMetrics(
+        ttfb=load / 10,
+        dom_interactive=load / 2,
+        dom_content_loaded=load / 2,
+        load_complete=load,
+        lcp=load * 0.6,
+        fcp=load * 0.4,
+        cls=0.01,
+        inp=load / 20,
+        tbt=0.0,
+    )
+
+
+class TestMetricsStore:
+    @pytest.fixture
+    def calls(self, monkeypatch):
+        """Record each sweep the store asks the engine for."""
+        calls = []
+
+        def fake_measure(base_url, paths, iterations, context_args=None, mode="cold", profile="desktop"):
+            calls.append((list(paths), iterations, mode, profile))
+            samples = {p: [_sample(100.0 + i) for i in range(iterations)] for p in paths}
+            return MeasurementRun(samples=samples, mode=mode, profile=profile)
+
+        monkeypatch.setattr(perf, "measure", fake_measure)
+        return calls
+
+    def test_each_page_is_measured_once(self, calls):
+        store = perf.MetricsStore("http://test")
+        store.get(["/", "/about/"], 10)
+        run = store.get(["/about/", "/"], 10)
+        assert calls == [(["/", "/about/"], 10, "cold", "desktop")]
+        assert sorted(run.samples) == ["/", "/about/"] and len(run.samples["/"]) == 10
+
+    def test_only_missing_pages_are_measured(self, calls):
+        store = perf.MetricsStore("http://test")
+        store.get(["/"], 10)
+        store.get(["/", "/contact/"], 10)
+        assert calls == [(["/"], 10, "cold", "desktop"), (["/contact/"], 10, "cold", "desktop")]
+
+    def test_smaller_request_is_served_from_larger_sample(self, calls):
+        store = perf.MetricsStore("http://test")
+        store.get(["/"], 10)
+        run = store.get(["/"], 5)
+        assert len(calls) == 1 and len(run.samples["/"]) == 5
+
+    def test_fresh_forces_a_new_sample(self, calls):
+        store = perf.MetricsStore("http://test")
+        store.get(["/"], 10)
+        store.get(["/"], 10, fresh=True)
+        perf.MetricsStore("http://test", fresh=True).get(["/"], 10)
+        assert len(calls) == 3
+
+    def test_modes_are_cached_and_reported_separately(self, calls):
+        store = perf.MetricsStore("http://test")
+        cold = store.get(["/"], 10, mode="cold")
+        warm = store.get(["/"], 10, mode="warm")
+        store.get(["/"], 10, mode="warm")
+        assert [c[2] for c in calls] == ["cold", "warm"]
+        assert (cold.mode, warm.mode) == ("cold", "warm")
+
+    def test_profiles_are_cached_separately(self, calls):
+        store = perf.MetricsStore("http://test")
+        store.get(["/"], 10)
+        mobile = store.get(["/"], 10, profile="mid-mobile")
+        store.get(["/"], 5, profile="mid-mobile")
+        assert calls[1:] == [(["/"], 10, "cold", "mid-mobile")]
+        assert mobile.profile == "mid-mobile" and "mid-mobile" in mobile.skew_report()
+
+    def test_unknown_mode_or_profile_is_rejected(self):
+        with pytest.raises(ValueError, match="unknown perf mode"):
+            perf.measure("http://test", ["/"], 1, mode="lukewarm")
+        with pytest.raises(ValueError, match="unknown perf profile"):
+            perf.measure("http://test", ["/"], 1, profile="smartwatch")
+
+
+class TestStreamingStats:
+    def test_exact_percentiles_are_interpolated(self):
+        values = [float(v) for v in (5, 1, 4, 2, 3, 10, 7, 6, 9, 8)]
+        stats = StreamingStats()
+        for v in values:
+            stats.add(v)
+        expected = statistics.quantiles(values, n=10, method="inclusive")[8]
+        assert stats.percentile(90) == pytest.approx(expected) == pytest.approx(9.1)
+        assert stats.percentile(50) == pytest.approx(5.5)
+        assert (stats.min, stats.max) == (1.0, 10.0)
+
+    def test_moments_match_statistics_module(self):
+        rng = random.Random(0)
+        values = [rng.gauss(500, 80) for _ in range(500)]
+        stats = StreamingStats()
+        for v in values:
+            stats.add(v)
+        assert stats.mean == pytest.approx(statistics.mean(values))
+        assert stats.stdev == pytest.approx(statistics.stdev(values))
+
+    def test_long_runs_switch_to_bounded_estimates(self):
+        rng = random.Random(1)
+        values = [rng.lognormvariate(5, 0.5) for _ in range(20_000)]
+        stats = StreamingStats(exact_limit=200)
+        for v in values:
+            stats.add(v)
+        assert stats._values is None, "buffer should be dropped past exact_limit"
+        ordered = sorted(values)
+        for p in (50, 90, 95, 99):
+            assert stats.percentile(p) == pytest.approx(interpolated_percentile(ordered, p), rel=0.03)
+        with pytest.raises(KeyError):
+            stats.percentile(75)
+
+    def test_aggregate_covers_every_metric_field(self):
+        agg = aggregate_metrics([_sample(100.0), _sample(300.0)])
+        for f in fields(PerformanceMetrics):
+            for stat in ("avg", "stdev", "min", "max", "p50", "p90", "p95", "p99"):
+                assert f"{f.name}_{stat}" in agg
+        assert agg["load_complete_avg"] == 200.0 and agg["load_complete_p90"] == pytest.approx(280.0)
+
+    def test_empty_aggregate_is_zero(self):
+        assert set(aggregate_metrics([]).values()) == {0.0}
+
+
+def _record_and_save(path, page: str) -> None:
+    """One xdist worker's share of a baseline, in a pool process."""
+    store = BaselineStore(path, update=False)
+    store.record(page, "cold", [_sample(500.0 + i) for i in range(10)])
+    store.save()
+
+
+class TestBaselineComparison:
+    @pytest.fixture
+    def store(self, tmp_path):
+        return BaselineStore(tmp_path / "baseline.json", update=False)
+
+    def _loads(self, centre: float, n: int = 20, seed: int = 0) -> list[PerformanceMetrics]:
+        rng = random.Random(seed)
+        return [_sample(centre * rng.uniform(0.9, 1.1)) for _ in range(n)]
+
+    def test_mann_whitney_matches_reference(self):
+        # by hand: U=15, tie-corrected variance 16/12 * (9 - 24/56) = 11.43, z = (15 - 8 - 0.5) / 3.38 = 1.92
+        u, p = mann_whitney_greater([3, 4, 5, 6], [1, 2, 3, 3])
+        assert u == 15.0 and p == pytest.approx(0.0273, abs=0.0005)
+        assert mann_whitney_greater([5, 5], [5, 5]) == (2.0, 1.0)
+
+    def test_noise_is_not_a_regression(self, store):
+        store.record("/", "cold", self._loads(500.0, seed=1))
+        assert not any(c.regressed for c in store.compare("/", "cold", self._loads(500.0, seed=2)))
+
+    def test_real_slowdown_is_flagged_with_effect_size(self, store):
+        store.record("/", "cold", self._loads(500.0, seed=1))
+        (load,) = [c for c in store.compare("/", "cold", self._loads(650.0, seed=2)) if c.metric == "load_complete"]
+        assert load.regressed
+        assert load.relative == pytest.approx(0.3, abs=0.1) and load.effect > 0.9
+
+    def test_significant_but_tiny_shift_is_tolerated(self, store):
+        store.record("/", "cold", [_sample(500.0 + i) for i in range(50)])
+        comparisons = store.compare("/", "cold", [_sample(520.0 + i) for i in range(50)])
+        assert all(c.p_value < 0.01 and not c.regressed for c in comparisons if c.metric == "load_complete")
+
+    def test_baseline_round_trips_per_mode(self, store):
+        store.record("/", "cold", self._loads(500.0))
+        store.save()
+        reloaded = BaselineStore(store.path)
+        assert reloaded.get("/", "cold") == store.get("/", "cold")
+        assert reloaded.get("/", "warm") is None and reloaded.compare("/", "warm", self._loads(500.0)) == []
+
+    def test_saves_from_several_workers_merge(self, store):
+        """Each xdist worker saves from its own copy; none may drop the pages another recorded."""
+        other = BaselineStore(store.path, update=False)
+        store.record("/", "cold", self._loads(500.0))
+        other.record("/about/", "cold", self._loads(400.0))
+        store.save()
+        other.save()
+        reloaded = BaselineStore(store.path)
+        assert reloaded.get("/", "cold") == store.get("/", "cold")
+        assert reloaded.get("/about/", "cold") == other.get("/about/", "cold")
+
+    def test_concurrent_saves_keep_every_page(self, store):
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            list(pool.map(_record_and_save, [store.path] * 8, [f"/{n}/" for n in range(8)]))
+        assert sorted(BaselineStore(store.path).pages) == sorted(f"{PERF_DEFAULT_PROFILE}:cold:/{n}/" for n in range(8))
+
+
+class TestCriticalChains:
+    def _request(self, url: str, end: float, parent: str | None = None, blocking: bool = False) -> ResourceTiming:
+        return ResourceTiming(url, "link", blocking, end - 10, 0, 0, 5, 5, end, 1000, parent)
+
+    def test_chains_follow_initiators_slowest_first(self):
+        doc = self._request("http://site/", 20)
+        fonts_css = self._request("https://fonts/css", 90, parent="http://site/", blocking=True)
+        base_css = self._request("http://site/base.css", 40, parent="http://site/", blocking=True)
+        imported = self._request("http://site/imported.css", 70, parent="http://site/base.css", blocking=True)
+        font = self._request("https://fonts/pt-serif.woff2", 120, parent="https://fonts/css")
+        wf = Waterfall("/", doc, [fonts_css, base_css, imported, font], first_paint=95)
+
+        assert wf.blocking == [fonts_css, base_css, imported]
+        assert [[r.url for r in chain] for chain in wf.critical_chains()] == [
+            ["http://site/", "https://fonts/css"],
+            ["http://site/", "http://site/base.css", "http://site/imported.css"],
+            ["http://site/", "http://site/base.css"],
+        ]
+        assert "critical request chains" in wf.report()
+
+    def test_unknown_initiator_hangs_off_the_document(self):
+        doc = self._request("http://site/", 20)
+        orphan = self._request("http://site/x.css", 50, parent="http://elsewhere/", blocking=True)
+        assert Waterfall("/", doc, [orphan], 60).critical_chains() == [[doc, orphan]]
+
+
+class TestThirdPartyStandIns:
+    def test_keys_ignore_scheme_and_escaping(self):
+        assert third_party.key("http://gc.zgo.at/count.js") == third_party.key("https://gc.zgo.at/count.js")
+        assert third_party.key("https://fonts.googleapis.com/css?family=A%7CB") == "fonts.googleapis.com/css?family=A|B"
+
+    @pytest.fixture
+    def vendored(self, monkeypatch, tmp_path):
+        """A fixtures directory holding only the GoatCounter stand-in."""
+        monkeypatch.setattr(third_party, "ENABLED", True)
+        monkeypatch.setattr(third_party, "FALLBACK", [])
+        monkeypatch.setattr(third_party, "FIXTURES", tmp_path)
+        monkeypatch.setattr(third_party, "MANIFEST", tmp_path / "manifest.json")
+        (tmp_path / "count.js").write_text("// stand-in\n", encoding="utf-8")
+        manifest = {"gc.zgo.at/count.js": {"file": "count.js", "content_type": "application/javascript"}}
+        (tmp_path / "manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
+        return tmp_path
+
+    def routed(self, latency: float, *urls: str) -> list[tuple[str, str, float]]:
+        """(url, how route() answered it, seconds it took) for each of `urls`."""
+        handlers, answers = [], []
+
+        class Context:
+            async def route(self, pattern, handler):
+                handlers.append((pattern, handler))
+
+        class FakeRoute:
+            def __init__(self, url):
+                self.request = type("Request", (), {"url": url})()
+
+            async def fulfill(self, status, body=b"", headers=None):
+                answers.append(f"fulfill {status}")
+
+            async def abort(self, reason):
+                answers.append("abort")
+
+            async def continue_(self):
+                answers.append("network")
+
+        async def run():
+            await third_party.route(Context(), latency=latency)
+            out = []
+            for url in urls:
+                (handler,) = [h for pattern, h in handlers if pattern.match(url)]
+                start = time.perf_counter()
+                await handler(FakeRoute(url))
+                out.append((url, answers[-1], time.perf_counter() - start))
+            return out
+
+        # Playwright's sync API leaves a loop running on this thread once a browser test has run
+        with ThreadPoolExecutor(1) as pool:
+            return pool.submit(asyncio.run, run()).result()
+
+    def test_missing_copies_alone_go_to_the_network(self, vendored):
+        with pytest.warns(UserWarning, match="live hosts"):
+            assert third_party.prepare() is True
+        third_party.prepare()  # warns once per run
+        assert third_party.FALLBACK == [u for u in third_party.PERF_THIRD_PARTY_ASSETS if "gc.zgo.at" not in u]
+        fuse, fonts_css, count_js = third_party.PERF_THIRD_PARTY_ASSETS
+        with pytest.warns(UserWarning, match="aborted"):
+            answers = self.routed(
+                0,
+                fuse,
+                fonts_css,
+                "https://fonts.gstatic.com/s/ptserif/v18/a.woff2",
+                count_js,
+                "https://jrmylow-gc.goatcounter.com/count?p=/",
+                "https://cdn.jsdelivr.net/npm/other@1/x.js",
+            )
+        assert [how for _, how, _ in answers] == ["network"] * 3 + ["fulfill 200", "fulfill 204", "abort"]
+
+    def test_stand_ins_are_served_after_the_latency(self, vendored):
+        (count_js, how, seconds), (_, beacon, _) = self.routed(
+            150, "https://gc.zgo.at/count.js", "https://jrmylow-gc.goatcounter.com/count"
+        )
+        assert how == "fulfill 200" and beacon == "fulfill 204"
+        assert seconds >= 0.15
+
+    def test_committed_stand_ins_are_on_disk(self):
+        manifest = third_party.load_manifest()
+        assert all((third_party.FIXTURES / entry["file"]).is_file() for entry in manifest.values())
+
+
+class TestPerfReport:
+    @pytest.fixture
+    def store(self, monkeypatch):
+        monkeypatch.setattr(
+            perf,
+            "measure",
+            lambda base_url, paths, iterations, context_args=None, mode="cold", profile="desktop": MeasurementRun(
+                samples={p: [_sample(100.0 + i) for i in range(iterations)] for p in paths}, mode=mode, profile=profile
+            ),
+        )
+        store = perf.MetricsStore("http://test")
+        store.get(["/", "/about/"], 10)
+        store.get(["/"], 10, profile="mid-mobile")
+        return store
+
+    def test_results_file_round_trips(self, store, tmp_path):
+        path = perf_report.write_results(store, tmp_path)
+        (data,) = perf_report.load_runs(tmp_path)
+        assert path.parent == tmp_path and data["environment"]["cpus"]
+        assert [(r["profile"], r["page"]) for r in data["runs"]] == [
+            ("desktop", "/"),
+            ("desktop", "/about/"),
+            ("mid-mobile", "/"),
+        ]
+        assert len(data["runs"][0]["samples"]["lcp"]) == 10 and data["runs"][0]["summary"]["load_complete_p50"]
+
+    def test_writes_in_the_same_second_keep_both(self, store, tmp_path, monkeypatch):
+        """xdist workers finish together; neither may overwrite the other's results."""
+        environment = {**perf_report.environment(), "timestamp": "2024-01-01T00:00:00+00:00", "commit": "abc"}
+        monkeypatch.setattr(perf_report, "environment", lambda: environment)
+        monkeypatch.delenv("PYTEST_XDIST_WORKER", raising=False)
+        first, second = perf_report.write_results(store, tmp_path), perf_report.write_results(store, tmp_path)
+        assert first != second and len(perf_report.load_runs(tmp_path)) == 2
+        monkeypatch.setenv("PYTEST_XDIST_WORKER", "gw1")
+        assert perf_report.write_results(store, tmp_path).name == "2024-01-01T000000Z-abc-gw1.json"
+
+    def test_nothing_measured_writes_nothing(self, tmp_path):
+        assert perf_report.write_results(perf.MetricsStore("http://test"), tmp_path) is None
+        assert perf_report.write_results(perf.MetricsStore("http://test"), None) is None
+
+    def _history(self, loads: list[float]) -> list[dict]:
+        return [
+            {
+                "environment": {"timestamp": f"2026-01-{day:02d}T00:00:00+00:00", "commit": None},
+                "runs": [
+                    {
+                        "page": "/",
+                        "profile": "desktop",
+                        "mode": "cold",
+                        "error": None,
+                        "samples": {f.name: [getattr(_sample(load), f.name)] * 5 for f in fields(PerformanceMetrics)},
+                    }
+                ],
+            }
+            for day, load in enumerate(loads, start=1)
+        ]
+
+    def test_drift_compares_latest_with_recent_median(self):
+        (steady,) = perf_report.series(self._history([500, 520, 480, 510]))
+        assert steady.drifting == []
+        (drifting,) = perf_report.series(self._history([500, 520, 480, 510, 640]))
+        assert drifting.drift("load_complete") == pytest.approx(640 / 505 - 1)
+        assert "load_complete" in drifting.drifting
+
+    def test_html_highlights_drifting_series(self):
+        page = perf_report.render_html(self._history([500, 520, 480, 510, 640]))
+        assert page.count("<svg") == len(perf_report.PERF_TREND_METRICS)
+        assert 'class="drifting"' in page and "1 series drifting" in page
+
+
+class TestTraceSummaries:
+    def test_tasks_are_labelled_by_their_longest_work(self):
+        main, other = {"pid": 1, "tid": 7}, {"pid": 1, "tid": 8}
+
+        def span(name, ts, dur, thread=main, **data):
+            return {"ph": "X", "name": name, "ts": ts, "dur": dur, **thread, "args": {"data": data}}
+
+        trace = {
+            "traceEvents": [
+                {"ph": "M", "name": "thread_name", **main, "args": {"name": "CrRendererMain"}},
+                {"ph": "M", "name": "thread_name", **other, "args": {"name": "Compositor"}},
+                span("RunTask", 1_000, 80_000),
+                span("EvaluateScript", 1_100, 5_000, url="http://site/public/js/search.js"),
+                span(
+                    "FunctionCall",
+                    7_000,
+                    70_000,
+                    functionName="init",
+                    url="http://site/public/js/search.js",
+                    lineNumber=151,
+                ),
+                span("RunTask", 90_000, 12_000),
+                span("Layout", 90_500, 11_000),
+                span("RunTask", 95_000, 500_000, thread=other),
+            ]
+        }
+        tasks = profiling.summarize_trace(trace)
+        assert [(t.label, t.duration) for t in tasks] == [("FunctionCall init search.js:152", 80.0), ("Layout", 12.0)]
+        assert tasks[1].start == 89.0
+
+    def test_cpu_profile_totals_merge_call_sites_and_skip_idle(self):
+        def node(id, name, children=(), url="http://site/public/js/tag-filter.js", line=56):
+            return {
+                "id": id,
+                "callFrame": {"functionName": name, "url": url, "lineNumber": line},
+                "children": list(children),
+            }
+
+        profile = {
+            "nodes": [
+                node(1, "(root)", [2, 5], url=""),
+                node(2, "init", [3], line=104),
+                node(3, "applyFilter", [4]),
+                node(4, "applyFilter"),  # recursion: counted once in the total
+                node(5, "(idle)", url=""),
+            ],
+            "samples": [3, 4, 4, 5, 2],
+            "timeDeltas": [0, 1000, 2000, 3000, 4000],
+        }
+        functions = {f.label: f for f in profiling.summarize_cpu_profile(profile)}
+        assert set(functions) == {"applyFilter tag-filter.js:57", "init tag-filter.js:105"}
+        assert functions["applyFilter tag-filter.js:57"].total_time == pytest.approx(6.0)
+        assert functions["applyFilter tag-filter.js:57"].self_time == pytest.approx(6.0)
+        assert functions["init tag-filter.js:105"].total_time == pytest.approx(6.0)
+        assert functions["init tag-filter.js:105"].self_time == 0.0
@@ -1,5 +1,11 @@
 """Tests for search functionality."""
 
+import json
+from urllib.parse import quote, urlsplit
+
+import inverted_index
+import pytest
+import search_index
 from constants import ANIMATION_TIMEOUT, SELECTORS
 from playwright.sync_api import Page, expect
 
@@ -139,6 +145,52 @@ class TestSearchIndex:
         )
         assert has_fields, "Posts should have title, url, and content fields"
 
+    def test_search_manifest_counts_match_index(self, page: Page, jekyll_server: str):
+        """The shard manifest lists every year of posts, newest first, with its post count."""
+        docs = json.loads(page.request.get(f"{jekyll_server}/search-index.json").text())
+        manifest = json.loads(page.request.get(f"{jekyll_server}/search/manifest.json").text())
+        expected = {year: shard["count"] for year, shard in search_index.build_shards(docs).items()}
+        assert [(s["year"], s["count"]) for s in manifest["shards"]] == list(expected.items())
+        assert all(s["url"] == f"/search/{s['year']}.json" for s in manifest["shards"])
+
+    def test_search_page_streams_committed_shards(self, page: Page, jekyll_server: str):
+        """Either no shard is committed and the page does not stream any, or every year's shard is and it does.
+
+        test_search_index checks that the committed shards are current.
+        """
+        manifest = json.loads(page.request.get(f"{jekyll_server}/search/manifest.json").text())
+        built = [s["year"] for s in manifest["shards"] if (search_index.DEFAULT_SHARDS / f"{s['year']}.json").is_file()]
+        page.goto(f"{jekyll_server}/search/")
+        streamed = page.locator(".search-page-container").get_attribute("data-shards")
+        if not built:
+            assert streamed is None, "the search page streams shards that were never built"
+            return
+        assert len(built) == len(manifest["shards"]), "some years' shards are missing; run `make search-index`"
+        assert streamed == "/search/manifest.json", "every shard is built, but the search page does not stream them"
+
+    def test_search_page_uses_prebuilt_index(self, page: Page, jekyll_server: str):
+        """search.js loads the prebuilt index alone when it is committed, and never asks for it otherwise."""
+        built = search_index.DEFAULT_OUT.is_file()
+        requested = []
+        page.on("request", lambda request: requested.append(urlsplit(request.url).path))
+        page.goto(f"{jekyll_server}/search/?q=test")
+        detail = page.wait_for_function(
+            "() => performance.getEntriesByName('search:index-ready', 'mark').map(m => m.detail)[0]"
+        ).json_value()
+        if built:
+            assert detail["prebuilt"], "search.js fell back to building the Fuse index in the browser"
+            assert "/search-index.json" not in requested, "search.js downloaded search-index.json as well"
+        else:
+            assert f"/{search_index.DEFAULT_OUT.name}" not in requested, "search.js requested an index not in the site"
+
+    def test_search_page_requests_only_existing_files(self, page: Page, jekyll_server: str):
+        """Loading search never costs a round trip to a 404."""
+        missing = []
+        page.on("response", lambda response: response.status == 404 and missing.append(response.url))
+        page.goto(f"{jekyll_server}/search/?q=test")
+        page.wait_for_function("() => performance.getEntriesByName('search:index-ready', 'mark').length > 0")
+        assert not missing, f"search.js requested files that do not exist: {missing}"
+
 
 class TestSearchResultsPage:
     """Tests for dedicated search results page."""
@@ -242,3 +294,57 @@ class TestSearchResultsPage:
         assert (
             abs(about["width"] - search["width"]) < 1
         ), f"Search width {search['width']} should match site page width {about['width']}"
+
+
+@pytest.fixture(scope="module")
+def bm25_index():
+    """The committed inverted index (test_inverted_index checks it is current)."""
+    return json.loads(inverted_index.DEFAULT_OUT.read_text(encoding="utf-8"))
+
+
+def committed_searcher(index: dict) -> inverted_index.Searcher:
+    return inverted_index.Searcher(index, inverted_index.read_shards("terms"), inverted_index.read_shards("postings"))
+
+
+class TestInvertedIndexEngine:
+    """Tests for the ?engine=bm25 search engine."""
+
+    def test_engine_runs_only_with_its_index(self, page: Page, jekyll_server: str):
+        """?engine=bm25 uses the committed index, and without one falls back to Fuse without requesting it."""
+        built = inverted_index.DEFAULT_OUT.is_file()
+        requested = []
+        page.on("request", lambda request: requested.append(urlsplit(request.url).path))
+        page.goto(f"{jekyll_server}/search/?q=test&engine=bm25")
+        detail = page.wait_for_function(
+            "() => performance.getEntriesByName('search:index-ready', 'mark').map(m => m.detail)[0]"
+        ).json_value()
+        assert detail["engine"] == ("bm25" if built else "fuse")
+        assert (f"/{inverted_index.DEFAULT_OUT.name}" in requested) == built
+
+    @pytest.mark.parametrize("query", ["test", "tset"])
+    def test_fetches_only_the_shards_the_query_needs(
+        self, page: Page, jekyll_server: str, bm25_index: dict, query: str
+    ):
+        """search.js should request the same shards the reference Searcher loads, and no others."""
+        searcher = committed_searcher(bm25_index)
+        searcher.prepare(query)
+        requested = []
+        page.on("request", lambda request: requested.append(urlsplit(request.url).path))
+        page.goto(f"{jekyll_server}/search/?q={quote(query)}&engine=bm25")
+        page.wait_for_function("() => performance.getEntriesByName('search:index-ready', 'mark').length > 0")
+        shards = {path for path in requested if path.startswith(bm25_index["shard_url"])}
+        assert shards == {f"{bm25_index['shard_url']}{kind}/{s}.json" for kind, s in searcher.loaded}
+
+    @pytest.mark.parametrize("query", ["test", "tset", "search the archive"])
+    def test_results_match_python_reference(self, page: Page, jekyll_server: str, bm25_index: dict, query: str):
+        """search.js's BM25 engine should return exactly the reference Searcher's results, in order."""
+        searcher = committed_searcher(bm25_index)
+        expected = [searcher.docs[doc]["url"] for doc, _ in searcher.search(query)]
+        page.goto(f"{jekyll_server}/search/?q={quote(query)}&engine=bm25")
+        detail = page.wait_for_function(
+            "() => performance.getEntriesByName('search:index-ready', 'mark').map(m => m.detail)[0]"
+        ).json_value()
+        assert detail["engine"] == "bm25", "search.js fell back to Fuse"
+        expect(page.locator(".search-result-item, .search-no-results").first).to_be_visible()
+        hrefs = page.locator(".search-result-item").evaluate_all("links => links.map(a => a.getAttribute('href'))")
+        assert hrefs == expected
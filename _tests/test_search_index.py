@@ -0,0 +1,157 @@
+"""Tests for the prebuilt Fuse index builder in _tools/search_index.py (no server needed).
+
+search.js parses the prebuilt index with `Fuse.parseIndex`, so it must match
+Fuse's own serialised form record for record; the shape here is the contract.
+The per-year shards must group exactly as the Liquid manifest does.
+"""
+
+import json
+
+import pytest
+import search_index
+
+
+class TestNorm:
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            ("one", 1.0),
+            ("two words", 0.707),
+            ("a b c", 0.577),
+            ("a b c d e f g h i j", 0.316),
+        ],
+    )
+    def test_matches_fuse_field_length_norm(self, value, expected):
+        """1/sqrt(tokens), rounded half-up to three places as Fuse does."""
+        assert search_index.norm(value) == expected
+
+    def test_only_spaces_separate_tokens(self):
+        """Fuse splits on " " alone, so newlines and repeated spaces do not add tokens."""
+        assert search_index.norm("a\nb") == 1.0
+        assert search_index.norm("a   b") == 0.707
+
+
+class TestBuildIndex:
+    def test_keys_are_serialised_like_fuse(self):
+        keys = search_index.build_index([])["keys"]
+        assert [k["id"] for k in keys] == list(search_index.FUSE_KEYS)
+        assert keys[0] == {"path": ["title"], "id": "title", "weight": 0.5, "src": "title", "getFn": None}
+
+    def test_records_hold_each_key_by_position(self):
+        index = search_index.build_index([{"title": "Hello world", "content": "Body", "url": "/x/"}])
+        assert index["records"] == [
+            {"i": 0, "$": {"0": {"v": "Hello world", "n": 0.707}, "1": {"v": "Body", "n": 1.0}}}
+        ]
+
+    def test_blank_and_missing_values_are_skipped(self):
+        records = search_index.build_index([{"title": "  ", "content": "x"}, {"title": "t"}])["records"]
+        assert records[0]["$"] == {"1": {"v": "x", "n": 1.0}}
+        assert records[1]["$"] == {"0": {"v": "t", "n": 1.0}}
+
+    def test_main_writes_compact_index(self, tmp_path):
+        posts = tmp_path / "_posts"
+        posts.mkdir()
+        (posts / "2024-03-01-cafe.md").write_text("---\ntitle: Café\n---\nx\n", encoding="utf-8")
+        out = tmp_path / "search-fuse-index.json"
+        assert (
+            search_index.main(["--docs", str(tmp_path), "--out", str(out), "--shards", str(tmp_path / "search")]) == 0
+        )
+        text = out.read_text(encoding="utf-8")
+        assert "Café" in text and ": " not in text
+        docs = [{"title": "Café", "url": "/2024/03/01/cafe/", "content": "x", "date": "March 01, 2024"}]
+        assert json.loads(text) == search_index.build_prebuilt(docs)
+        assert json.loads((tmp_path / "search" / "2024.json").read_text(encoding="utf-8"))["docs"] == docs
+
+
+class TestPrebuilt:
+    def test_carries_its_documents_and_index(self):
+        """search.js needs nothing but this file, so search-index.json is not downloaded with it."""
+        prebuilt = search_index.build_prebuilt(DOCS)
+        assert prebuilt["version"] == 2 and prebuilt["count"] == len(DOCS)
+        assert prebuilt["docs"] == DOCS and prebuilt["index"] == search_index.build_index(DOCS)
+
+    def test_build_stamp_follows_the_documents(self):
+        assert search_index.build_prebuilt(DOCS)["build"] == search_index.build_prebuilt(list(DOCS))["build"]
+        assert search_index.build_prebuilt(DOCS)["build"] != search_index.build_prebuilt(DOCS[:2])["build"]
+
+    @pytest.mark.parametrize(
+        "words, expected",
+        [(3, "one two three"), (2, "one two..."), (5, "one two three")],
+    )
+    def test_excerpt_truncates_words_like_liquid(self, words, expected):
+        assert search_index.excerpt("one  two\nthree", words) == expected
+
+    def test_committed_index_is_current(self):
+        """search-fuse-index.json should be exactly what docs/_posts builds today."""
+        docs = search_index.search_docs()
+        path = search_index.DEFAULT_OUT
+        assert path.is_file() and path.read_text(encoding="utf-8") == search_index.dumps(
+            search_index.build_prebuilt(docs)
+        ), f"{path.name} is stale, so search.js indexes in the browser; regenerate it with `make search-index`"
+
+
+class TestReadPosts:
+    def test_posts_are_read_from_markdown(self, tmp_path):
+        posts = tmp_path / "_posts"
+        posts.mkdir()
+        (posts / "2024-01-01-first-post.md").write_text(
+            '---\ntags: [x]\n---\n# Heading\n\nSee [the *docs*](https://example.com){:target="_blank"}.\n'
+            "{% include note.html %}\n<div>tag &amp; text</div>\n",
+            encoding="utf-8",
+        )
+        (posts / "2024-02-01-second.md").write_text("---\ntitle: Second\n---\nBody.\n", encoding="utf-8")
+        (posts / "2024-03-01-draft.md").write_text("---\npublished: false\n---\nHidden.\n", encoding="utf-8")
+        assert search_index.read_posts(tmp_path) == [
+            {"title": "Second", "url": "/2024/02/01/second/", "content": "Body.", "date": "February 01, 2024"},
+            {
+                "title": "First Post",
+                "url": "/2024/01/01/first-post/",
+                "content": "Heading See the docs. tag & text",
+                "date": "January 01, 2024",
+            },
+        ]
+
+
+DOCS = [
+    {"title": "Newest", "url": "/c/", "date": "January 05, 2024", "content": "c"},
+    {"title": "Older", "url": "/b/", "date": "December 31, 2023", "content": "b"},
+    {"title": "Oldest", "url": "/a/", "date": "June 01, 2023", "content": "a"},
+]
+
+
+class TestShards:
+    def test_grouped_by_year_newest_first(self):
+        shards = search_index.build_shards(DOCS)
+        assert list(shards) == ["2024", "2023"]
+        assert [d["title"] for d in shards["2023"]["docs"]] == ["Older", "Oldest"]
+        assert shards["2023"]["count"] == 2
+
+    def test_each_shard_carries_its_own_index(self):
+        """Record indices restart at 0 in every shard, so each parses as a standalone Fuse index."""
+        for shard in search_index.build_shards(DOCS).values():
+            assert shard["index"] == search_index.build_index(shard["docs"])
+
+    def test_every_shard_carries_the_build_id(self):
+        """search.js refuses a set of shards from more than one build."""
+        shards = search_index.build_shards(DOCS)
+        assert {shard["build"] for shard in shards.values()} == {search_index.build_prebuilt(DOCS)["build"]}
+        assert search_index.build_shards(DOCS[1:])["2023"]["build"] != shards["2023"]["build"]
+
+    def test_committed_shards_are_current(self, tmp_path):
+        """docs/search holds exactly the shards docs/_posts builds today, so the search page streams them."""
+        written = search_index.write_shards(search_index.build_shards(search_index.search_docs()), tmp_path)
+        stale = "regenerate them with `make search-index`"
+        committed = sorted(
+            p.name for p in search_index.DEFAULT_SHARDS.iterdir() if search_index._SHARD_FILE.match(p.name)
+        )
+        assert committed == sorted(p.name for p in written), stale
+        for fresh in written:
+            path = search_index.DEFAULT_SHARDS / fresh.name
+            assert path.read_bytes() == fresh.read_bytes(), f"search/{path.name} is stale; {stale}"
+
+    def test_write_removes_years_without_posts(self, tmp_path):
+        (tmp_path / "2019.json").write_text("{}", encoding="utf-8")
+        (tmp_path / "manifest.json").write_text("{}", encoding="utf-8")
+        written = search_index.write_shards(search_index.build_shards(DOCS), tmp_path)
+        assert sorted(p.name for p in written) == ["2023.json", "2024.json"]
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["2023.json", "2024.json", "manifest.json"]
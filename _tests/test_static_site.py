@@ -0,0 +1,143 @@
+"""Tests for the static site server in static_site.py (no Jekyll needed).
+
+A small site is written into a temporary directory and served on an ephemeral
+port. The tests use http.client, which decodes nothing, so they see exactly what
+a browser would receive: status, headers, and which variant was sent.
+"""
+
+import gzip
+import http.client
+import os
+
+import pytest
+import static_site
+
+PAGE = "<p>" + "Lorem ipsum dolor sit amet. " * 40 + "</p>\n"
+
+
+@pytest.fixture
+def root(tmp_path):
+    (tmp_path / "about").mkdir()
+    (tmp_path / "about" / "index.html").write_text(PAGE, encoding="utf-8")
+    (tmp_path / "index.html").write_text(PAGE, encoding="utf-8")
+    (tmp_path / "feed.html").write_text("feed", encoding="utf-8")
+    (tmp_path / "404.html").write_text("not here", encoding="utf-8")
+    (tmp_path / "search-index.json").write_text('[{"title": "x"}]' * 40, encoding="utf-8")
+    (tmp_path / "app.js").write_text("console.log(1);\n" * 40, encoding="utf-8")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n" + bytes(300))
+    return tmp_path
+
+
+@pytest.fixture
+def server(root):
+    server = static_site.StaticSiteServer(root, ("127.0.0.1", 0)).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def conn(server):
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    yield conn
+    conn.close()
+
+
+def get(conn, path, **headers):
+    conn.request("GET", path, headers=headers)
+    response = conn.getresponse()
+    return response, response.read()
+
+
+class TestResolve:
+    def test_directories_serve_their_index(self, conn):
+        response, body = get(conn, "/about/")
+        assert response.status == 200 and body.decode() == PAGE
+
+    def test_directory_without_slash_redirects(self, conn):
+        response, _ = get(conn, "/about?x=1")
+        assert response.status == 301 and response.getheader("Location") == "/about/?x=1"
+
+    def test_extensionless_paths_fall_back_to_html(self, conn):
+        response, body = get(conn, "/feed")
+        assert response.status == 200 and body == b"feed"
+
+    def test_unknown_paths_get_the_404_page(self, conn):
+        response, body = get(conn, "/nope/")
+        assert response.status == 404 and body == b"not here"
+
+    def test_paths_cannot_escape_the_root(self, root):
+        assert static_site.resolve(root, "/../" + root.name + "/index.html")[0] == root / "index.html"
+        assert static_site.resolve(root, "/%2e%2e/etc/passwd") == (None, False)
+
+
+class TestHeaders:
+    @pytest.mark.parametrize(
+        "path, expected",
+        [
+            ("/", "text/html; charset=utf-8"),
+            ("/app.js", "text/javascript; charset=utf-8"),
+            ("/search-index.json", "application/json; charset=utf-8"),
+            ("/logo.png", "image/png"),
+        ],
+    )
+    def test_content_types(self, conn, path, expected):
+        response, _ = get(conn, path)
+        assert response.getheader("Content-Type") == expected
+
+    def test_connection_is_kept_alive(self, conn):
+        get(conn, "/")
+        sock = conn.sock
+        response, _ = get(conn, "/app.js")
+        assert response.status == 200 and conn.sock is sock
+
+    def test_etag_revalidates_to_304(self, conn):
+        response, _ = get(conn, "/")
+        tag = response.getheader("ETag")
+        assert response.getheader("Cache-Control") == static_site.STATIC_CACHE_CONTROL
+        response, body = get(conn, "/", **{"If-None-Match": f'W/"other", {tag}'})
+        assert response.status == 304 and body == b"" and response.getheader("ETag") == tag
+
+    def test_changed_file_gets_a_new_etag(self, conn, root):
+        response, _ = get(conn, "/")
+        tag = response.getheader("ETag")
+        stat = (root / "index.html").stat()
+        os.utime(root / "index.html", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        response, _ = get(conn, "/", **{"If-None-Match": tag})
+        assert response.status == 200 and response.getheader("ETag") != tag
+
+
+class TestPrecompressed:
+    def test_precompress_writes_smaller_gzip_variants(self, root):
+        assert static_site.precompress(root) >= 3
+        assert gzip.decompress((root / "index.html.gz").read_bytes()).decode() == PAGE
+        assert not (root / "feed.html.gz").exists()  # too small to gain anything
+        assert not (root / "logo.png.gz").exists()  # already compressed
+        assert static_site.precompress(root) == 0  # up to date
+
+    def test_gzip_variant_is_served_when_accepted(self, conn, root):
+        static_site.precompress(root)
+        response, body = get(conn, "/", **{"Accept-Encoding": "gzip, deflate"})
+        assert response.getheader("Content-Encoding") == "gzip"
+        assert response.getheader("Vary") == "Accept-Encoding"
+        assert gzip.decompress(body).decode() == PAGE
+        assert response.getheader("ETag").endswith('-gzip"')
+
+    def test_brotli_is_preferred_over_gzip(self, conn, root):
+        static_site.precompress(root)
+        (root / "app.js.br").write_bytes(b"brotli bytes")
+        response, body = get(conn, "/app.js", **{"Accept-Encoding": "gzip, br"})
+        assert response.getheader("Content-Encoding") == "br" and body == b"brotli bytes"
+        response, _ = get(conn, "/app.js", **{"Accept-Encoding": "gzip, br;q=0"})
+        assert response.getheader("Content-Encoding") == "gzip"
+
+    def test_identity_without_accept_encoding(self, conn, root):
+        static_site.precompress(root)
+        response, body = get(conn, "/")
+        assert response.getheader("Content-Encoding") is None and body.decode() == PAGE
+
+    def test_stale_variant_is_ignored(self, conn, root):
+        static_site.precompress(root)
+        stat = (root / "index.html").stat()
+        os.utime(root / "index.html", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        response, _ = get(conn, "/", **{"Accept-Encoding": "gzip"})
+        assert response.getheader("Content-Encoding") is None
@@ -0,0 +1,183 @@
+"""Offline stand-ins for the third-party assets the site loads.
+
+head.html pulls Fuse.js from cdn.jsdelivr.net and the PT Serif/Sans CSS from
+fonts.googleapis.com, whose font files come from fonts.gstatic.com.
+default.html loads GoatCounter from gc.zgo.at, which beacons to
+goatcounter.com. In a sealed `make test` run those requests hang or fail, and
+whichever happens shows up in load_complete.
+
+`route(context)` intercepts those hosts (PERF_THIRD_PARTY_HOSTS) in a perf
+context. It serves vendored copies from fixtures/third_party, listed in its
+manifest.json, after PERF_THIRD_PARTY_LATENCY ms, so timings are deterministic
+and `PERF_THIRD_PARTY_LATENCY=400` simulates a slow CDN. Analytics beacons get
+an empty 204. A request on these hosts that has no vendored copy is aborted
+rather than sent to the network, unless it belongs to an asset still missing
+(see `prepare`). `PERF_THIRD_PARTY=live` turns the layer off.
+
+The committed GoatCounter script is a no-op stand-in, because perf runs must
+not count as page views. The other copies are fetched once, with network
+access, by running this module, and then committed:
+
+    python _tests/third_party.py
+
+It downloads PERF_THIRD_PARTY_ASSETS and every font file their CSS
+references. While any of them is missing, `prepare` warns and that asset alone
+goes to its live host; everything vendored, the GoatCounter stand-in and the
+beacons are still answered locally.
+"""
+
+import asyncio
+import json
+import os
+import re
+import urllib.request
+import warnings
+from pathlib import Path
+from urllib.parse import unquote, urljoin, urlsplit
+
+from constants import (
+    PERF_THIRD_PARTY_ASSETS,
+    PERF_THIRD_PARTY_BEACONS,
+    PERF_THIRD_PARTY_HOSTS,
+    PERF_THIRD_PARTY_LATENCY,
+)
+from playwright.async_api import BrowserContext, Route
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "third_party"
+MANIFEST = FIXTURES / "manifest.json"
+ENABLED = os.environ.get("PERF_THIRD_PARTY", "local") != "live"
+LATENCY = float(os.environ.get("PERF_THIRD_PARTY_LATENCY", PERF_THIRD_PARTY_LATENCY))
+# Google Fonts picks the font format from the User-Agent; vendor what Chromium gets.
+_VENDOR_UA = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+_CSS_URL = re.compile(r"url\(\s*['\"]?([^'\")]+)['\"]?\s*\)")
+
+_unserved: set[str] = set()
+FALLBACK: list[str] = []  # assets with no vendored copy this run, fetched from their live hosts
+# Hosts that only serve what an asset on the key host references: fonts from the Google Fonts CSS.
+_REFERENCED_HOSTS = {"fonts.googleapis.com": ("fonts.gstatic.com",)}
+
+
+def key(url: str) -> str:
+    """Manifest key for `url`: host, path and query, without scheme ("//host/x" pages load over http)."""
+    parts = urlsplit(url)
+    return unquote(parts.netloc + parts.path + (f"?{parts.query}" if parts.query else ""))
+
+
+def load_manifest() -> dict[str, dict]:
+    try:
+        return json.loads(MANIFEST.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+
+
+def missing() -> list[str]:
+    """PERF_THIRD_PARTY_ASSETS with no vendored copy on disk."""
+    manifest = load_manifest()
+    return [
+        url
+        for url in PERF_THIRD_PARTY_ASSETS
+        if key(url) not in manifest or not (FIXTURES / manifest[key(url)]["file"]).is_file()
+    ]
+
+
+def prepare() -> bool:
+    """Whether perf contexts are routed locally, checked before any page loads.
+
+    Assets with no vendored copy are listed in FALLBACK, with one warning, and
+    `route` passes just those (and what they reference) to the live hosts
+    rather than aborting requests the pages depend on.
+    """
+    if ENABLED and not FALLBACK and (absent := missing()):
+        FALLBACK.extend(absent)
+        warnings.warn(
+            f"no vendored copy of {absent} in {FIXTURES}; those requests go to the live hosts. "
+            "Run `python _tests/third_party.py` with network access and commit the result."
+        )
+    return ENABLED
+
+
+def _passes_through(url: str) -> bool:
+    """Whether `url` belongs to a FALLBACK asset: the asset itself, or a host only such an asset references."""
+    host = urlsplit(url).hostname
+    for asset in FALLBACK:
+        asset_host = urlsplit(asset).hostname
+        if key(url) == key(asset) or host in _REFERENCED_HOSTS.get(asset_host, ()):
+            return True
+    return False
+
+
+async def route(context: BrowserContext, latency: float = LATENCY) -> None:
+    """Serve every third-party request in `context` locally, `latency` ms late.
+
+    Requests for FALLBACK assets go to the network as they are, with no added latency.
+    """
+    manifest = load_manifest()
+    bodies: dict[str, bytes] = {}
+
+    async def serve(r: Route) -> None:
+        url = r.request.url
+        host = urlsplit(url).hostname
+        entry = manifest.get(key(url))
+        if entry is None and host not in PERF_THIRD_PARTY_BEACONS and _passes_through(url):
+            await r.continue_()
+            return
+        if latency:
+            await asyncio.sleep(latency / 1000)
+        if host in PERF_THIRD_PARTY_BEACONS:
+            await r.fulfill(status=204)
+            return
+        if entry is None:
+            if url not in _unserved:
+                _unserved.add(url)
+                warnings.warn(f"third-party request with no vendored copy, aborted: {url}")
+            await r.abort("blockedbyclient")
+            return
+        if entry["file"] not in bodies:
+            bodies[entry["file"]] = (FIXTURES / entry["file"]).read_bytes()
+        await r.fulfill(
+            status=200,
+            body=bodies[entry["file"]],
+            headers={
+                "Content-Type": entry["content_type"],
+                "Access-Control-Allow-Origin": "*",
+                "Timing-Allow-Origin": "*",  # expose phases to Resource Timing, as jsDelivr does
+                "Cache-Control": "public, max-age=31536000",
+            },
+        )
+
+    for host in (*PERF_THIRD_PARTY_HOSTS, *PERF_THIRD_PARTY_BEACONS):
+        await context.route(re.compile(rf"^https?://{re.escape(host)}/"), serve)
+
+
+def _local_name(url: str) -> str:
+    """Fixture file for `url`: host/path, with the query folded into the name."""
+    parts = urlsplit(url)
+    name = parts.netloc + (parts.path if parts.path not in ("", "/") else "/index")
+    if parts.query:
+        name += "_" + re.sub(r"[^A-Za-z0-9.-]+", "_", unquote(parts.query)).strip("_")
+    return name
+
+
+def vendor() -> dict[str, dict]:
+    """Download PERF_THIRD_PARTY_ASSETS (and the fonts their CSS uses) into FIXTURES."""
+    manifest = load_manifest()
+    queue = [url for url in PERF_THIRD_PARTY_ASSETS if not manifest.get(key(url), {}).get("stand_in")]
+    while queue:
+        url = queue.pop(0)
+        request = urllib.request.Request(url, headers={"User-Agent": _VENDOR_UA})
+        with urllib.request.urlopen(request, timeout=30) as response:
+            body = response.read()
+            content_type = response.headers.get_content_type()
+        if content_type == "text/css":
+            queue += [urljoin(url, ref) for ref in _CSS_URL.findall(body.decode("utf-8"))]
+        name = _local_name(url)
+        (FIXTURES / name).parent.mkdir(parents=True, exist_ok=True)
+        (FIXTURES / name).write_bytes(body)
+        manifest[key(url)] = {"file": name, "content_type": content_type}
+        print(f"{url} -> {name} ({len(body)} bytes)")
+    MANIFEST.write_text(json.dumps(manifest, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+    return manifest
+
+
+if __name__ == "__main__":
+    vendor()
@@ -0,0 +1,173 @@
+"""Per-resource waterfalls and critical request chains for the perf suite.
+
+A cold load of each page records every request's Resource Timing phases (DNS,
+connect including TLS, TTFB, download), its initiator type and Chromium's
+renderBlockingStatus. It also records, from the DevTools protocol, which
+request initiated it. The analyzer follows those initiator links back from
+each render-blocking request to the document. The result is the critical
+request chains: everything that had to arrive, in order, before first paint.
+In head.html the six stylesheets and the Google Fonts CSS are each a two-link
+chain (document -> stylesheet). Anything deeper, like an @import or a script
+that injects a blocking stylesheet, adds a round trip in front of first paint.
+
+Cross-origin responses without Timing-Allow-Origin report zero for the
+detailed phases; only their start, end and size are meaningful.
+"""
+
+from dataclasses import dataclass
+
+import perf
+import third_party
+from playwright.async_api import BrowserContext, async_playwright
+
+RESOURCE_TIMING_JS = """
+() => {
+    const phases = e => ({
+        url: e.name,
+        initiator_type: e.initiatorType,
+        render_blocking: e.renderBlockingStatus === 'blocking',
+        start: e.startTime,
+        dns: e.domainLookupEnd - e.domainLookupStart,
+        connect: e.connectEnd - e.connectStart,
+        ttfb: e.responseStart > 0 ? e.responseStart - e.requestStart : 0,
+        download: e.responseStart > 0 ? e.responseEnd - e.responseStart : 0,
+        end: e.responseEnd,
+        transfer_size: e.transferSize || 0
+    });
+    const paint = performance.getEntriesByName('first-contentful-paint')[0];
+    return {
+        document: phases(performance.getEntriesByType('navigation')[0]),
+        resources: performance.getEntriesByType('resource').map(phases),
+        first_paint: paint ? paint.startTime : 0
+    };
+}
+"""
+
+
+@dataclass(frozen=True)
+class ResourceTiming:
+    """One request of a page load; times in milliseconds from navigation start."""
+
+    url: str
+    initiator_type: str  # link, script, css, img, fetch, navigation, ...
+    render_blocking: bool
+    start: float
+    dns: float
+    connect: float
+    ttfb: float
+    download: float
+    end: float
+    transfer_size: int
+    parent: str | None = None  # URL of the request (or document) that initiated this one
+
+
+@dataclass
+class Waterfall:
+    """Every request of one page load."""
+
+    page: str
+    document: ResourceTiming
+    resources: list[ResourceTiming]
+    first_paint: float
+
+    @property
+    def blocking(self) -> list[ResourceTiming]:
+        return [r for r in self.resources if r.render_blocking]
+
+    def critical_chains(self) -> list[list[ResourceTiming]]:
+        """Initiator chains from the document to each render-blocking request.
+
+        Each chain runs document first, blocking request last. The slowest
+        chain (latest finish) comes first: it is the critical path to first paint.
+        """
+        by_url = {r.url: r for r in [self.document, *self.resources]}
+        chains = []
+        for leaf in self.blocking:
+            chain, seen = [leaf], {leaf.url}
+            while chain[-1].parent in by_url and chain[-1].parent not in seen:
+                chain.append(by_url[chain[-1].parent])
+                seen.add(chain[-1].url)
+            if chain[-1] is not self.document:
+                chain.append(self.document)  # initiator unknown: assume the parser found it
+            chains.append(chain[::-1])
+        return sorted(chains, key=lambda chain: chain[-1].end, reverse=True)
+
+    def report(self) -> str:
+        lines = [
+            f"{self.page}: {len(self.resources) + 1} requests, {len(self.blocking)} render-blocking, "
+            f"first paint at {self.first_paint:.0f}ms",
+            f"  {'start':>6} {'dns':>5} {'conn':>5} {'ttfb':>5} {'down':>5} {'end':>6} {'KB':>6}  "
+            f"{'type':<10} url (* = render-blocking)",
+        ]
+        for r in sorted([self.document, *self.resources], key=lambda r: r.start):
+            lines.append(
+                f"  {r.start:>6.0f} {r.dns:>5.0f} {r.connect:>5.0f} {r.ttfb:>5.0f} {r.download:>5.0f} "
+                f"{r.end:>6.0f} {r.transfer_size / 1024:>6.1f}  {r.initiator_type:<10} "
+                f"{'*' if r.render_blocking else ' '}{r.url}"
+            )
+        lines.append("  critical request chains (slowest first):")
+        for chain in self.critical_chains():
+            lines.append("    " + " -> ".join(f"{r.url.rsplit('/', 1)[-1] or r.url} ({r.end:.0f}ms)" for r in chain))
+        return "\n".join(lines)
+
+
+async def _capture(context: BrowserContext, url: str, path: str) -> Waterfall:
+    page = await context.new_page()
+    cdp = await context.new_cdp_session(page)
+    parents: dict[str, str | None] = {}
+
+    def request_sent(event: dict) -> None:
+        initiator = event.get("initiator", {})
+        source = initiator.get("url")
+        if not source:
+            frames = initiator.get("stack", {}).get("callFrames", [])
+            source = frames[0]["url"] if frames else None
+        parents.setdefault(event["request"]["url"], source or None)
+
+    cdp.on("Network.requestWillBeSent", request_sent)
+    await cdp.send("Network.enable")
+    try:
+        await page.goto(url, wait_until="load")
+        await page.wait_for_timeout(50)
+        data = await page.evaluate(RESOURCE_TIMING_JS)
+    finally:
+        await cdp.detach()
+        await page.close()
+
+    def timing(entry: dict) -> ResourceTiming:
+        return ResourceTiming(**entry, parent=parents.get(entry["url"]))
+
+    return Waterfall(
+        page=path,
+        document=timing(data["document"]),
+        resources=[timing(e) for e in data["resources"]],
+        first_paint=data["first_paint"],
+    )
+
+
+async def _capture_all(
+    base_url: str, paths: list[str], context_args: dict
+) -> tuple[dict[str, Waterfall], dict[str, str]]:
+    waterfalls, errors = {}, {}
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=True)
+        try:
+            for path in paths:
+                context = await perf.new_context(browser, context_args)
+                try:
+                    waterfalls[path] = await _capture(context, f"{base_url}{path}", path)
+                except Exception as e:
+                    errors[path] = f"{type(e).__name__}: {e}"
+                finally:
+                    await context.close()
+        finally:
+            await browser.close()
+    return waterfalls, errors
+
+
+def capture(
+    base_url: str, paths: list[str], context_args: dict | None = None
+) -> tuple[dict[str, Waterfall], dict[str, str]]:
+    """One cold-load waterfall per path, plus an error message per path that failed to load."""
+    third_party.prepare()
+    return perf.run_blocking(_capture_all(base_url, list(paths), context_args or {}))
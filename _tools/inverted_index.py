@@ -0,0 +1,416 @@
+"""Build the inverted index behind search.js's BM25 engine, and search it in Python.
+
+Fuse scans every document for every query. The inverted index maps each term to
+its postings instead, so a query only touches documents that contain one of its
+terms. Documents are ranked by BM25: a title occurrence counts FIELD_WEIGHTS
+["title"] times, and document length is weighted the same way. A query term
+that is not in the vocabulary is matched fuzzily. Candidates come from an
+n-gram table (padded bigrams, so a transposed "tset" still shares " t" and "t "
+with "test"). Each candidate is then confirmed by an edit distance of at most
+`max_edits(term)`, and its contribution is scaled by 1 / (1 + distance).
+
+Unlike search-index.json, which stops after `truncatewords: 100`, the index
+covers the full text of every post. `search_index.read_posts` takes it straight
+from the Markdown in docs/_posts, so building the index needs no Jekyll build
+and publishes no full-text file.
+Terms are lowercased, STOP_WORDS are dropped, and the rest are Porter-stemmed
+(porter.py). The index is split so that a search downloads little more than
+what its query needs:
+
+- The main file (search-inverted-index.json) holds the documents: URLs,
+  titles, dates and excerpts stored once in a string table (`strings`), four
+  string ids per post (`docs`), and the BM25 lengths.
+- The vocabulary and IDFs (integers scaled by IDF_SCALE) live in terms
+  shards, search/bm25/terms/<n>.json, and the postings of the same terms in
+  search/bm25/postings/<n>.json. Each shard holds a run of the sorted
+  vocabulary: whole first-letter groups packed up to SHARD_BYTES, or a
+  letter's two-letter groups when the letter alone is bigger. The main file
+  lists each shard's prefixes and first term id.
+- A query fetches both halves of the shard for each of its terms. A term not
+  found there is matched fuzzily against every term sharing its first or
+  second letter, so only those letters' terms shards are fetched, then the
+  postings shards of the matches. A typo in both of the first two letters is
+  not matched.
+- Postings are delta-encoded. Each document contributes (gap << 1 | tf > 1),
+  followed by tf only when tf > 1.
+- The n-gram table is derived from the loaded terms on first use, not shipped.
+
+search.js uses this engine for /search/?q=...&engine=bm25 and falls back to
+Fuse when the index is missing or stale. `Searcher` below is the reference
+implementation. It loads shards and follows the JS arithmetic step for step,
+and IDFs are stored in the index rather than recomputed, so both give
+identical scores and order. test_search checks that parity in the browser,
+test_inverted_index that the committed files are current, and
+_benchmarks/bench_search.py times it and sizes what each query downloads.
+
+    python _tools/inverted_index.py [--docs docs] [--out docs/search-inverted-index.json] [--shards docs/search/bm25]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import re
+import sys
+from bisect import bisect_right
+from collections import Counter
+from collections.abc import Callable
+from functools import lru_cache
+from pathlib import Path
+
+from porter import stem
+from search_index import DOCS, dumps, read_posts
+
+REPO = Path(__file__).resolve().parent.parent
+
+DEFAULT_OUT = REPO / "docs" / "search-inverted-index.json"
+DEFAULT_SHARDS = REPO / "docs" / "search" / "bm25"
+SHARD_URL = "/search/bm25/"  # where the site serves DEFAULT_SHARDS
+INDEX_VERSION = 3
+FIELD_WEIGHTS = {"title": 3, "content": 1}
+K1 = 1.2
+B = 0.75
+NGRAM = 2
+MAX_EXPANSIONS = 5  # fuzzy candidates kept per unknown query term
+IDF_SCALE = 1000
+EXCERPT_WORDS = 30  # enough for the 150-character excerpt search.js renders
+SHARD_BYTES = 12_000  # uncompressed JSON per term shard, before a letter is split or packing stops
+# Lucene's English stop set; shipped in the index so search.js drops the same words
+STOP_WORDS = (
+    "a an and are as at be but by for if in into is it no not of on or such "
+    "that the their then there these they this to was will with"
+).split()
+_WORDS = re.compile(r"[^\W_]+")  # letters and digits; search.js uses /[\p{L}\p{N}]+/gu
+_stem = lru_cache(maxsize=None)(stem)  # prose repeats words; stem each once per process
+_SHARD_FILE = re.compile(r"^\d+\.json$")
+
+
+def tokenize(text: str, stop_words: frozenset[str] = frozenset(STOP_WORDS)) -> list[str]:
+    """Index terms of `text`: lowercased words, minus stop words, Porter-stemmed."""
+    return [_stem(word) for word in _WORDS.findall(text.lower()) if word not in stop_words]
+
+
+def ngrams(term: str, n: int = NGRAM) -> set[str]:
+    padded = f" {term} "
+    return {padded[i : i + n] for i in range(len(padded) - n + 1)}
+
+
+def max_edits(term: str) -> int:
+    """Typos tolerated in a query term: none below 4 characters, two from 8."""
+    return 0 if len(term) < 4 else 1 if len(term) < 8 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (a transposition is one edit), or limit + 1 if over `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            row[j] = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], prev2[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+        prev2, prev = prev, row
+    return min(prev[-1], limit + 1)
+
+
+def encode_postings(postings: list[tuple[int, int]]) -> list[int]:
+    """(doc, tf) pairs, ascending by doc, as gap/flag integers."""
+    out, prev = [], 0
+    for doc, tf in postings:
+        out.append((doc - prev) << 1 | (tf > 1))
+        if tf > 1:
+            out.append(tf)
+        prev = doc
+    return out
+
+
+def decode_postings(encoded: list[int]) -> list[tuple[int, int]]:
+    out, doc, i = [], 0, 0
+    while i < len(encoded):
+        doc += encoded[i] >> 1
+        tf = 1
+        if encoded[i] & 1:
+            i += 1
+            tf = encoded[i]
+        out.append((doc, tf))
+        i += 1
+    return out
+
+
+def _groups(entries: list[tuple[str, int, list[int]]], limit: int) -> list[tuple[str, list]]:
+    """Runs of sorted (term, idf, postings) sharing a first letter, or two letters where one is over `limit`."""
+
+    def by(n: int, run: list) -> list[tuple[str, list]]:
+        out: list[tuple[str, list]] = []
+        for entry in run:
+            if not out or out[-1][0] != entry[0][:n]:
+                out.append((entry[0][:n], []))
+            out[-1][1].append(entry)
+        return out
+
+    groups = []
+    for prefix, run in by(1, entries):
+        groups += by(2, run) if _size(run) > limit else [(prefix, run)]
+    return groups
+
+
+def _size(run: list[tuple[str, int, list[int]]]) -> int:
+    """About what `run` adds to a shard's JSON."""
+    return sum(len(term) + len(str(idf)) + len(str(postings)) + 3 for term, idf, postings in run)
+
+
+def build(
+    docs: list[dict], limit: int = SHARD_BYTES, shard_url: str = SHARD_URL
+) -> tuple[dict, list[dict], list[dict]]:
+    """The main file, then each shard's terms and its postings, over `docs` (entries with full post text)."""
+    strings: dict[str, int] = {}
+    records = []
+    lengths = []
+    frequencies: dict[str, dict[int, int]] = {}
+    for i, doc in enumerate(docs):
+        excerpt = " ".join((doc.get("content") or "").split()[:EXCERPT_WORDS])
+        for value in (doc.get("url") or "", doc.get("title") or "", doc.get("date") or "", excerpt):
+            records.append(strings.setdefault(value, len(strings)))
+        counts: Counter[str] = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(doc.get(field) or ""):
+                counts[term] += weight
+        lengths.append(sum(counts.values()))
+        for term, tf in counts.items():
+            frequencies.setdefault(term, {})[i] = tf
+
+    n = len(docs)
+    entries = [
+        (
+            term,
+            round(math.log(1 + (n - len(frequencies[term]) + 0.5) / (len(frequencies[term]) + 0.5)) * IDF_SCALE),
+            encode_postings(sorted(frequencies[term].items())),
+        )
+        for term in sorted(frequencies)
+    ]
+    # Pack whole groups, in vocabulary order, so each shard is a contiguous run of term ids.
+    packed: list[tuple[list[str], list]] = []
+    for prefix, run in _groups(entries, limit):
+        if packed and _size(packed[-1][1]) + _size(run) <= limit:
+            packed[-1][0].append(prefix)
+            packed[-1][1].extend(run)
+        else:
+            packed.append(([prefix], list(run)))
+    terms = [{"terms": " ".join(t for t, _, _ in run), "idf": [i for _, i, _ in run]} for _, run in packed]
+    postings = [{"postings": [p for _, _, p in run]} for _, run in packed]
+    offsets = [0]
+    for _, run in packed[:-1]:
+        offsets.append(offsets[-1] + len(run))
+    index = {
+        "version": INDEX_VERSION,
+        "k1": K1,
+        "b": B,
+        "ngram": NGRAM,
+        "max_expansions": MAX_EXPANSIONS,
+        "idf_scale": IDF_SCALE,
+        "stop_words": STOP_WORDS,
+        "strings": list(strings),
+        "docs": records,
+        "lengths": lengths,
+        "avgdl": sum(lengths) / n if n else 0.0,
+        "shard_url": shard_url,
+        "shards": [" ".join(prefixes) for prefixes, _ in packed],
+        "offsets": offsets,
+    }
+    # Shards carry the build they belong to, so a cached shard from another build is refused.
+    build_id = hashlib.blake2b(dumps([index, terms, postings]).encode("utf-8"), digest_size=6).hexdigest()
+    index["build"] = build_id
+    stamp = {"version": INDEX_VERSION, "build": build_id}
+    return index, [{**stamp, **shard} for shard in terms], [{**stamp, **shard} for shard in postings]
+
+
+class Searcher:
+    """Reference BM25 search over a built index; mirrors InvertedIndexSearchEngine in search.js.
+
+    `terms` and `postings` are the shard lists `build` returns, or functions
+    returning shard n. Each half of a shard is loaded the first time a query
+    needs it; `loaded` records which, as ("terms" | "postings", n).
+    """
+
+    def __init__(
+        self, index: dict, terms: list[dict] | Callable[[int], dict], postings: list[dict] | Callable[[int], dict]
+    ):
+        self.index = index
+        self.fetch = {
+            kind: shards.__getitem__ if isinstance(shards, list) else shards
+            for kind, shards in (("terms", terms), ("postings", postings))
+        }
+        strings, records = index["strings"], index["docs"]
+        self.docs = [
+            dict(zip(("url", "title", "date", "content"), (strings[s] for s in records[i : i + 4])))
+            for i in range(0, len(records), 4)
+        ]
+        self.stop_words = frozenset(index["stop_words"])
+        k1, b, avgdl = index["k1"], index["b"], index["avgdl"]
+        self.norms = [k1 * (1 - b + b * length / avgdl) for length in index["lengths"]]
+        self.shard_ids = {prefix: s for s, prefixes in enumerate(index["shards"]) for prefix in prefixes.split(" ")}
+        self.loaded: set[tuple[str, int]] = set()
+        self.terms: dict[int, str] = {}
+        self.term_ids: dict[str, int] = {}
+        self.idf: dict[int, int] = {}
+        self._encoded: dict[int, list[int]] = {}
+        self._postings: dict[int, list[tuple[int, int]]] = {}
+        self._grams: dict[str, dict[str, list[int]]] = {}
+
+    def shard_of(self, term: str) -> int | None:
+        """The shard `term` would be in: its two-letter group's, else its letter's."""
+        for n in (2, 1):
+            if term[:n] in self.shard_ids:
+                return self.shard_ids[term[:n]]
+        return None
+
+    def shard_holding(self, t: int) -> int:
+        """The shard of term id `t`."""
+        return bisect_right(self.index["offsets"], t) - 1
+
+    def letter_shards(self, letter: str) -> list[int]:
+        """Every shard holding terms that start with `letter`."""
+        return sorted({s for prefix, s in self.shard_ids.items() if prefix[0] == letter})
+
+    def load(self, kind: str, s: int) -> None:
+        if (kind, s) in self.loaded:
+            return
+        shard = self.fetch[kind](s)
+        if shard.get("version") != INDEX_VERSION or shard.get("build") != self.index["build"]:
+            raise ValueError(f"{kind} shard {s} is from another build of the index")
+        offset = self.index["offsets"][s]
+        if kind == "terms":
+            for i, term in enumerate(shard["terms"].split(" ")):
+                self.terms[offset + i] = term
+                self.term_ids[term] = offset + i
+                self.idf[offset + i] = shard["idf"][i]
+        else:
+            for i, encoded in enumerate(shard["postings"]):
+                self._encoded[offset + i] = encoded
+        self.loaded.add((kind, s))
+
+    def prepare(self, query: str) -> None:
+        """Load the shards `query` needs.
+
+        Each term's own shard comes first, terms and postings together. For a
+        term that is not there, the terms of every shard starting with one of
+        its first two letters follow, then the postings of its fuzzy matches.
+        """
+        tokens = list(dict.fromkeys(tokenize(query, self.stop_words)))
+        for s in dict.fromkeys(s for s in map(self.shard_of, tokens) if s is not None):
+            self.load("terms", s)
+            self.load("postings", s)
+        unknown = [token for token in tokens if token not in self.term_ids and max_edits(token)]
+        for s in sorted({s for token in unknown for letter in token[:2] for s in self.letter_shards(letter)}):
+            self.load("terms", s)
+        for s in sorted({self.shard_holding(t) for token in unknown for t, _ in self.expand(token)}):
+            self.load("postings", s)
+
+    def postings(self, t: int) -> list[tuple[int, int]]:
+        if t not in self._postings:
+            self._postings[t] = decode_postings(self._encoded[t])
+        return self._postings[t]
+
+    def grams(self, letter: str) -> dict[str, list[int]]:
+        """n-gram -> ids of the loaded terms starting with `letter`, built the first time a query needs it."""
+        if letter not in self._grams:
+            table: dict[str, list[int]] = {}
+            for t in sorted(t for t, term in self.terms.items() if term[0] == letter):
+                for gram in ngrams(self.terms[t], self.index["ngram"]):
+                    table.setdefault(gram, []).append(t)
+            self._grams[letter] = table
+        return self._grams[letter]
+
+    def expand(self, token: str) -> list[tuple[int, float]]:
+        """(term id, weight) pairs for one query term: itself if known, else its fuzzy matches."""
+        if token in self.term_ids:
+            return [(self.term_ids[token], 1.0)]
+        limit = max_edits(token)
+        if not limit:
+            return []
+        query_grams = ngrams(token, self.index["ngram"])
+        shared: Counter[int] = Counter()
+        for letter in dict.fromkeys(token[:2]):
+            table = self.grams(letter)
+            for gram in query_grams:
+                shared.update(table.get(gram, ()))
+        # An edit changes at most 3 padded bigrams, so closer terms must share the rest.
+        floor = max(1, len(query_grams) - 3 * limit)
+        found = []
+        for t in sorted(t for t, count in shared.items() if count >= floor):
+            distance = edit_distance(token, self.terms[t], limit)
+            if distance <= limit:
+                found.append((distance, t))
+        # Term ids follow the sorted vocabulary, so (distance, id) orders by (distance, term).
+        return [(t, 1 / (1 + distance)) for distance, t in sorted(found)[: self.index["max_expansions"]]]
+
+    def search(self, query: str) -> list[tuple[int, float]]:
+        """(doc index, score) for every matching document, best first."""
+        self.prepare(query)
+        k1, scale = self.index["k1"], self.index["idf_scale"]
+        scores: dict[int, float] = {}
+        for token in dict.fromkeys(tokenize(query, self.stop_words)):
+            for t, weight in self.expand(token):
+                idf = self.idf[t] / scale
+                for doc, tf in self.postings(t):
+                    score = weight * idf * (tf * (k1 + 1)) / (tf + self.norms[doc])
+                    scores[doc] = scores.get(doc, 0.0) + score
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def write(
+    index: dict,
+    terms: list[dict],
+    postings: list[dict],
+    out: Path = DEFAULT_OUT,
+    directory: Path = DEFAULT_SHARDS,
+) -> list[Path]:
+    """Write the main file, and each shard as terms/<n>.json and postings/<n>.json under `directory`.
+
+    Shards left over from a build with more of them are removed.
+    """
+    out.write_text(dumps(index), encoding="utf-8")
+    written = [out]
+    for kind, shards in (("terms", terms), ("postings", postings)):
+        (directory / kind).mkdir(parents=True, exist_ok=True)
+        paths = [directory / kind / f"{n}.json" for n in range(len(shards))]
+        for path, shard in zip(paths, shards):
+            path.write_text(dumps(shard), encoding="utf-8")
+        for path in (directory / kind).iterdir():
+            if _SHARD_FILE.match(path.name) and path not in paths:
+                path.unlink()
+        written += paths
+    return written
+
+
+def read_shards(kind: str, directory: Path = DEFAULT_SHARDS) -> Callable[[int], dict]:
+    """A `Searcher` loader for the `kind` ("terms" or "postings") shards `write` left under `directory`."""
+    return lambda n: json.loads((directory / kind / f"{n}.json").read_text(encoding="utf-8"))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--docs", type=Path, default=DOCS, help="site source holding _posts")
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    parser.add_argument("--shards", type=Path, default=DEFAULT_SHARDS, help="directory for the shards")
+    args = parser.parse_args(argv)
+    docs = read_posts(args.docs)
+    index, terms, postings = build(docs)
+    paths = write(index, terms, postings, args.out, args.shards)
+    kb = [len(gzip.compress(path.read_bytes())) / 1024 for path in paths]
+    print(
+        f"{args.out}: {len(docs)} documents, {sum(len(shard['idf']) for shard in terms)} terms, "
+        f"{kb[0]:.1f} KB gzipped; {len(terms)} shards under {args.shards}, "
+        f"the largest {max(kb[1:], default=0):.1f} KB gzipped"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""The Porter stemmer, as in Martin Porter's reference C implementation.
+
+search.js carries a line-for-line port (`porterStem`): queries are stemmed in
+the browser and must land on exactly the stems the index was built with, so
+the two must not drift. Only lowercase ASCII words are stemmed; anything else
+is returned unchanged.
+"""
+
+import re
+
+_ASCII_WORD = re.compile(r"^[a-z]+$")
+
+# (suffix, replacement) in the reference's order. Within each step, suffixes that
+# can match the same word sit in one bucket of the C switch, so the first match
+# in list order is the one the reference takes.
+_STEP2 = [
+    ("ational", "ate"),
+    ("tional", "tion"),
+    ("enci", "ence"),
+    ("anci", "ance"),
+    ("izer", "ize"),
+    ("bli", "ble"),
+    ("alli", "al"),
+    ("entli", "ent"),
+    ("eli", "e"),
+    ("ousli", "ous"),
+    ("ization", "ize"),
+    ("ation", "ate"),
+    ("ator", "ate"),
+    ("alism", "al"),
+    ("iveness", "ive"),
+    ("fulness", "ful"),
+    ("ousness", "ous"),
+    ("aliti", "al"),
+    ("iviti", "ive"),
+    ("biliti", "ble"),
+    ("logi", "log"),
+]
+_STEP3 = [
+    ("icate", "ic"),
+    ("ative", ""),
+    ("alize", "al"),
+    ("iciti", "ic"),
+    ("ical", "ic"),
+    ("ful", ""),
+    ("ness", ""),
+]
+_STEP4 = [
+    "al",
+    "ance",
+    "ence",
+    "er",
+    "ic",
+    "able",
+    "ible",
+    "ant",
+    "ement",
+    "ment",
+    "ent",
+    "ion",
+    "ou",
+    "ism",
+    "ate",
+    "iti",
+    "ous",
+    "ive",
+    "ize",
+]
+
+
+def _cons(w: str, i: int) -> bool:
+    if w[i] in "aeiou":
+        return False
+    if w[i] == "y":
+        return i == 0 or not _cons(w, i - 1)
+    return True
+
+
+def _m(w: str, j: int) -> int:
+    """Number of consonant-vowel sequences in w[: j + 1]."""
+    n, i = 0, 0
+    while i <= j and _cons(w, i):
+        i += 1
+    while i <= j:
+        while i <= j and not _cons(w, i):
+            i += 1
+        if i > j:
+            break
+        n += 1
+        while i <= j and _cons(w, i):
+            i += 1
+    return n
+
+
+def _vowel_in(w: str, j: int) -> bool:
+    return any(not _cons(w, i) for i in range(j + 1))
+
+
+def _double_c(w: str, j: int) -> bool:
+    return j >= 1 and w[j] == w[j - 1] and _cons(w, j)
+
+
+def _cvc(w: str, i: int) -> bool:
+    return i >= 2 and _cons(w, i) and not _cons(w, i - 1) and _cons(w, i - 2) and w[i] not in "wxy"
+
+
+def _replace(w: str, rules: list[tuple[str, str]], min_m: int) -> str:
+    for suffix, replacement in rules:
+        if w.endswith(suffix):
+            stem = w[: -len(suffix)]
+            return stem + replacement if _m(w, len(stem) - 1) > min_m else w
+    return w
+
+
+def stem(word: str) -> str:
+    if len(word) <= 2 or not _ASCII_WORD.match(word):
+        return word
+    w = word
+
+    # Step 1a: plurals
+    if w.endswith("sses") or w.endswith("ies"):
+        w = w[:-2]
+    elif w.endswith("s") and not w.endswith("ss"):
+        w = w[:-1]
+    # Step 1b: -eed, -ed, -ing
+    if w.endswith("eed"):
+        if _m(w, len(w) - 4) > 0:
+            w = w[:-1]
+    else:
+        for suffix in ("ed", "ing"):
+            if w.endswith(suffix) and _vowel_in(w, len(w) - len(suffix) - 1):
+                w = w[: -len(suffix)]
+                if w.endswith(("at", "bl", "iz")):
+                    w += "e"
+                elif _double_c(w, len(w) - 1):
+                    if w[-1] not in "lsz":
+                        w = w[:-1]
+                elif _m(w, len(w) - 1) == 1 and _cvc(w, len(w) - 1):
+                    w += "e"
+                break
+    if len(w) <= 1:
+        return w
+    # Step 1c: y -> i after a vowel in the stem
+    if w.endswith("y") and _vowel_in(w, len(w) - 2):
+        w = w[:-1] + "i"
+    # Steps 2 and 3: double, then single, suffixes
+    w = _replace(w, _STEP2, 0)
+    w = _replace(w, _STEP3, 0)
+    # Step 4: drop a suffix from a long enough stem
+    for suffix in _STEP4:
+        if w.endswith(suffix):
+            stem_end = len(w) - len(suffix) - 1
+            if suffix == "ion" and (stem_end < 0 or w[stem_end] not in "st"):
+                continue
+            if _m(w, stem_end) > 1:
+                w = w[: stem_end + 1]
+            break
+    # Step 5: final -e, and -ll; both measured over the word as it entered the step
+    m = _m(w, len(w) - 1)
+    if w.endswith("e") and (m > 1 or (m == 1 and not _cvc(w, len(w) - 2))):
+        w = w[:-1]
+    if w.endswith("ll") and m > 1:
+        w = w[:-1]
+    return w
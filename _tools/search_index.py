@@ -0,0 +1,226 @@
+"""Build the prebuilt Fuse.js index that search.js loads instead of indexing in the browser.
+
+`FuseSearchEngine.init` used to fetch search-index.json and run `new Fuse(...)`
+over it on every search page load. That tokenises every title and excerpt,
+and the cost grows with the archive. This script does the same work once, at
+build time. It writes docs/search-fuse-index.json: the documents search.js
+shows, with their index in exactly the shape Fuse's `index.toJSON()` produces
+and `Fuse.parseIndex` accepts:
+
+    {"version": 2, "build": "<digest of docs>", "count": <posts>, "docs": [...],
+     "index": {"keys": [{"path": ["title"], "id": "title", "weight": 0.5, "src": "title", "getFn": null}, ...],
+               "records": [{"i": 0, "$": {"0": {"v": "<title>", "n": 0.577}, "1": {...}}}, ...]}}
+
+`n` is Fuse's field-length norm, 1/sqrt(number of space-separated tokens),
+rounded half-up to three places.
+
+The documents are read straight from the Markdown in docs/_posts
+(`read_posts`; discovery.py decides which posts exist and their URLs and
+dates), so no Jekyll build is needed. Each carries its title, URL, date and the
+first EXCERPT_WORDS words of its text, as search-index.json's `truncatewords`
+gives them:
+
+    python _tools/search_index.py [--docs docs] [--out docs/search-fuse-index.json] [--shards docs/search]
+
+`make search-index` runs it in the container. The file holds everything
+search.js needs, so search-index.json is not downloaded alongside it. search.js
+uses it when its `count` covers every post in search/manifest.json, which
+Liquid renders on every build. Otherwise it falls back to search-index.json
+and indexes that in the browser, so results never go wrong, only slower.
+test_search_index fails while the committed file or a shard is stale.
+
+The same run also splits the documents by post year into docs/search/<year>.json
+shards, each one `{"year", "count", "build", "docs", "index"}` with its own
+prebuilt index and the same build id as search-fuse-index.json. search.js
+reads docs/search/manifest.json, which Liquid renders on every build, so it
+always lists the current years and post counts. It then streams
+the shards newest year first and shows results as soon as the first shard
+arrives. Time to first result therefore depends on one year of posts rather
+than the whole archive. A shard that is missing, whose count disagrees with
+the manifest, or whose build differs from the other shards', sends search.js
+back to the full index.
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import math
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO / "_tests"))  # discovery: which posts exist, and their URLs and dates
+import discovery  # noqa: E402
+
+DOCS = discovery.DOCS
+DEFAULT_OUT = REPO / "docs" / "search-fuse-index.json"
+DEFAULT_SHARDS = REPO / "docs" / "search"
+PREBUILT_VERSION = 2
+# FuseSearchEngine's `keys` option in docs/public/js/search.js, in order.
+FUSE_KEYS = ("title", "content")
+EXCERPT_WORDS = 100  # search-index.json's `truncatewords: 100`
+_TOKENS = re.compile(r"[^ ]+")  # Fuse's SPACE pattern: only " " separates tokens
+_SHARD_FILE = re.compile(r"^\d{4}\.json$")
+# search-index.json's `date`, as rendered by `date: "%B %d, %Y"`
+DATE_FORMAT = "%B %d, %Y"
+
+# Markdown and Liquid markup that is not text, removed in this order
+_MARKUP = [
+    (re.compile(r"\{%.*?%\}|\{\{.*?\}\}", re.S), " "),  # Liquid tags and output
+    (re.compile(r"<!--.*?-->|<[^>]+>", re.S), " "),  # HTML comments and tags
+    (re.compile(r"\{:[^}]*\}"), ""),  # kramdown attribute lists, {:toc}
+    (re.compile(r"^ {0,3}\[[^\]]+\]:\s*\S+.*$", re.M), " "),  # reference link definitions
+    (re.compile(r"!?\[([^\]]*)\]\([^)]*\)"), r"\1"),  # links and images keep their text
+    (re.compile(r"!?\[([^\]]*)\]\[[^\]]*\]"), r"\1"),  # reference-style links
+    (re.compile(r"^ {0,3}(?:#{1,6}|>|[-*+]|\d+\.)[ \t]+", re.M), ""),  # heading, quote and list markers
+    (re.compile(r"^ {0,3}(?:```|~~~).*$", re.M), " "),  # code fences; the code stays
+    (re.compile(r"[*`]+|(?<!\w)_+|_+(?!\w)"), ""),  # emphasis and code spans
+]
+
+
+def plain_text(markdown: str) -> str:
+    """The text of a post body, close to what Jekyll's `strip_html` leaves of the rendered page."""
+    for pattern, replacement in _MARKUP:
+        markdown = pattern.sub(replacement, markdown)
+    return " ".join(html.unescape(markdown).split())
+
+
+def _body(path: Path) -> str:
+    """`path` without its front matter."""
+    text = path.read_text(encoding="utf-8")
+    lines = text.splitlines(keepends=True)
+    if lines and lines[0].rstrip() == "---":
+        for i, line in enumerate(lines[1:], 1):
+            if line.rstrip() in ("---", "..."):
+                return "".join(lines[i + 1 :])
+    return text
+
+
+def read_posts(docs: Path = DOCS) -> list[dict]:
+    """`site.posts` as search entries, newest first, read from the Markdown sources.
+
+    Posts with `published: false` are left out, as Jekyll leaves them out. A
+    title defaults to the titleised slug, as Jekyll's does.
+    """
+    posts = []
+    for doc in discovery.ContentManifest.build(docs).collection("posts"):
+        fm = discovery.read_front_matter(doc.path) or {}
+        if fm.get("published") is False or not doc.url or not doc.date:
+            continue
+        title = fm.get("title")
+        if not isinstance(title, str):
+            title = " ".join(word.capitalize() for word in doc.url.rstrip("/").rsplit("/", 1)[-1].split("-"))
+        entry = {"title": title, "url": doc.url, "content": plain_text(_body(doc.path))}
+        posts.append((doc.date, str(doc.path), entry))
+    posts.sort(key=lambda post: post[:2], reverse=True)  # Jekyll orders by date, then path
+    return [{**entry, "date": day.strftime(DATE_FORMAT)} for day, _, entry in posts]
+
+
+def excerpt(text: str, words: int = EXCERPT_WORDS) -> str:
+    """Liquid's `truncatewords`: the first `words` words, with "..." if any were cut."""
+    split = text.split()
+    return " ".join(split[:words]) + ("..." if len(split) > words else "")
+
+
+def norm(value: str, weight: float = 1.0, mantissa: int = 3) -> float:
+    """Fuse's field-length norm for `value` (its `norm(weight, mantissa).get`)."""
+    scale = 10**mantissa
+    # Math.round is half-up, unlike Python's round()
+    return math.floor(1 / len(_TOKENS.findall(value)) ** (0.5 * weight) * scale + 0.5) / scale
+
+
+def fuse_keys(keys: tuple[str, ...] = FUSE_KEYS) -> list[dict]:
+    """Keys as Fuse serialises them: plain string keys, weights normalised to sum to 1."""
+    return [{"path": [key], "id": key, "weight": 1 / len(keys), "src": key, "getFn": None} for key in keys]
+
+
+def build_index(docs: list[dict], keys: tuple[str, ...] = FUSE_KEYS) -> dict:
+    """The Fuse index for `docs` (search-index.json entries), as `index.toJSON()` would give it."""
+    records = []
+    for i, doc in enumerate(docs):
+        fields = {}
+        for k, key in enumerate(keys):
+            value = doc.get(key)
+            if isinstance(value, str) and value.strip():  # Fuse skips missing and blank values
+                fields[str(k)] = {"v": value, "n": norm(value)}
+        records.append({"i": i, "$": fields})
+    return {"keys": fuse_keys(keys), "records": records}
+
+
+def search_docs(docs: Path = DOCS) -> list[dict]:
+    """The documents search.js shows: `read_posts` with each post cut to its excerpt."""
+    return [{**post, "content": excerpt(post["content"])} for post in read_posts(docs)]
+
+
+def build_id(docs: list[dict]) -> str:
+    """A digest of `docs`, stamped on the prebuilt index and every shard built from them."""
+    return hashlib.blake2b(dumps(docs).encode("utf-8"), digest_size=6).hexdigest()
+
+
+def build_prebuilt(docs: list[dict], keys: tuple[str, ...] = FUSE_KEYS) -> dict:
+    """search-fuse-index.json for `docs` (`search_docs`): the docs, their index and a build stamp."""
+    return {
+        "version": PREBUILT_VERSION,
+        "build": build_id(docs),
+        "count": len(docs),
+        "docs": docs,
+        "index": build_index(docs, keys),
+    }
+
+
+def build_shards(docs: list[dict], keys: tuple[str, ...] = FUSE_KEYS) -> dict[str, dict]:
+    """`docs` split by post year, newest year first, each shard with its own index.
+
+    Years come from the rendered `date`, the same `date: '%Y'` that groups the
+    Liquid manifest. Documents keep their order inside a shard. Every shard is
+    stamped with the build id of all of `docs`, so search.js can tell shards
+    from different runs apart.
+    """
+    build = build_id(docs)
+    by_year: dict[str, list[dict]] = {}
+    for doc in docs:
+        by_year.setdefault(str(datetime.strptime(doc["date"], DATE_FORMAT).year), []).append(doc)
+    return {
+        year: {"year": year, "count": len(shard), "build": build, "docs": shard, "index": build_index(shard, keys)}
+        for year, shard in sorted(by_year.items(), reverse=True)
+    }
+
+
+def write_shards(shards: dict[str, dict], directory: Path) -> list[Path]:
+    """Write each shard as `<year>.json` and remove shards for years that no longer have posts."""
+    directory.mkdir(parents=True, exist_ok=True)
+    written = []
+    for year, shard in shards.items():
+        path = directory / f"{year}.json"
+        path.write_text(dumps(shard), encoding="utf-8")
+        written.append(path)
+    for path in directory.iterdir():
+        if _SHARD_FILE.match(path.name) and path not in written:
+            path.unlink()
+    return written
+
+
+def dumps(index: dict) -> str:
+    return json.dumps(index, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--docs", type=Path, default=DOCS, help="site source holding _posts")
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    parser.add_argument("--shards", type=Path, default=DEFAULT_SHARDS, help="directory for the per-year shards")
+    args = parser.parse_args(argv)
+    docs = search_docs(args.docs)
+    text = dumps(build_prebuilt(docs))
+    args.out.write_text(text, encoding="utf-8")
+    print(f"{args.out}: {len(docs)} documents, {len(text.encode('utf-8')) / 1024:.1f} KB")
+    for path in write_shards(build_shards(docs), args.shards):
+        print(f"  {path.relative_to(args.shards.parent)}: {path.stat().st_size / 1024:.1f} KB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
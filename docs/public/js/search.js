@@ -6,6 +6,24 @@
  * - Search page: displays results, re-searches on Enter
  *
  * The search engine (Fuse.js) can be swapped by replacing the SearchEngine class.
+ * ?engine=bm25 swaps in InvertedIndexSearchEngine: BM25 over the prebuilt
+ * inverted index from _tools/inverted_index.py, whose Searcher is its
+ * reference implementation. Past the main file, it fetches only the terms and
+ * postings shards the query needs.
+ *
+ * The index is streamed in per-year shards listed by /search/manifest.json,
+ * newest first, and results are re-rendered as each shard lands, once every
+ * year's shard has been built. Shards and
+ * search-fuse-index.json are prebuilt by _tools/search_index.py. If a shard is
+ * missing or stale, search-fuse-index.json is loaded instead; only when that
+ * is missing or stale too is search-index.json fetched and indexed here.
+ * The search page names each prebuilt file in a data attribute only when it
+ * is in the site (see _pages/search.md), so a file that was never generated
+ * is not requested.
+ *
+ * Performance marks: 'search:results' once the first results are on the page,
+ * then 'search:index-ready' when everything is loaded (detail.engine,
+ * detail.sharded and detail.prebuilt say which path was taken).
  */
 
 (function () {
@@ -17,26 +35,424 @@
 
   class FuseSearchEngine {
     constructor(options = {}) {
-      this.fuse = null;
+      this.fuses = [];
       this.options = Object.assign({
         keys: ['title', 'content'],
         threshold: 0.4,
         ignoreLocation: true,
         minMatchCharLength: 2,
+        includeScore: true,
       }, options);
     }
 
-    async init(indexUrl) {
-      const response = await fetch(indexUrl);
-      const data = await response.json();
-      this.fuse = new Fuse(data, this.options);
+    // Load the shards in `manifestUrl`, calling onShard() as each one becomes searchable.
+    // Fails (so the caller can fall back) if a shard is missing, does not hold as many
+    // posts as the manifest says, or comes from a different build than the others.
+    async initSharded(manifestUrl, onShard) {
+      const response = await fetch(manifestUrl);
+      if (!response.ok) throw new Error(`${manifestUrl}: ${response.status}`);
+      const manifest = await response.json();
+      // A local handle, so shards still in flight after a fallback to init() cannot land in its index.
+      const fuses = (this.fuses = new Array(manifest.shards.length));
+      let build = null;
+      await Promise.all(manifest.shards.map(async (entry, slot) => {
+        const shard = await fetch(entry.url).then(r => (r.ok ? r.json() : null));
+        if (!shard || shard.count !== entry.count || shard.docs.length !== entry.count
+          || (build !== null && shard.build !== build)) {
+          throw new Error(`${entry.url}: missing or stale shard`);
+        }
+        build = shard.build;
+        // Slots keep the manifest's newest-first order for ties, whatever order shards land in.
+        fuses[slot] = new Fuse(shard.docs, this.options, Fuse.parseIndex(shard.index));
+        onShard();
+      }));
+    }
+
+    // The prebuilt file carries its own documents, so search-index.json is only
+    // fetched when it is missing or does not cover every post in the manifest.
+    async init(indexUrl, prebuiltUrl, manifestUrl) {
+      const [prebuilt, manifest] = await Promise.all([
+        prebuiltUrl
+          ? fetch(prebuiltUrl).then(response => (response.ok ? response.json() : null)).catch(() => null)
+          : null,
+        prebuiltUrl ? fetch(manifestUrl).then(r => (r.ok ? r.json() : null)).catch(() => null) : null,
+      ]);
+      if (prebuilt && manifest && this.current(prebuilt, manifest)) {
+        this.fuses = [new Fuse(prebuilt.docs, this.options, Fuse.parseIndex(prebuilt.index))];
+        return true;
+      }
+      const data = await fetch(indexUrl).then(response => response.json());
+      this.fuses = [new Fuse(data, this.options)];
+      return false;
+    }
+
+    // Current if it is this format and was built from as many posts as this build of the site has.
+    current(prebuilt, manifest) {
+      const posts = manifest.shards.reduce((sum, shard) => sum + shard.count, 0);
+      return prebuilt.version === 2 && prebuilt.count === posts && Array.isArray(prebuilt.docs)
+        && prebuilt.docs.length === posts && prebuilt.index.records.length === posts;
     }
 
+    // Fuse scores depend only on the query and the matched field, so results from
+    // different shards rank against each other directly.
     search(query) {
-      if (!this.fuse || !query.trim()) {
+      if (!query.trim()) {
         return [];
       }
-      return this.fuse.search(query).map(result => result.item);
+      return this.fuses
+        .filter(Boolean)
+        .flatMap(fuse => fuse.search(query))
+        .sort((a, b) => a.score - b.score)
+        .map(result => result.item);
+    }
+  }
+
+  /* ==========================================================================
+     Search Engine (BM25 over an inverted index - ?engine=bm25)
+     ========================================================================== */
+
+  // Porter stemmer: a line-for-line port of _tools/porter.py, which the index
+  // is built with. Only lowercase ASCII words are stemmed.
+  const PORTER_STEP2 = [
+    ['ational', 'ate'], ['tional', 'tion'], ['enci', 'ence'], ['anci', 'ance'], ['izer', 'ize'],
+    ['bli', 'ble'], ['alli', 'al'], ['entli', 'ent'], ['eli', 'e'], ['ousli', 'ous'],
+    ['ization', 'ize'], ['ation', 'ate'], ['ator', 'ate'], ['alism', 'al'], ['iveness', 'ive'],
+    ['fulness', 'ful'], ['ousness', 'ous'], ['aliti', 'al'], ['iviti', 'ive'], ['biliti', 'ble'],
+    ['logi', 'log'],
+  ];
+  const PORTER_STEP3 = [
+    ['icate', 'ic'], ['ative', ''], ['alize', 'al'], ['iciti', 'ic'], ['ical', 'ic'], ['ful', ''], ['ness', ''],
+  ];
+  const PORTER_STEP4 = [
+    'al', 'ance', 'ence', 'er', 'ic', 'able', 'ible', 'ant', 'ement', 'ment', 'ent',
+    'ion', 'ou', 'ism', 'ate', 'iti', 'ous', 'ive', 'ize',
+  ];
+
+  function porterCons(w, i) {
+    if ('aeiou'.includes(w[i])) return false;
+    if (w[i] === 'y') return i === 0 || !porterCons(w, i - 1);
+    return true;
+  }
+
+  // Number of consonant-vowel sequences in w[0..j].
+  function porterM(w, j) {
+    let n = 0;
+    let i = 0;
+    while (i <= j && porterCons(w, i)) i++;
+    while (i <= j) {
+      while (i <= j && !porterCons(w, i)) i++;
+      if (i > j) break;
+      n++;
+      while (i <= j && porterCons(w, i)) i++;
+    }
+    return n;
+  }
+
+  function porterVowelIn(w, j) {
+    for (let i = 0; i <= j; i++) {
+      if (!porterCons(w, i)) return true;
+    }
+    return false;
+  }
+
+  function porterDoubleC(w, j) {
+    return j >= 1 && w[j] === w[j - 1] && porterCons(w, j);
+  }
+
+  function porterCvc(w, i) {
+    return i >= 2 && porterCons(w, i) && !porterCons(w, i - 1) && porterCons(w, i - 2) && !'wxy'.includes(w[i]);
+  }
+
+  function porterReplace(w, rules, minM) {
+    for (const [suffix, replacement] of rules) {
+      if (w.endsWith(suffix)) {
+        const stem = w.slice(0, w.length - suffix.length);
+        return porterM(w, stem.length - 1) > minM ? stem + replacement : w;
+      }
+    }
+    return w;
+  }
+
+  function porterStem(word) {
+    if (word.length <= 2 || !/^[a-z]+$/.test(word)) return word;
+    let w = word;
+
+    // Step 1a: plurals
+    if (w.endsWith('sses') || w.endsWith('ies')) {
+      w = w.slice(0, -2);
+    } else if (w.endsWith('s') && !w.endsWith('ss')) {
+      w = w.slice(0, -1);
+    }
+    // Step 1b: -eed, -ed, -ing
+    if (w.endsWith('eed')) {
+      if (porterM(w, w.length - 4) > 0) w = w.slice(0, -1);
+    } else {
+      for (const suffix of ['ed', 'ing']) {
+        if (w.endsWith(suffix) && porterVowelIn(w, w.length - suffix.length - 1)) {
+          w = w.slice(0, -suffix.length);
+          if (w.endsWith('at') || w.endsWith('bl') || w.endsWith('iz')) {
+            w += 'e';
+          } else if (porterDoubleC(w, w.length - 1)) {
+            if (!'lsz'.includes(w[w.length - 1])) w = w.slice(0, -1);
+          } else if (porterM(w, w.length - 1) === 1 && porterCvc(w, w.length - 1)) {
+            w += 'e';
+          }
+          break;
+        }
+      }
+    }
+    if (w.length <= 1) return w;
+    // Step 1c: y -> i after a vowel in the stem
+    if (w.endsWith('y') && porterVowelIn(w, w.length - 2)) w = w.slice(0, -1) + 'i';
+    // Steps 2 and 3: double, then single, suffixes
+    w = porterReplace(w, PORTER_STEP2, 0);
+    w = porterReplace(w, PORTER_STEP3, 0);
+    // Step 4: drop a suffix from a long enough stem
+    for (const suffix of PORTER_STEP4) {
+      if (w.endsWith(suffix)) {
+        const stemEnd = w.length - suffix.length - 1;
+        if (suffix === 'ion' && (stemEnd < 0 || !'st'.includes(w[stemEnd]))) continue;
+        if (porterM(w, stemEnd) > 1) w = w.slice(0, stemEnd + 1);
+        break;
+      }
+    }
+    // Step 5: final -e, and -ll; both measured over the word as it entered the step
+    const m = porterM(w, w.length - 1);
+    if (w.endsWith('e') && (m > 1 || (m === 1 && !porterCvc(w, w.length - 2)))) w = w.slice(0, -1);
+    if (w.endsWith('ll') && m > 1) w = w.slice(0, -1);
+    return w;
+  }
+
+  // The first n characters (code points, as Python slices) of a term.
+  function termPrefix(term, n) {
+    return Array.from(term).slice(0, n).join('');
+  }
+
+  // Mirrors Searcher in _tools/inverted_index.py step for step, so scores and
+  // order match the Python reference exactly. Shards are fetched by
+  // prepare(query) before search(query) runs.
+  class InvertedIndexSearchEngine {
+    constructor() {
+      this.index = null;
+      this.indexUrl = null;
+      this.docs = null;
+      this.stopWords = null;
+      this.norms = null;
+      this.shardIds = null;
+      this.shardLoads = new Map();
+      this.terms = new Map();
+      this.termIds = new Map();
+      this.idf = new Map();
+      this.encoded = new Map();
+      this.postingsCache = new Map();
+      this.gramTables = new Map();
+    }
+
+    // Fails (so the caller can fall back to Fuse) if the index does not cover every post in the manifest.
+    async init(indexUrl, manifestUrl) {
+      const [index, manifest] = await Promise.all([
+        fetch(indexUrl).then(r => (r.ok ? r.json() : Promise.reject(new Error(`${indexUrl}: ${r.status}`)))),
+        fetch(manifestUrl).then(r => (r.ok ? r.json() : null)),
+      ]);
+      const posts = manifest ? manifest.shards.reduce((sum, shard) => sum + shard.count, 0) : index.lengths.length;
+      if (index.version !== 3 || index.lengths.length !== posts) {
+        throw new Error(`${indexUrl}: stale index`);
+      }
+      this.index = index;
+      this.indexUrl = indexUrl;
+      this.docs = index.lengths.map((_, i) => {
+        const [url, title, date, content] = index.docs.slice(i * 4, i * 4 + 4).map(s => index.strings[s]);
+        return { url, title, date, content };
+      });
+      this.stopWords = new Set(index.stop_words);
+      this.norms = index.lengths.map(length => index.k1 * (1 - index.b + index.b * length / index.avgdl));
+      this.shardIds = new Map();
+      index.shards.forEach((prefixes, s) => prefixes.split(' ').forEach(prefix => this.shardIds.set(prefix, s)));
+    }
+
+    // The shard a term would be in: its two-letter group's, else its letter's.
+    shardOf(term) {
+      for (const n of [2, 1]) {
+        const prefix = termPrefix(term, n);
+        if (this.shardIds.has(prefix)) return this.shardIds.get(prefix);
+      }
+      return null;
+    }
+
+    // The shard of term id t.
+    shardHolding(t) {
+      let s = 0;
+      while (s + 1 < this.index.offsets.length && this.index.offsets[s + 1] <= t) s++;
+      return s;
+    }
+
+    // Every shard holding terms that start with `letter`.
+    letterShards(letter) {
+      const found = new Set();
+      this.shardIds.forEach((s, prefix) => {
+        if (termPrefix(prefix, 1) === letter) found.add(s);
+      });
+      return [...found].sort((x, y) => x - y);
+    }
+
+    // Fetch one half ('terms' or 'postings') of shard s once; one from another build fails the search.
+    load(kind, s) {
+      const key = `${kind}/${s}`;
+      if (!this.shardLoads.has(key)) {
+        const url = new URL(`${this.index.shard_url}${key}.json`, new URL(this.indexUrl, window.location.href));
+        this.shardLoads.set(key, fetch(url).then(r => (r.ok ? r.json() : null)).then(shard => {
+          if (!shard || shard.version !== 3 || shard.build !== this.index.build) {
+            throw new Error(`${url}: missing or stale shard`);
+          }
+          const offset = this.index.offsets[s];
+          if (kind === 'terms') {
+            shard.terms.split(' ').forEach((term, i) => {
+              this.terms.set(offset + i, term);
+              this.termIds.set(term, offset + i);
+              this.idf.set(offset + i, shard.idf[i]);
+            });
+          } else {
+            shard.postings.forEach((encoded, i) => this.encoded.set(offset + i, encoded));
+          }
+        }));
+      }
+      return this.shardLoads.get(key);
+    }
+
+    // Load the shards `query` needs: each term's own (terms and postings together), then for
+    // a term not there the terms of its first two letters' shards, then its fuzzy matches' postings.
+    async prepare(query) {
+      const tokens = [...new Set(this.tokenize(query))];
+      const own = new Set(tokens.map(token => this.shardOf(token)).filter(s => s !== null));
+      await Promise.all([...own].flatMap(s => [this.load('terms', s), this.load('postings', s)]));
+      const unknown = tokens.filter(token => !this.termIds.has(token) && this.maxEdits(token));
+      const letters = new Set();
+      unknown.forEach(token => Array.from(token).slice(0, 2).forEach(letter => {
+        this.letterShards(letter).forEach(s => letters.add(s));
+      }));
+      await Promise.all([...letters].map(s => this.load('terms', s)));
+      const matched = new Set();
+      unknown.forEach(token => this.expand(token).forEach(([t]) => matched.add(this.shardHolding(t))));
+      await Promise.all([...matched].map(s => this.load('postings', s)));
+    }
+
+    // Lowercased words, minus stop words, Porter-stemmed: the terms the index was built from.
+    tokenize(text) {
+      return (text.toLowerCase().match(/[\p{L}\p{N}]+/gu) || [])
+        .filter(word => !this.stopWords.has(word))
+        .map(porterStem);
+    }
+
+    // [doc, tf] pairs of term t, decoded from (gap << 1 | tf > 1)[, tf] on first use.
+    postings(t) {
+      if (!this.postingsCache.has(t)) {
+        const encoded = this.encoded.get(t);
+        const decoded = [];
+        let doc = 0;
+        for (let i = 0; i < encoded.length; i++) {
+          doc += encoded[i] >> 1;
+          decoded.push([doc, encoded[i] & 1 ? encoded[++i] : 1]);
+        }
+        this.postingsCache.set(t, decoded);
+      }
+      return this.postingsCache.get(t);
+    }
+
+    // n-gram -> ids of the loaded terms starting with `letter`, built the first time a query needs it.
+    grams(letter) {
+      if (!this.gramTables.has(letter)) {
+        const table = new Map();
+        [...this.terms.keys()]
+          .filter(t => termPrefix(this.terms.get(t), 1) === letter)
+          .sort((x, y) => x - y)
+          .forEach(t => {
+            this.ngrams(this.terms.get(t)).forEach(gram => {
+              if (!table.has(gram)) table.set(gram, []);
+              table.get(gram).push(t);
+            });
+          });
+        this.gramTables.set(letter, table);
+      }
+      return this.gramTables.get(letter);
+    }
+
+    ngrams(term) {
+      const padded = ` ${term} `;
+      const grams = new Set();
+      for (let i = 0; i + this.index.ngram <= padded.length; i++) {
+        grams.add(padded.slice(i, i + this.index.ngram));
+      }
+      return grams;
+    }
+
+    maxEdits(term) {
+      return term.length < 4 ? 0 : term.length < 8 ? 1 : 2;
+    }
+
+    // Optimal string alignment distance, or limit + 1 once it is over `limit`.
+    editDistance(a, b, limit) {
+      if (Math.abs(a.length - b.length) > limit) return limit + 1;
+      let prev2 = null;
+      let prev = Array.from({ length: b.length + 1 }, (_, j) => j);
+      for (let i = 1; i <= a.length; i++) {
+        const row = [i];
+        for (let j = 1; j <= b.length; j++) {
+          const cost = a[i - 1] !== b[j - 1] ? 1 : 0;
+          row[j] = Math.min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + cost);
+          if (i > 1 && j > 1 && a[i - 1] === b[j - 2] && a[i - 2] === b[j - 1]) {
+            row[j] = Math.min(row[j], prev2[j - 2] + 1);
+          }
+        }
+        if (Math.min(...row) > limit) return limit + 1;
+        prev2 = prev;
+        prev = row;
+      }
+      return Math.min(prev[b.length], limit + 1);
+    }
+
+    // [termId, weight] pairs for one query token: itself if known, else its fuzzy matches.
+    expand(token) {
+      if (this.termIds.has(token)) return [[this.termIds.get(token), 1]];
+      const limit = this.maxEdits(token);
+      if (!limit) return [];
+      const queryGrams = this.ngrams(token);
+      const shared = new Map();
+      new Set(Array.from(token).slice(0, 2)).forEach(letter => {
+        const table = this.grams(letter);
+        queryGrams.forEach(gram => {
+          (table.get(gram) || []).forEach(t => shared.set(t, (shared.get(t) || 0) + 1));
+        });
+      });
+      const floor = Math.max(1, queryGrams.size - 3 * limit);
+      const found = [];
+      shared.forEach((count, t) => {
+        if (count < floor) return;
+        const distance = this.editDistance(token, this.terms.get(t), limit);
+        if (distance <= limit) found.push([distance, t]);
+      });
+      // Term ids follow the sorted vocabulary, so (distance, id) is (distance, term) order, as in Python.
+      found.sort((x, y) => x[0] - y[0] || x[1] - y[1]);
+      return found.slice(0, this.index.max_expansions).map(([distance, t]) => [t, 1 / (1 + distance)]);
+    }
+
+    search(query) {
+      if (!this.index || !query.trim()) {
+        return [];
+      }
+      const { k1, idf_scale: scale } = this.index;
+      const scores = new Map();
+      new Set(this.tokenize(query)).forEach(token => {
+        this.expand(token).forEach(([t, weight]) => {
+          const idf = this.idf.get(t) / scale;
+          this.postings(t).forEach(([doc, tf]) => {
+            const score = weight * idf * (tf * (k1 + 1)) / (tf + this.norms[doc]);
+            scores.set(doc, (scores.get(doc) || 0) + score);
+          });
+        });
+      });
+      return [...scores]
+        .sort((x, y) => y[1] - x[1] || x[0] - y[0])
+        .map(([doc]) => this.docs[doc]);
     }
   }
 
@@ -68,6 +484,8 @@
       this.engine = engine;
       this.input = null;
       this.resultsContainer = null;
+      this.query = null;
+      this.rendered = false;
     }
 
     init() {
@@ -78,30 +496,44 @@
         return;
       }
 
-      // Handle Enter key for new search
+      // Get query from URL; refresh() searches it as the index loads
+      const urlParams = new URLSearchParams(window.location.search);
+      this.query = urlParams.get('q');
+      const engine = urlParams.get('engine');
+
+      // Handle Enter key for new search (keeping the chosen engine)
       this.input.addEventListener('keydown', (e) => {
         if (e.key === 'Enter') {
           e.preventDefault();
           const query = this.input.value.trim();
           if (query) {
-            window.location.href = '/search/?q=' + encodeURIComponent(query);
+            window.location.href = '/search/?q=' + encodeURIComponent(query) +
+              (engine ? '&engine=' + encodeURIComponent(engine) : '');
           }
         }
       });
 
-      // Get query from URL and perform search
-      const urlParams = new URLSearchParams(window.location.search);
-      const query = urlParams.get('q');
+      if (this.query) {
+        this.input.value = this.query;
+      }
+    }
 
-      if (query) {
-        this.input.value = query;
-        this.performSearch(query);
+    // Re-run the URL query against whatever is loaded; `complete` once everything is.
+    refresh(complete) {
+      if (this.query) {
+        this.performSearch(this.query, complete);
       }
     }
 
-    performSearch(query) {
+    performSearch(query, complete = true) {
       const results = this.engine.search(query);
+      // Until the last shard is in, an empty result is "not yet", not "none"
+      if (results.length === 0 && !complete) return;
       this.renderResults(results);
+      if (!this.rendered) {
+        this.rendered = true;
+        performance.mark('search:results');
+      }
     }
 
     renderResults(results) {
@@ -156,19 +588,52 @@
     // Check if we're on the search page
     const isSearchPage = document.querySelector('.search-page-input');
     if (!isSearchPage) return;
+    // The prebuilt files this build of the site contains
+    const artifacts = isSearchPage.closest('.search-page-container').dataset;
+
+    if (new URLSearchParams(window.location.search).get('engine') === 'bm25') {
+      const engine = new InvertedIndexSearchEngine();
+      try {
+        if (!artifacts.invertedIndex) throw new Error('no inverted index in this build');
+        await engine.init(artifacts.invertedIndex, '/search/manifest.json');
+        await engine.prepare(new URLSearchParams(window.location.search).get('q') || '');
+        const searchPage = new SearchPage(engine);
+        searchPage.init();
+        performance.mark('search:index-ready', { detail: { engine: 'bm25', sharded: false, prebuilt: true } });
+        searchPage.refresh(true);
+        return;
+      } catch (error) {
+        console.warn('Search: BM25 index unavailable, using Fuse', error);
+      }
+    }
 
     // Initialize search engine for search page
     const engine = new FuseSearchEngine();
+    const searchPage = new SearchPage(engine);
+    searchPage.init();
 
-    try {
-      await engine.init('/search-index.json');
-    } catch (error) {
-      console.error('Search: Failed to load index', error);
-      return;
+    let sharded = false;
+    if (artifacts.shards) {
+      try {
+        await engine.initSharded(artifacts.shards, () => searchPage.refresh(false));
+        sharded = true;
+      } catch (shardError) {
+        console.warn('Search: falling back to the full index', shardError);
+      }
+    }
+    if (sharded) {
+      performance.mark('search:index-ready', { detail: { engine: 'fuse', sharded: true, prebuilt: true } });
+    } else {
+      try {
+        const prebuilt = await engine.init('/search-index.json', artifacts.fuseIndex, '/search/manifest.json');
+        performance.mark('search:index-ready', { detail: { engine: 'fuse', sharded: false, prebuilt } });
+      } catch (error) {
+        console.error('Search: Failed to load index', error);
+        return;
+      }
     }
 
-    const searchPage = new SearchPage(engine);
-    searchPage.init();
+    searchPage.refresh(true);
   }
 
   // Initialize when DOM is ready